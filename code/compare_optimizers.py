@@ -0,0 +1,89 @@
+'''
+compare_optimizers.py
+This module runs the optimizer backends, the initializers of the population and the mutation operators on the scenarios
+and compares the evaluations needed to reach a target fitness. Each configuration is a triple optimizer/initializer/mutation
+(the self-adaptive mutation is used only with the genetic algorithm).
+For each scenario, the target is the best fitness reached by the first configuration (by default the genetic algorithm with uniform initialization
+and Gaussian mutation) in its first run,
+unless it is given on the command line. The seeds of the runs are drawn without repetitions from the base seed (see run_experiments.py),
+and the output files of every run are tagged with the comparison, the scenario, the configuration and the index of the run,
+e.g. "compare_2020_09_01_10_00_00_scenario1_ga_lhs_gaussian_run0". The progress files of all the runs are kept for plot_time_to_target.py in extras.
+
+Usage:
+python compare_optimizers.py --scenarios 1 2 3 4 --optimizers ga cmaes de --runs 3 --max_eval 10000
+python compare_optimizers.py --scenarios 1 2 --optimizers ga cmaes --runs 5 --max_eval 5000 --base_seed 42
+python compare_optimizers.py --scenarios 1 2 --optimizers ga --initializers uniform lhs sobol --runs 5 --max_eval 5000
+python compare_optimizers.py --scenarios 1 2 3 4 --optimizers ga --mutations gaussian self_adaptive --runs 5 --max_eval 10000
+'''
+
+import argparse
+import csv
+from time import time
+from datetime import datetime
+import numpy as np
+from inspyred_functions import *
+from evolution import run_optimization
+from parameters import constraints
+from run_experiments import experiment_seeds
+
+
+def evaluations_to_target(progress_file_name, target):
+	'''
+	Function to find the number of simulations a run needed to reach the target fitness.
+	Returns nan if the target was never reached.
+	'''
+	with open(progress_file_name, mode='r') as progress_file:
+		for row in csv.reader(progress_file, delimiter=','):
+			if float(row[4]) <= target:
+				return float(row[2])
+	return float('nan')
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Compare the evaluations-to-target of the optimizer backends, initializers and mutations.')
+	parser.add_argument('--scenarios', type=int, nargs='+', default=[1, 2, 3, 4])
+	parser.add_argument('--optimizers', nargs='+', default=['ga', 'cmaes', 'de'])
+	parser.add_argument('--initializers', nargs='+', default=['uniform'], help='initializers of the population: uniform, lhs, sobol')
+	parser.add_argument('--mutations', nargs='+', default=['gaussian'], help='mutations of the genetic algorithm: gaussian, self_adaptive')
+	parser.add_argument('--runs', type=int, default=3, help='number of runs of each configuration on each scenario')
+	parser.add_argument('--base_seed', type=int, default=None, help='seed from which the seeds of the runs are drawn (default: current time)')
+	parser.add_argument('--popul_size', type=int, default=100)
+	parser.add_argument('--max_eval', type=int, default=10000)
+	parser.add_argument('--targets', type=float, nargs='+', default=None, help='target fitness of each scenario')
+	args = parser.parse_args()
+
+	configurations = [(optimizer, initializer, mutation) for optimizer in args.optimizers for initializer in args.initializers for mutation in args.mutations
+						if optimizer == 'ga' or mutation == 'gaussian']
+	timestamp = datetime.now().strftime('%Y_%m_%d_%H_%M_%S')
+	base_seed = int(time()) if args.base_seed is None else args.base_seed
+	seeds = iter(experiment_seeds(base_seed, len(args.scenarios) * len(configurations) * args.runs))
+	print('Comparison {0}, base seed {1}'.format(timestamp, base_seed))
+	summary = []
+	for index, scenario in enumerate(args.scenarios):
+		progress = {}
+		for optimizer, initializer, mutation in configurations:
+			progress[optimizer, initializer, mutation] = []
+			for run in range(args.runs):
+				name = 'compare_{0}_scenario{1}_{2}_{3}_{4}_run{5}'.format(timestamp, scenario, optimizer, initializer, mutation, run)
+				algorithm = run_optimization(scenario, scenario_evaluators[scenario], constraints, popul_size=args.popul_size, max_eval=args.max_eval,
+											optimizer=optimizer, initializer=initializer, mutation_operator=mutation, seed=next(seeds), name=name)
+				progress[optimizer, initializer, mutation].append(algorithm.output_files['progress'])
+		if args.targets is not None:
+			target = args.targets[index]
+		else:
+			with open(progress[configurations[0]][0], mode='r') as progress_file:
+				target = min(float(row[4]) for row in csv.reader(progress_file, delimiter=','))
+		for configuration in configurations:
+			evaluations = np.array([evaluations_to_target(f, target) for f in progress[configuration]])
+			reached = ~np.isnan(evaluations)
+			median = np.median(evaluations[reached]) if reached.any() else float('nan')
+			summary.append((scenario, '/'.join(configuration), target, reached.sum(), median))
+
+	print('\nscenario  configuration               target        reached  median evaluations')
+	for scenario, configuration, target, reached, median in summary:
+		print('{0:<9} {1:<25} {2:<13.6g} {3}/{4:<5} {5:.0f}'.format(scenario, configuration, target, reached, args.runs, median))
+
+
+
+if __name__ == '__main__':
+	main()
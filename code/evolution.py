@@ -0,0 +1,364 @@
+'''
+evolution.py
+This module contains the optimization driver shared by the "collision_avoidance_EC_scenario" files.
+It configures the inspyred optimizer, runs the evolution and saves the output files of the run.
+'''
+
+import inspyred
+from random import Random
+import csv
+from time import time
+from datetime import datetime
+from inspyred_functions import *
+from surrogate import surrogate_evaluation, surrogate_observer, SimulatedObserver, simulated_best
+from optimizers import AskTellEC
+from warm_start import warm_start_seeds
+from restarts import StagnationController, stagnation_termination
+from local_search import LocalSearchReplacer, polish_individual
+from objectives import ObjectivesStore, objectives_evaluation
+from workers import WorkerPool, pool_evaluation, step_budget_evaluation
+from population_store import PopulationWriter, TimedObserver, binary_observer, export_csv as export_csv_files
+from trajectories import TrajectoryWriter, trajectory_observer
+from run_catalog import RunCatalog
+
+
+def run_optimization(scenario, evaluator, constraints, popul_size=100, max_eval=100000, tournament_size=4, num_elites=1, mutation_rate=0.4, crossover_rate=0.6,
+		mutation_operator='gaussian', initial_step_size=0.1, initializer='uniform', optimizer='ga', optimizer_popsize=None, skip_known_candidates=False, budget_counts_simulations=False, use_surrogate=False, surrogate_fraction=0.3, surrogate_exploration=0.1, surrogate_min_archive=200,
+		warm_start=None, warm_start_top_k=10, warm_start_perturbation=0.05, num_workers=1, store_objectives=False, individuals_format='csv', export_csv=True,
+		record_trajectories=False, trajectory_elites=1, catalog='drones_ec_catalog.sqlite', simulation_metrics=None, fitness_formula=None,
+		evaluation_time_budget=None, max_simulation_steps=None, worker_memory_limit=None,
+		local_search=False, local_search_interval=10, local_search_evaluations=50, local_search_step=0.05,
+		stagnation_action=None, stagnation_window=20, stagnation_tolerance=1e-3, min_diversity=1e-3, max_restarts=5, restart_popsize_factor=2,
+		seed=None, name=None, migrator=None, observers=None, worker_pool=None, verbose=True, **evolve_args):
+	'''
+	Function to run the optimization process of RVO2 simulator on one scenario.
+	It writes the individuals, statistics and progress files of the run and the best individual parameters file.
+	Returns the evolutionary computation instance, whose "output_files" attribute contains the names of the files of the run and whose "best" attribute is
+	the best individual of the run, the one saved to the best individual parameters file (across the restarts and after the final local search).
+	- scenario --> number of the scenario, used to name the output files
+	- evaluator --> simulation evaluator of the scenario (e.g. simulation_evaluator_scenario1)
+	- constraints --> boundaries of the candidate's chromosomes, compiled as [(l_1, ..., l_n), (u_1, ..., u_n)]
+	- popul_size, max_eval, tournament_size, num_elites, mutation_rate, crossover_rate --> settings of the EC, see settings.py
+	- mutation_operator --> mutation of the genetic algorithm: 'gaussian' (inspyred's gaussian_mutation) or 'self_adaptive' (self_adaptive_mutation,
+		where each individual carries per-gene step sizes which evolve with it and are saved after the genes in the individuals file)
+	- initial_step_size --> initial step size of the self-adaptive mutation, relative to the range of each gene
+	- initializer --> sampling of the initial population: 'uniform' (independent uniform genes), 'lhs' (Latin hypercube) or 'sobol' (scrambled Sobol sequence),
+		also used to fill the warm-started population and the restarted populations
+	- optimizer --> optimizer backend: 'ga' (genetic algorithm of inspyred), 'cmaes' (CMA-ES) or 'de' (Differential Evolution)
+	- optimizer_popsize --> number of candidates per generation of CMA-ES (None for the default of the strategy)
+	- skip_known_candidates --> boolean value used to activate (True) or deactivate (False) the reuse of known fitness values:
+		offspring left unchanged by the variators inherit the fitness of their parent and identical candidates of a batch are simulated once
+	- budget_counts_simulations --> if True, max_eval counts only the simulations actually run (see simulation_termination),
+		if False, it counts every evaluation, including the skipped ones (inspyred's evaluation_termination, as in the paper)
+	- use_surrogate --> boolean value used to activate (True) or deactivate (False) the surrogate pre-screening of the offspring; the individuals
+		whose fitness is predicted take part in the selection, but they are left out of the individuals, statistics and progress files and never are the best
+	- surrogate_fraction --> fraction of each batch, chosen by predicted fitness, which is simulated
+	- surrogate_exploration --> fraction of each batch, chosen at random among the remaining candidates, which is simulated
+	- surrogate_min_archive --> number of simulated candidates needed before the surrogate is used
+	- warm_start --> list of directories or glob patterns of earlier output files used to seed the initial population (None for a random population)
+	- warm_start_top_k --> maximum number of distinct earlier solutions injected in the initial population
+	- warm_start_perturbation --> standard deviation of the noise added to the injected solutions, relative to the range of each gene
+	- num_workers --> number of worker processes which run the simulations of a batch in parallel (see workers.py), 1 to run them sequentially,
+		'auto' to choose it by measuring the throughput on the initial population. The simulations are scheduled longest first, by predicted runtime,
+		and the makespan and utilization of every batch, compared with static chunking, are saved to the schedule file
+	- evaluation_time_budget --> wall-clock budget in seconds of each simulation (None for no budget); the worker of a simulation which exceeds it is
+		terminated and the candidate gets "timeout_fitness"
+	- max_simulation_steps --> step budget of each simulation (None for no budget); the simulations which exceed it get "timeout_fitness"
+	- worker_memory_limit --> memory ceiling in megabytes of a worker process (None for no ceiling): a worker which exceeds it during a simulation is terminated
+		and the candidate gets "timeout_fitness", one still above it after a simulation is recycled (see workers.py)
+		With any of the three budgets, or with more than one worker, the simulations run in the worker processes
+	- store_objectives --> boolean value used to save (True) the components of the fitness of every simulation to the objectives store
+		"drones_ec_objectives_<name>" (see objectives.py), so that the run can be re-scored without simulating again
+	- individuals_format --> format of the individuals and statistics of every generation: 'csv' (inspyred's file_observer, written on the evolution thread)
+		or 'binary' (binary_observer, whose blocks are written to the population store "drones_ec_population_<name>" by a background thread, see population_store.py)
+	- export_csv --> with the 'binary' format, boolean value used to export (True) the population store to the individuals and statistics files at the end of the run
+	- record_trajectories --> boolean value used to record (True) the trajectories of the "trajectory_elites" best individuals of each generation and of the best
+		individual at the end of the run to the trajectory store "drones_ec_trajectories_<name>" (see trajectories.py); each new elite is simulated once more
+	- simulation_metrics --> names of the streaming metrics of the trajectories (see trajectory_metrics.py) computed in every simulation, whose results
+		are saved with the fitness components by "store_objectives" and can be used by "fitness_formula" (None for no metrics); it requires one of the two
+	- fitness_formula --> expression of the components of the fitness and of the results of the metrics which replaces the fitness of the scenario
+		(see formula_fitness in inspyred_functions.py, e.g. "mean_error + mean_duration_norm + collisions + 0.1 * path_length"), None for the fitness of the scenario.
+		It is checked before the run (see check_fitness_formula): an unknown component or metric raises ValueError
+	- catalog --> SQLite run catalog (see run_catalog.py) where the run is recorded when it starts and when it ends, with its settings,
+		results and output files (None to not record it)
+	- local_search --> boolean value used to activate (True) or deactivate (False) the pattern search which polishes the elite
+		every "local_search_interval" generations (0 to polish only at the end) and the best individual at the end of the run
+	- local_search_evaluations --> maximum number of evaluations of one pattern search; the ones of the final search are reserved from max_eval
+	- local_search_step --> initial step of the pattern search, relative to the range of each gene
+	- stagnation_action --> action taken when the evolution stagnates: None (no stagnation detection), 'restart' (IPOP-style restart) or 'stop' (early termination);
+		the evaluations of the budget saved by an early termination are written to the restarts file and to the run catalog
+	- stagnation_window --> number of generations over which the improvement of the best and average fitness is measured
+	- stagnation_tolerance --> minimum relative improvement of the best and average fitness over the window
+	- min_diversity --> minimum diversity of the population in the normalized gene space
+	- max_restarts --> maximum number of restarts, after which the stagnation stops the evolution
+	- restart_popsize_factor --> factor by which the population size grows at each restart
+	- seed --> seed of the random number generator (default: current time)
+	- name --> tag used in the names of the output files (default: scenario and current time, e.g. "scenario1_2020_09_01_10_00_00")
+	- migrator --> inspyred migrator of the EC (e.g. the migrator of an island model)
+	- observers --> additional observers of the EC
+	- worker_pool --> WorkerPool shared with other runs (e.g. by run_experiments.py), used instead of a pool of "num_workers" processes of the run
+	- verbose --> boolean value used to print (True) or not (False) the progress of the run on the command line
+	- evolve_args --> additional keyword arguments passed to the evolve function
+	'''
+	settings = {key: value for key, value in locals().items() if key not in ('evaluator', 'migrator', 'observers', 'worker_pool', 'evolve_args')}
+	settings.update(evolve_args)
+	if simulation_metrics and not store_objectives and fitness_formula is None:
+		raise ValueError('the simulation metrics are used only by store_objectives or fitness_formula, set one of them')
+	if fitness_formula is not None:
+		check_fitness_formula(fitness_formula, simulation_metrics)
+	if name is None:
+		now = datetime.now()
+		timestamp = now.strftime('%Y_%m_%d_%H_%M_%S')
+		name = 'scenario{0}_{1}'.format(scenario, timestamp)
+
+	rand = Random()
+	seed = int(time()) if seed is None else seed
+	rand.seed(seed)
+
+	if optimizer == 'ga':
+		algorithm = inspyred.ec.EvolutionaryComputation(rand)
+		algorithm.selector = inspyred.ec.selectors.tournament_selection
+		algorithm.replacer = inspyred.ec.replacers.generational_replacement
+		if mutation_operator == 'self_adaptive':
+			algorithm.variator = [inspyred.ec.variators.heuristic_crossover, self_adaptive_mutation]
+		else:
+			algorithm.variator = [inspyred.ec.variators.heuristic_crossover, inspyred.ec.variators.gaussian_mutation]
+	elif mutation_operator != 'gaussian':
+		raise ValueError('the {0} mutation is available only with the genetic algorithm'.format(mutation_operator))
+	else:
+		algorithm = AskTellEC(rand, optimizer)
+	if budget_counts_simulations:
+		algorithm.terminator = [simulation_termination]
+	else:
+		algorithm.terminator = [inspyred.ec.terminators.evaluation_termination]
+	file_observer = binary_observer if individuals_format == 'binary' else inspyred.ec.observers.file_observer
+	if use_surrogate:
+		file_observer = SimulatedObserver(file_observer)
+	algorithm.observer = [TimedObserver(file_observer), progress_observer]
+	if verbose:
+		algorithm.observer.append(custom_observer)
+	if observers is not None:
+		algorithm.observer.extend(observers)
+	if migrator is not None:
+		algorithm.migrator = migrator
+	if local_search:
+		algorithm.replacer = LocalSearchReplacer(algorithm.replacer)
+	if stagnation_action is not None:
+		algorithm.replacer = StagnationController(algorithm.replacer)
+		algorithm.terminator.append(stagnation_termination)
+
+	bounder = inspyred.ec.Bounder(constraints[0], constraints[1])
+	seeds = None
+	if warm_start:
+		seeds = warm_start_seeds(rand, warm_start, popul_size, bounder.lower_bound, bounder.upper_bound, top_k=warm_start_top_k, perturbation=warm_start_perturbation, method=initializer)
+		if mutation_operator == 'self_adaptive':
+			seeds = [seed + [initial_step_size] * len(seed) for seed in seeds]
+
+	algorithm.output_files = {
+		'individuals': 'drones_ec_individuals_'+name+'.csv',
+		'statistics': 'drones_ec_statistics_'+name+'.csv',
+		'progress': 'drones_ec_progress_'+name+'.csv',
+		'best': 'best_individual_parameters_'+name+'.csv'}
+	# the outputs, the worker pool and the background writer are released even when the run fails
+	ind_file = None
+	stats_file = None
+	population_writer = None
+	progress_file = None
+	surrogate_file = None
+	restarts_file = None
+	local_search_file = None
+	pool_client = None
+	schedule_file = None
+	own_pool = False
+	run_catalog = None
+	try:
+		if individuals_format == 'binary':
+			algorithm.output_files['population'] = 'drones_ec_population_'+name
+			population_writer = PopulationWriter(algorithm.output_files['population'])
+			if not export_csv:
+				del algorithm.output_files['individuals']
+				del algorithm.output_files['statistics']
+		else:
+			ind_file = open(algorithm.output_files['individuals'], 'w+')
+			stats_file = open(algorithm.output_files['statistics'], 'w+')
+		progress_file = open(algorithm.output_files['progress'], 'w+')
+		reserved_evaluations = 0
+		step_budget_evaluator = None
+
+		own_pool = worker_pool is None and (num_workers != 1 or evaluation_time_budget is not None or worker_memory_limit is not None)
+		if own_pool:
+			worker_pool = WorkerPool(num_workers, evaluation_time_budget, worker_memory_limit)
+		if worker_pool is not None:
+			worker_args = {'store_objectives': store_objectives, 'max_simulation_steps': max_simulation_steps, 'simulation_metrics': simulation_metrics,
+						'fitness_formula': fitness_formula}
+			pool_client = worker_pool.client(evaluator, worker_args, len(bounder.lower_bound))
+			evaluator = pool_evaluation
+			algorithm.output_files['schedule'] = 'drones_ec_schedule_'+name+'.csv'
+			schedule_file = open(algorithm.output_files['schedule'], 'w+')
+		elif max_simulation_steps is not None:
+			# the step budget is enforced inside the simulations, which need no pool: only the timed-out ones are counted
+			evaluator, step_budget_evaluator = step_budget_evaluation, evaluator
+
+		if store_objectives:
+			algorithm.output_files['objectives'] = 'drones_ec_objectives_'+name
+			objectives_store = ObjectivesStore(algorithm.output_files['objectives'], len(bounder.lower_bound))
+			evaluator, objectives_evaluator = objectives_evaluation, evaluator
+		else:
+			objectives_store = None
+			objectives_evaluator = None
+
+		if local_search:
+			algorithm.output_files['local_search'] = 'drones_ec_local_search_'+name+'.csv'
+			local_search_file = open(algorithm.output_files['local_search'], 'w+')
+			reserved_evaluations = local_search_evaluations
+		local_search_evaluator = evaluator
+
+		if stagnation_action is not None:
+			algorithm.output_files['restarts'] = 'drones_ec_restarts_'+name+'.csv'
+			restarts_file = open(algorithm.output_files['restarts'], 'w+')
+
+		trajectory_writer = None
+		if record_trajectories:
+			algorithm.output_files['trajectories'] = 'drones_ec_trajectories_'+name
+			trajectory_writer = TrajectoryWriter(algorithm.output_files['trajectories'], scenario, len(bounder.lower_bound),
+												lambda chromosome: simulation_trajectory(scenario, chromosome, max_simulation_steps))
+			algorithm.observer.append(trajectory_observer)
+
+		if use_surrogate:
+			algorithm.output_files['surrogate'] = 'drones_ec_surrogate_'+name+'.csv'
+			surrogate_file = open(algorithm.output_files['surrogate'], 'w+')
+			algorithm.observer.append(surrogate_observer)
+			evaluator, surrogate_evaluator = surrogate_evaluation, evaluator
+		else:
+			surrogate_evaluator = None
+
+		if skip_known_candidates:
+			evaluator, cache_evaluator = cached_evaluation, evaluator
+		else:
+			cache_evaluator = None
+
+		if catalog is not None:
+			run_catalog = RunCatalog(catalog)
+			run_catalog.start_run(name, scenario, seed, settings, algorithm.output_files)
+
+		final_pop = algorithm.evolve(generator=generate_population,
+									evaluator=evaluator,
+									pop_size=popul_size,
+									seeds=seeds,
+									maximize=False,
+									bounder=bounder,
+									num_selected=popul_size,
+									initializer=initializer,
+									mutation_operator=mutation_operator,
+									initial_step_size=initial_step_size,
+									tournament_size=tournament_size,
+									num_elites=num_elites,
+									mutation_rate=mutation_rate,
+									crossover_rate=crossover_rate,
+									max_evaluations=max_eval - reserved_evaluations,
+									budget_counts_simulations=budget_counts_simulations,
+									individuals_file=ind_file,
+									statistics_file=stats_file,
+									population_writer=population_writer,
+									optimizer_popsize=optimizer_popsize,
+									progress_file=progress_file,
+									start_time=time(),
+									cache_evaluator=cache_evaluator,
+									surrogate_evaluator=surrogate_evaluator,
+									surrogate_fraction=surrogate_fraction,
+									surrogate_exploration=surrogate_exploration,
+									surrogate_min_archive=surrogate_min_archive,
+									surrogate_file=surrogate_file,
+									stagnation_action=stagnation_action,
+									stagnation_window=stagnation_window,
+									stagnation_tolerance=stagnation_tolerance,
+									min_diversity=min_diversity,
+									max_restarts=max_restarts,
+									restart_popsize_factor=restart_popsize_factor,
+									restarts_file=restarts_file,
+									worker_pool=pool_client,
+									schedule_file=schedule_file,
+									max_simulation_steps=max_simulation_steps,
+									store_objectives=store_objectives,
+									simulation_metrics=simulation_metrics,
+									fitness_formula=fitness_formula,
+									objectives_store=objectives_store,
+									objectives_evaluator=objectives_evaluator,
+									step_budget_evaluator=step_budget_evaluator,
+									local_search_evaluator=local_search_evaluator,
+									local_search_interval=local_search_interval,
+									local_search_evaluations=local_search_evaluations,
+									local_search_step=local_search_step,
+									local_search_file=local_search_file,
+									trajectory_writer=trajectory_writer,
+									trajectory_elites=trajectory_elites,
+									verbose=verbose,
+									**evolve_args)
+
+		observer_time = algorithm._kwargs.get('observer_time', 0.0)
+		if population_writer is not None:
+			population_writer.close()
+			if export_csv:
+				export_csv_files(algorithm.output_files['population'], algorithm.output_files['individuals'], algorithm.output_files['statistics'])
+
+		best = simulated_best(final_pop)
+		global_best = algorithm._kwargs.get('global_best')
+		if global_best is not None and global_best > best:
+			best = global_best
+
+		if local_search:
+			algorithm._kwargs['max_evaluations'] = max_eval
+			polish_individual(best, algorithm._kwargs, 'final')
+			spent = algorithm._kwargs.get('local_search_spent', 0)
+			improvement = algorithm._kwargs.get('local_search_improvement', 0.0)
+			if verbose:
+				print('\nLocal search: {0} evaluations, fitness improvement {1} ({2} per evaluation)'.format(spent, improvement, improvement / max(spent, 1)))
+		if trajectory_writer is not None:
+			trajectory_writer.record(best.candidate, best.fitness, algorithm.num_generations, 0, final=True)
+		skipped = algorithm._kwargs.get('num_skipped_evaluations', 0)
+		inherited = algorithm._kwargs.get('num_inherited_evaluations', 0)
+		duplicates = algorithm._kwargs.get('num_duplicate_evaluations', 0)
+		if verbose:
+			print('\nEvaluations: {0}  Simulations: {1}  Avoided: {2} (unchanged offspring: {3}, duplicates: {4}, surrogate: {5})'.format(
+				algorithm.num_evaluations, algorithm.num_evaluations - skipped, skipped, inherited, duplicates, skipped - inherited - duplicates))
+			if pool_client is not None:
+				print('Timed-out simulations: {0} (wall-clock: {1}, steps: {2})  Recycled workers: {3} (terminated by the memory ceiling: {4})'.format(
+					pool_client.num_timeouts + pool_client.num_step_timeouts, pool_client.num_timeouts, pool_client.num_step_timeouts, pool_client.num_recycles,
+					pool_client.num_memory_kills))
+				utilization, static_utilization = pool_client.utilization()
+				print('Workers: {0}  Makespan: {1:.1f} s (static chunking: {2:.1f} s)  Utilization: {3:.2f} (static chunking: {4:.2f})'.format(
+					pool_client.num_workers, pool_client.makespan, pool_client.static_makespan, utilization, static_utilization))
+				if pool_client.tuning is not None:
+					print('Worker pool: {0} workers chosen on the initial population ({1:.2f} simulations per second)'.format(*pool_client.tuning))
+			print('Individuals and statistics: {0} format, {1:.3f} s on the evolution thread'.format(individuals_format, observer_time) +
+				('' if population_writer is None else ', {0:.3f} s in the background writer'.format(population_writer.write_time)))
+			if trajectory_writer is not None:
+				print('Trajectories: {0} distinct elites simulated and saved to {1}'.format(trajectory_writer.num_simulations, algorithm.output_files['trajectories']))
+			print('\nFittest individual:\n')
+			print(best)
+
+		algorithm.best = best
+		with open(algorithm.output_files['best'], mode='w') as best_individual_file:
+			best_individual_writer = csv.writer(best_individual_file, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+			best_individual_writer.writerow(best.candidate[:len(bounder.lower_bound)])
+
+		if run_catalog is not None:
+			run_catalog.finish_run(name, 'completed', best.fitness, best.candidate[:len(bounder.lower_bound)], algorithm.num_evaluations,
+									algorithm.num_evaluations - skipped, algorithm.num_generations, algorithm.output_files,
+									saved_evaluations=algorithm._kwargs.get('saved_evaluations'))
+	except BaseException as error:
+		if run_catalog is not None:
+			run_catalog.finish_run(name, 'failed', evaluations=algorithm.num_evaluations, generations=algorithm.num_generations, error=repr(error))
+		raise
+	finally:
+		for output_file in (ind_file, stats_file, progress_file, surrogate_file, restarts_file, local_search_file, schedule_file):
+			if output_file is not None:
+				output_file.close()
+		if population_writer is not None and population_writer.thread.is_alive():
+			population_writer.close()
+		if pool_client is not None:
+			pool_client.close()
+		if own_pool:
+			worker_pool.close()
+
+	return algorithm
@@ -0,0 +1,154 @@
+'''
+export_simulations.py
+This module exports simulations without a window, with the Agg backend of matplotlib (no Tk), so that the results can be looked at
+from the compute nodes. The inputs are best individual parameters files, which are simulated (in parallel), and trajectory stores
+(see trajectories.py), which are read without simulating. For each input it saves a path overview image "<input>_paths.png" and,
+with --format, the animation of the simulation as an MP4 video (ffmpeg is needed), a GIF or a sequence of PNG frames.
+The frames of an animation are split in chunks which are rendered by a pool of processes (see TrajectoryAnimation in renderer.py).
+
+Usage:
+python export_simulations.py best_individual_parameters_scenario1_*.csv --format mp4
+python export_simulations.py drones_ec_trajectories_scenario2_2020_09_01_10_00_00 --index -1 --format gif --workers 8
+python export_simulations.py results/best_individual_parameters_*.csv --scenario 3 --format none --output_dir overviews
+'''
+
+import matplotlib
+matplotlib.use('Agg')
+import argparse
+import glob
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from multiprocessing import Pool
+import numpy as np
+import matplotlib.pyplot as plt
+from PIL import Image
+from parameters import read_parameters
+from renderer import TrajectoryAnimation
+from trajectories import TrajectoryStore, plot_positions
+
+
+def simulate_parameters(task):
+	'''
+	Function to simulate the parameters of a best individual parameters file, in a process of the pool.
+	Returns the tuple (positions, obstacles, radius, fitness).
+	'''
+	from inspyred_functions import simulation_trajectory # imported only here: the trajectory stores are exported without RVO2
+	scenario, filename, max_steps = task
+	fitness, trajectory = simulation_trajectory(scenario, read_parameters(filename), max_steps)
+	return np.asarray(trajectory['history'], dtype=float), trajectory['obstacles'], trajectory['radius'], fitness
+
+
+def render_frames(task):
+	'''
+	Function to render a chunk of the frames of an animation to PNG files, in a process of the pool.
+	The first frame of the chunk draws the trails from the start, the next ones only their new part.
+	'''
+	positions, obstacles, radius, title, frames, pattern, dpi, step = task
+	fig, ax = plt.subplots(dpi=dpi)
+	ax.set_title(title)
+	animation = TrajectoryAnimation(ax, positions, radius, obstacles, step=step)
+	for i, frame in frames:
+		animation.draw_frame(fig.canvas, frame)
+		Image.fromarray(np.asarray(fig.canvas.buffer_rgba())).convert('RGB').save(pattern.format(i))
+	plt.close(fig)
+	return len(frames)
+
+
+def export_simulation(pool, positions, obstacles, radius, title, base_name, args):
+	'''
+	Function to save the path overview image and the animation of a simulation.
+	'''
+	fig, ax = plt.subplots(dpi=args.dpi)
+	plot_positions(ax, positions, obstacles, radius)
+	ax.set_title(title)
+	fig.savefig(base_name + '_paths.png')
+	plt.close(fig)
+	outputs = [base_name + '_paths.png']
+	if args.format == 'none':
+		return outputs
+
+	frames = list(range(0, len(positions) - 1, args.step)) + [len(positions) - 1]
+	frames_dir = base_name + '_frames' if args.format == 'png' else tempfile.mkdtemp(prefix='frames_', dir=args.output_dir)
+	if not os.path.isdir(frames_dir):
+		os.makedirs(frames_dir)
+	pattern = os.path.join(frames_dir, 'frame_{0:05d}.png')
+	numbered = list(enumerate(frames))
+	num_chunks = min(len(numbered), args.workers * 2)
+	chunks = [numbered[len(numbered) * k // num_chunks:len(numbered) * (k + 1) // num_chunks] for k in range(num_chunks)]
+	pool.map(render_frames, [(positions, obstacles, radius, title, chunk, pattern, args.dpi, args.step) for chunk in chunks])
+
+	if args.format == 'png':
+		outputs.append(frames_dir)
+	elif args.format == 'gif':
+		images = [Image.open(pattern.format(i)) for i in range(len(frames))]
+		images[0].save(base_name + '.gif', save_all=True, append_images=images[1:], duration=int(1000 / args.fps), loop=0)
+		outputs.append(base_name + '.gif')
+	else:
+		ffmpeg = shutil.which(matplotlib.rcParams['animation.ffmpeg_path']) or shutil.which('ffmpeg')
+		if ffmpeg is None:
+			print('ffmpeg not found: the frames of {0} are kept in {1}'.format(base_name, frames_dir))
+			return outputs + [frames_dir]
+		subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-framerate', str(args.fps), '-i', os.path.join(frames_dir, 'frame_%05d.png'),
+						'-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', base_name + '.mp4'], check=True)
+		outputs.append(base_name + '.mp4')
+	if args.format != 'png':
+		shutil.rmtree(frames_dir)
+	return outputs
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Export simulations to images and animations without a window.')
+	parser.add_argument('inputs', nargs='+', help='best individual parameters files, trajectory store directories or glob patterns of them')
+	parser.add_argument('--scenario', type=int, default=None, help='scenario of the parameters files (default: from their names)')
+	parser.add_argument('--index', type=int, nargs='+', default=[-1], help='records of the trajectory stores (-1 for the best individual at the end of the run)')
+	parser.add_argument('--format', choices=['mp4', 'gif', 'png', 'none'], default='mp4', help='format of the animations (none for the path overviews only)')
+	parser.add_argument('--step', type=int, default=5, help='number of time-steps between two frames')
+	parser.add_argument('--fps', type=int, default=30, help='frames per second of the videos')
+	parser.add_argument('--dpi', type=int, default=100)
+	parser.add_argument('--max_steps', type=int, default=None, help='step budget of the simulations of the parameters files')
+	parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of processes which simulate and render')
+	parser.add_argument('--output_dir', default='exports')
+	args = parser.parse_args()
+
+	inputs = []
+	for pattern in args.inputs:
+		inputs.extend(sorted(glob.glob(pattern)) or [pattern])
+	if not os.path.isdir(args.output_dir):
+		os.makedirs(args.output_dir)
+
+	parameters_files = [filename for filename in inputs if not os.path.isdir(filename)]
+	tasks = []
+	for filename in parameters_files:
+		scenario = args.scenario
+		if scenario is None:
+			match = re.search(r'scenario(\d)', os.path.basename(filename))
+			if match is None:
+				parser.error('the scenario of {0} is unknown, set it with --scenario'.format(filename))
+			scenario = int(match.group(1))
+		tasks.append((scenario, filename, args.max_steps))
+
+	with Pool(args.workers) as pool:
+		simulations = []
+		for (scenario, filename, max_steps), (positions, obstacles, radius, fitness) in zip(tasks, pool.map(simulate_parameters, tasks)):
+			name = os.path.splitext(os.path.basename(filename))[0]
+			simulations.append((positions, obstacles, radius, 'Scenario {0}, fitness {1:.6g}'.format(scenario, fitness), name))
+		for directory in inputs:
+			if not os.path.isdir(directory):
+				continue
+			store = TrajectoryStore(directory)
+			for index in args.index:
+				i = store.final() if index == -1 else index
+				title = 'Scenario {0}, generation {1}, fitness {2:.6g}'.format(store.scenario, int(store.index[i, 2]), store.index[i, 5])
+				simulations.append((store.trajectory(i), store.obstacles, store.radius, title, '{0}_record{1}'.format(os.path.basename(directory.rstrip('/\\')), i)))
+
+		for positions, obstacles, radius, title, name in simulations:
+			outputs = export_simulation(pool, positions, obstacles, radius, title, os.path.join(args.output_dir, name), args)
+			print('{0}: {1}'.format(name, ', '.join(outputs)))
+
+
+
+if __name__ == '__main__':
+	main()
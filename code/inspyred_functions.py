@@ -2,7 +2,8 @@
 inspyred_functions.py
 This module contains the utility functions for inspyred optimizer, such as the generator, the observer and the evaluators.
 '''
-from math import sqrt
+from math import sqrt, exp
+import numpy as np
 import random
 import matplotlib.pyplot as plt
 import matplotlib
@@ -10,7 +11,18 @@ import rvo2
 from math import isclose
 import statistics
 from tqdm import tqdm as tq
-from datetime import datetime 
+from datetime import datetime
+from time import time
+from inspyred.ec.variators import mutator
+from renderer import TrajectoryAnimation
+from trajectory_metrics import make_metrics, start_metrics, update_metrics, metric_results, metric_classes
+from parameters import timeout_fitness
+from surrogate import is_predicted, simulated_best
+from sampling import latin_hypercube, sobol_sequence, space_filling_design
+
+# Initial positions and targets of the four agents in every scenario (the agents cross the arena diagonally)
+agent_starts = [(0, 0), (10, 0), (10, 10), (0, 10)]
+agent_goals = [(10, 10), (0, 10), (0, 0), (10, 0)]
 
 def distance(point1, point2):
 	'''
@@ -23,6 +35,13 @@ def distance(point1, point2):
 	x2, y2 = point2
 	return sqrt((x1-x2)**2 + (y1-y2)**2)
 
+def initial_velocity(start, goal):
+	'''
+	Function to compute the preferred velocity of an agent before the first time-step: one unit per axis towards its target, e.g. (1, 1) from (0, 0) to (10, 10).
+	'''
+	return (1 if goal[0] >= start[0] else -1, 1 if goal[1] >= start[1] else -1)
+
+
 def check_collisions(point1, point2, rad):
 	'''
 	Function to check if two agents are colliding.
@@ -39,105 +58,252 @@ def check_collisions(point1, point2, rad):
 
 def generate_population(random, args):
 	'''
-	Function to generate the initial population of individuals. It makes use of the boundaries set in the "collision_avoidance_EC_scenario" file.
+	Function to generate the initial population of individuals. It makes use of the boundaries of the chromosomes set in the settings (see settings.py).
+	The "initializer" in args selects how the genes are drawn:
+	- 'uniform' --> each gene of each individual is drawn independently from a uniform distribution
+	- 'lhs' --> the whole population is sampled at once with Latin hypercube sampling
+	- 'sobol' --> the whole population is sampled at once from a scrambled Sobol sequence
+	With 'lhs' and 'sobol' a design of "num_selected" individuals (the population size) is sampled at the first call with the run's random
+	number generator, and each following call returns its next individual, so the population is reproducible under the run's seed.
+	With the 'self_adaptive' "mutation_operator" the chromosome is followed by the initial step sizes of its genes (see self_adaptive_mutation).
 	'''
-	chromosome = []
 	bounder = args["_ec"].bounder
+	initializer = args.setdefault('initializer', 'uniform')
 
-	for lo, hi in zip(bounder.lower_bound, bounder.upper_bound):
-		chromosome.append(random.uniform(lo, hi))
+	if initializer == 'uniform':
+		chromosome = []
+		for lo, hi in zip(bounder.lower_bound, bounder.upper_bound):
+			chromosome.append(random.uniform(lo, hi))
+	else:
+		design = args.get('initial_design')
+		if not design:
+			design = space_filling_design(random, args.get('num_selected', 100), bounder.lower_bound, bounder.upper_bound, initializer)
+			design.reverse()
+			args['initial_design'] = design
+		chromosome = design.pop()
+
+	if args.setdefault('mutation_operator', 'gaussian') == 'self_adaptive':
+		chromosome.extend([args.setdefault('initial_step_size', 0.1)] * len(bounder.lower_bound))
 	return chromosome
 
 
+@mutator
+def self_adaptive_mutation(random, candidate, args):
+	'''
+	Function to mutate a candidate with self-adaptive Gaussian mutation.
+	The candidate carries, after its genes, one mutation step size per gene, relative to the range of the gene, which evolves with it:
+	each step size is first multiplied by the log-normal factor exp(tau_global * N(0, 1) + tau_gene * N_i(0, 1)) and clipped to ["min_step_size", "max_step_size"],
+	then each gene is mutated, with probability "mutation_rate", by a Gaussian noise whose standard deviation is its step size times its range.
+	The step sizes which produce good offspring survive with them, so the search is wide in the first generations and fine near convergence.
+	Returns the mutant, i.e. the mutated genes followed by the new step sizes.
+	- random --> random number generator of the run
+	- candidate --> chromosome to mutate (the genes and, optionally, their step sizes; "initial_step_size" is used when they are missing)
+	'''
+	bounder = args['_ec'].bounder
+	mut_rate = args.setdefault('mutation_rate', 0.1)
+	initial_step = args.setdefault('initial_step_size', 0.1)
+	min_step = args.setdefault('min_step_size', 1e-3)
+	max_step = args.setdefault('max_step_size', 0.5)
+	num_genes = len(bounder.lower_bound)
+	tau_global = 1.0 / sqrt(2.0 * num_genes)
+	tau_gene = 1.0 / sqrt(2.0 * sqrt(num_genes))
+
+	mutant = list(candidate[:num_genes])
+	steps = list(candidate[num_genes:2 * num_genes])
+	if len(steps) < num_genes:
+		steps = [initial_step] * num_genes
+	common = tau_global * random.gauss(0, 1)
+	for i, (lo, hi) in enumerate(zip(bounder.lower_bound, bounder.upper_bound)):
+		# The step sizes may be negative or out of range after the heuristic crossover
+		steps[i] = min(max(abs(steps[i]) * exp(common + tau_gene * random.gauss(0, 1)), min_step), max_step)
+		if random.random() < mut_rate:
+			mutant[i] += random.gauss(0, steps[i] * (hi - lo))
+	mutant = bounder(mutant, args)
+	return mutant + steps
+
+
 def custom_observer(population, num_generations, num_evaluations, args):
 	'''
 	Funtion to plot the main evolution statistics of the optimizer.
 	'''
-	best = max(population)
-	print('Generations: {0}  Evaluations: {1}  Best: {2}'.format(num_generations, num_evaluations, str(best.fitness)))
+	best = simulated_best(population)
+	print('Generations: {0}  Evaluations: {1}  Skipped: {2}  Best: {3}'.format(num_generations, num_evaluations, args.get('num_skipped_evaluations', 0), str(best.fitness)))
+
 
+def progress_observer(population, num_generations, num_evaluations, args):
+	'''
+	Function to save the progress of the optimizer to the "progress_file" in args, one row per generation.
+	Each row contains: generation, evaluations, simulations actually run, elapsed seconds, best fitness,
+	timed-out simulations and recycled workers (see workers.py).
+	The simulations differ from the evaluations when some fitness values are obtained without simulating (e.g. by the surrogate).
+	The best fitness is the one of the best simulated individual, never a fitness predicted by the surrogate.
+	'''
+	progress_file = args['progress_file']
+	best = simulated_best(population)
+	num_simulations = num_evaluations - args.get('num_skipped_evaluations', 0)
+	elapsed = time() - args['start_time']
+	progress_file.write('{0}, {1}, {2}, {3}, {4}, {5}, {6}\n'.format(num_generations, num_evaluations, num_simulations, elapsed, best.fitness,
+														args.get('num_timeouts', 0), args.get('num_recycles', 0)))
+	progress_file.flush()
 
-def plot_agents(history, radius, ax):
+
+def simulation_termination(population, num_generations, num_evaluations, args):
+	'''
+	Function to terminate the evolution when the number of simulations actually run reaches "max_evaluations" in args.
+	Unlike inspyred's evaluation_termination, the evaluations obtained without simulating (see cached_evaluation) do not consume the budget.
+	To avoid endless runs of a converged population, whose offspring are all already known, the evolution also stops
+	after "max_total_evaluations" evaluations (default: 10 times "max_evaluations").
+	'''
+	max_evaluations = args.setdefault('max_evaluations', len(population))
+	max_total_evaluations = args.setdefault('max_total_evaluations', 10 * max_evaluations)
+	num_simulations = num_evaluations - args.get('num_skipped_evaluations', 0)
+	return num_simulations >= max_evaluations or num_evaluations >= max_total_evaluations
+
+
+def remaining_budget(num_evaluations, args):
+	'''
+	Function to calculate the evaluations left in the budget of the run, counted as the terminator of the run counts them:
+	the simulations actually run with "budget_counts_simulations" in args (see simulation_termination), every evaluation otherwise.
+	Returns the number of evaluations left (negative when the budget is exceeded).
+	'''
+	max_evaluations = args.get('max_evaluations', 0)
+	if not args.get('budget_counts_simulations', False):
+		return max_evaluations - num_evaluations
+	num_simulations = num_evaluations - args.get('num_skipped_evaluations', 0)
+	return min(max_evaluations - num_simulations, args.get('max_total_evaluations', 10 * max_evaluations) - num_evaluations)
+
+
+def cached_evaluation(candidates, args):
+	'''
+	Funtion to evaluate the candidates without simulating again the ones whose fitness is already known.
+	An offspring identical to an individual of the current population (i.e. left unchanged by crossover and mutation) inherits its fitness,
+	and identical candidates within the same batch are simulated only once, by the "cache_evaluator" in args.
+	The individuals whose fitness was predicted by the surrogate (see surrogate.py) are not inherited, their candidates are evaluated again.
+	The avoided evaluations are counted in "num_inherited_evaluations" and "num_duplicate_evaluations", and added to "num_skipped_evaluations" in args.
+	- candidates --> candidates chromosomes generated by the EC
+	'''
+	evaluator = args['cache_evaluator']
+	num_genes = len(args['_ec'].bounder.lower_bound)
+
+	known = {}
+	for individual in args['_ec'].population:
+		if not is_predicted(individual):
+			known[tuple(individual.candidate[:num_genes])] = individual.fitness
+
+	unique = []
+	positions = {}
+	inherited = 0
+	for chromosome in candidates:
+		key = tuple(chromosome[:num_genes])
+		if key in known:
+			inherited += 1
+		elif key not in positions:
+			positions[key] = len(unique)
+			unique.append(chromosome)
+
+	if len(unique) > 0:
+		unique_fitness = evaluator(unique, args)
+		for key, index in positions.items():
+			known[key] = unique_fitness[index]
+
+	duplicates = len(candidates) - len(unique) - inherited
+	args['num_inherited_evaluations'] = args.get('num_inherited_evaluations', 0) + inherited
+	args['num_duplicate_evaluations'] = args.get('num_duplicate_evaluations', 0) + duplicates
+	args['num_skipped_evaluations'] = args.get('num_skipped_evaluations', 0) + inherited + duplicates
+	return [known[tuple(chromosome[:num_genes])] for chromosome in candidates]
+
+
+def fitness_objectives(errors, arrival_steps, collisions, n_iterations, timed_out=False):
+	'''
+	Function to collect the components of the fitness function of a simulation, so that the fitness can be re-scored without simulating again.
+	Returns a dictionary with the aggregated components (also the normalized ones, which are not used by the fitness function)
+	followed by the final error ("error_<i>") and the arrival time-step ("arrival_step_<i>") of each agent.
+	- errors --> distances of the agents from their targets at the end of the simulation
+	- arrival_steps --> time-steps at which the agents reached their targets (the number of iterations if they did not)
+	- collisions --> number of collisions
+	- n_iterations --> maximum number of time-steps of the simulation
+	- timed_out --> boolean value, True if the simulation was stopped by its step budget
+	'''
+	mean_error = statistics.mean(errors)
+	mean_duration = sum(arrival_steps) / len(arrival_steps)
+	objectives = {'n_iterations': n_iterations,
+				'collisions': collisions,
+				'collisions_norm': collisions / (6*n_iterations),
+				'mean_error': mean_error,
+				'mean_error_norm': mean_error / distance((0,0), (10,10)),
+				'mean_duration': mean_duration,
+				'mean_duration_norm': mean_duration / n_iterations,
+				'timed_out': float(timed_out)}
+	for i, error in enumerate(errors):
+		objectives['error_{0}'.format(i)] = error
+	for i, step in enumerate(arrival_steps):
+		objectives['arrival_step_{0}'.format(i)] = step
+	return objectives
+
+
+def formula_fitness(formula, fitness, objectives):
+	'''
+	Function to compute the fitness of a simulation with a fitness formula instead of the fitness function of the scenario.
+	Returns the value of the formula, or the fitness itself if the simulation was stopped by its step budget (i.e. "timeout_fitness").
+	- formula --> Python expression of the components of the fitness and of the results of the metrics (see fitness_objectives and trajectory_metrics.py),
+		evaluated with numpy as "np" and no builtins, e.g. "mean_error + mean_duration_norm + collisions + 0.1 * path_length" (the same as in rescore_objectives.py)
+	- fitness --> fitness of the simulation computed by the scenario
+	- objectives --> components of the fitness of the simulation
+	'''
+	if objectives['timed_out']:
+		return fitness
+	return float(eval(formula, {'np': np, '__builtins__': {}}, objectives))
+
+
+def check_fitness_formula(formula, metric_names=None):
+	'''
+	Function to check a fitness formula before the run, by evaluating it on placeholder components (every component of fitness_objectives
+	and every result of the selected metrics, all equal to 1).
+	Raises ValueError if the formula is not a valid expression or uses a name which is not a component, e.g. a misspelled metric.
+	- formula --> fitness formula, see formula_fitness
+	- metric_names --> names of the metrics computed in the simulations (None for no metrics)
+	'''
+	try:
+		compile(formula, 'fitness_formula', 'eval')
+	except SyntaxError as error:
+		raise ValueError('the fitness formula {0!r} is not a valid expression: {1}'.format(formula, error))
+	objectives = fitness_objectives([1.0] * len(agent_starts), [1] * len(agent_starts), 1, 1)
+	for name in metric_names or []:
+		objectives.update((column, 1.0) for column in metric_classes[name].columns)
+	try:
+		eval(formula, {'np': np, '__builtins__': {}}, objectives)
+	except NameError as error:
+		raise ValueError('the fitness formula {0!r} uses an unknown component ({1}); the components are: {2}'.format(formula, error, ', '.join(objectives)))
+	except ArithmeticError:
+		pass
+
+
+def plot_agents(history, radius, ax, obstacles=None):
 	'''
 	Function to plot the agents during their path in the simulation.
-	It plots the four agents at each time step, which are represented by a point in their location and a circle of radius equal to the radius parameter of the simulator.
+	It animates the four agents, which are represented by a circle of radius equal to the radius parameter of the simulator, followed by the line of their path
+	(see TrajectoryAnimation in renderer.py). The obstacles are drawn once and every 5th time-step is a frame.
+	Returns the timer of the animation, which must be kept until the figure is closed.
 	- history --> history instance which contains all the n_iterations tuplets of the the four agents, grouped by time-step.
+	- obstacles --> list of the obstacles of the scenario, each one a list of vertices
 	'''
-	for step in tq(range(history.__len__())):
-			ag_nr = 0
-			if step % 5 == 0:
-				for x,y in history[step]:
-					if ag_nr == 0:
-						c0 = matplotlib.patches.Circle((x, y), radius=radius, facecolor='none', edgecolor='b', label='Agent 0')
-						plt.scatter(x, y, s=1, marker='o', color='b')
-						ax.add_artist(c0)
-					elif ag_nr == 1:
-						c1 = matplotlib.patches.Circle((x, y), radius=radius, facecolor='none', edgecolor='g', label='Agent 1')
-						plt.scatter(x, y, s=1, marker='o', color='g')
-						ax.add_artist(c1)
-					elif ag_nr == 2:
-						c2 = matplotlib.patches.Circle((x, y), radius=radius, facecolor='none', edgecolor='r', label='Agent 2')
-						plt.scatter(x, y, s=1, marker='o', color='r')
-						ax.add_artist(c2)
-					elif ag_nr == 3:
-						c3 = matplotlib.patches.Circle((x, y), radius=radius, facecolor='none', edgecolor='y', label='Agent 3')
-						plt.scatter(x, y, s=1, marker='o', color='y')
-						ax.add_artist(c3)
-					ag_nr += 1
-			plt.legend(handles=[c0, c1, c2, c3], loc='best')
-			plt.draw()
-			plt.pause(1e-30)
-
-
-def plot_paths(history, radius, ax):
+	return TrajectoryAnimation(ax, history, radius, obstacles).animate()
+
+
+def plot_paths(history, radius, ax, obstacles=None):
 	'''
 	Function to plot the agents path in the simulation.
-	It plots the path of the four agents during the simulation. Each agent's path is a line that evolves at each time-step according to the "history" input parameter.
+	It animates the path of the four agents during the simulation, starting from the circles of their initial positions. Each agent's path is a line
+	that evolves at each time-step according to the "history" input parameter.
+	Returns the timer of the animation, which must be kept until the figure is closed.
 	- history --> history instance which contains all the n_iterations tuplets of the the four agents, grouped by time-step.
+	- obstacles --> list of the obstacles of the scenario, each one a list of vertices
 	'''
-	for step in tq(range(history.__len__())):
-			ag_nr = 0
-			if step == 0:
-				for x,y in history[step]:
-					if ag_nr == 0:
-						c0 = matplotlib.patches.Circle((x, y), radius=radius, facecolor='none', edgecolor='b', label='Agent 0')
-						plt.scatter(x, y, s=1, marker='o', color='b')
-						ax.add_artist(c0)
-					elif ag_nr == 1:
-						c1 = matplotlib.patches.Circle((x, y), radius=radius, facecolor='none', edgecolor='g', label='Agent 1')
-						plt.scatter(x, y, s=1, marker='o', color='g')
-						ax.add_artist(c1)
-					elif ag_nr == 2:
-						c2 = matplotlib.patches.Circle((x, y), radius=radius, facecolor='none', edgecolor='r', label='Agent 2')
-						plt.scatter(x, y, s=1, marker='o', color='r')
-						ax.add_artist(c2)
-					elif ag_nr == 3:
-						c3 = matplotlib.patches.Circle((x, y), radius=radius, facecolor='none', edgecolor='y', label='Agent 3')
-						plt.scatter(x, y, s=1, marker='o', color='y')
-						ax.add_artist(c3)
-					ag_nr += 1
-			else:
-				for x,y in history[step]:
-					ag0 = history[step-1][0]
-					ag1 = history[step-1][1]
-					ag2 = history[step-1][2]
-					ag3 = history[step-1][3]
-					if ag_nr == 0:
-						plt.plot([ag0[0], x], [ag0[1], y], color='b', label='Agent0')
-					elif ag_nr == 1:
-						plt.plot([ag1[0], x], [ag1[1], y], color='g', label='Agent1')
-					elif ag_nr == 2:
-						plt.plot([ag2[0], x], [ag2[1], y], color='r', label='Agent2')
-					elif ag_nr == 3:
-						plt.plot([ag3[0], x], [ag3[1], y], color='y', label='Agent3')
-					ag_nr += 1
-			plt.legend(handles=[c0, c1, c2, c3], loc='best')
-			plt.draw()
-			plt.pause(1e-30)
-
-
-
-def collision_avoidance_scenario1(time_step, param0, param1, param2, param3, rad, param4, gui_interface=False):
+	return TrajectoryAnimation(ax, history, radius, obstacles, move_agents=False, step=1).animate(interval=5)
+
+
+
+def collision_avoidance_scenario1(time_step, param0, param1, param2, param3, rad, param4, gui_interface=False, return_objectives=False, max_steps=None, return_trajectory=False, starts=None, goals=None, metrics=None, n_iterations=None):
 	'''
 	Function to run a simulation with RVO2 simulator in scenario I environment. It is used to evaluate the fitness function value of a set of parameters that represent a candidate solution.
 	Returns the fitness function value for the input parameters set.
@@ -149,6 +315,15 @@ def collision_avoidance_scenario1(time_step, param0, param1, param2, param3, rad
 	- rad --> agents radius
 	- param4 --> Fifth parameter to be optimized, which correspond to max_speed
 	- gui_interface --> boolean value use to activate (True) or deactivate (False) the plot of the simulation at the end of the agents path computation.
+	- return_objectives --> boolean value used to return (True) also the components of the fitness function (see fitness_objectives), as the tuple (fitness, objectives)
+	- max_steps --> step budget of the simulation (None for no budget): if the agents did not reach their targets within it, the fitness is "timeout_fitness"
+	- return_trajectory --> boolean value used to return (True) also the trajectory of the simulation, as the tuple (fitness, trajectory),
+		where trajectory is a dictionary with the positions of the agents at each time-step ("history"), the "obstacles" and the agents "radius"
+	- starts, goals --> lists of the initial positions and of the targets of the four agents (None for the ones of the scenario, "agent_starts" and "agent_goals")
+	- metrics --> list of streaming metrics (see trajectory_metrics.py) updated at each time-step with the positions of the agents,
+		whose results are added to the components of the fitness function (None for no metrics)
+	- n_iterations --> number of time-steps of the simulation (None for int(time_step*100000), the one of the training); it fixes the simulated time
+		when the time-step changes, e.g. with the horizon of the training, 1666 time-steps of 1/60 s, n_iterations = int(round(1666/60. / time_step))
 	'''
 	gui = gui_interface
 
@@ -166,10 +341,12 @@ def collision_avoidance_scenario1(time_step, param0, param1, param2, param3, rad
 	t_horiz_obst = param3
 	radius = rad
 	max_speed = param4
+	starts = agent_starts if starts is None else starts
+	goals = agent_goals if goals is None else goals
 
 	sim = rvo2.PyRVOSimulator(t_step, neigh_dist, max_neigh, t_horiz, t_horiz_obst, radius, max_speed)
 
-	n_iterations = int(t_step*100000)
+	n_iterations = int(t_step*100000) if n_iterations is None else n_iterations
 	r_buffer = 1e-1
 
 
@@ -179,12 +356,13 @@ def collision_avoidance_scenario1(time_step, param0, param1, param2, param3, rad
 	boundary4 = [(11, -1), (-1, -1), (-1.5, -1.5), (11.5, -1.5)]
 
 	vertices = [(6, 4), (6, 6), (4, 6), (4, 4)]
+	obstacles = [boundary1, boundary2, boundary3, boundary4, vertices]
 
 
-	a0 = sim.addAgent((0, 0))
-	a1 = sim.addAgent((10, 0))
-	a2 = sim.addAgent((10, 10))
-	a3 = sim.addAgent((0, 10))
+	a0 = sim.addAgent(tuple(starts[0]))
+	a1 = sim.addAgent(tuple(starts[1]))
+	a2 = sim.addAgent(tuple(starts[2]))
+	a3 = sim.addAgent(tuple(starts[3]))
 
 	b1 = sim.addObstacle(boundary1)
 	b2 = sim.addObstacle(boundary2)
@@ -194,14 +372,14 @@ def collision_avoidance_scenario1(time_step, param0, param1, param2, param3, rad
 	o1 = sim.addObstacle(vertices)
 	sim.processObstacles()
 
-	sim.setAgentPrefVelocity(a0, (1, 1))
-	sim.setAgentPrefVelocity(a1, (-1, 1))
-	sim.setAgentPrefVelocity(a2, (-1, -1))
-	sim.setAgentPrefVelocity(a3, (1, -1))
+	sim.setAgentPrefVelocity(a0, initial_velocity(starts[0], goals[0]))
+	sim.setAgentPrefVelocity(a1, initial_velocity(starts[1], goals[1]))
+	sim.setAgentPrefVelocity(a2, initial_velocity(starts[2], goals[2]))
+	sim.setAgentPrefVelocity(a3, initial_velocity(starts[3], goals[3]))
 
 	history = []
-	history.append([(0,0), (10,0), (10,10), (0,10)])
-	positions = [(0,0), (10,0), (10,10), (0,10)]
+	history.append([tuple(start) for start in starts])
+	positions = [tuple(start) for start in starts]
 
 	ag0_results = {'agent_nr': 0, 'found': False, 'timestep': n_iterations, 'position': []}
 	ag1_results = {'agent_nr': 1, 'found': False, 'timestep': n_iterations, 'position': []}
@@ -209,12 +387,18 @@ def collision_avoidance_scenario1(time_step, param0, param1, param2, param3, rad
 	ag3_results = {'agent_nr': 3, 'found': False, 'timestep': n_iterations, 'position': []}
 
 	collisions = 0
+	timed_out = False
+	if metrics is not None:
+		start_metrics(metrics, starts, t_step, radius, obstacles)
 
 	for step in range(n_iterations):
 		if ag0_results['found'] == True and ag1_results['found'] == True and ag2_results['found'] == True and ag3_results['found'] == True:
 			if gui:
 				print('ALL AGENTS REACHED THEIR TARGETS! SIMULATION COMPLETED...')
 			break
+		if max_steps is not None and step >= max_steps:
+			timed_out = True
+			break
 
 		sim.doStep()
 		positions = []
@@ -224,6 +408,8 @@ def collision_avoidance_scenario1(time_step, param0, param1, param2, param3, rad
 			positions.append(pos_tuple)
 
 		history.append(positions)
+		if metrics is not None:
+			update_metrics(metrics, [sim.getAgentPosition(agent_no) for agent_no in (a0, a1, a2, a3)])
 
 		if check_collisions(positions[0], positions[1], radius):
 			collisions += 1
@@ -238,33 +424,33 @@ def collision_avoidance_scenario1(time_step, param0, param1, param2, param3, rad
 		if check_collisions(positions[2], positions[3], radius):
 			collisions += 1
 
-		sim.setAgentPrefVelocity(a0, (10 - positions[0][0], 10 - positions[0][1]))
-		sim.setAgentPrefVelocity(a1, (0 - positions[1][0], 10 - positions[1][1]))
-		sim.setAgentPrefVelocity(a2, (0 - positions[2][0], 0 - positions[2][1]))
-		sim.setAgentPrefVelocity(a3, (10 - positions[3][0], 0 - positions[3][1]))
+		sim.setAgentPrefVelocity(a0, (goals[0][0] - positions[0][0], goals[0][1] - positions[0][1]))
+		sim.setAgentPrefVelocity(a1, (goals[1][0] - positions[1][0], goals[1][1] - positions[1][1]))
+		sim.setAgentPrefVelocity(a2, (goals[2][0] - positions[2][0], goals[2][1] - positions[2][1]))
+		sim.setAgentPrefVelocity(a3, (goals[3][0] - positions[3][0], goals[3][1] - positions[3][1]))
 
-		if isclose(history[-1][0][0], 10, abs_tol=r_buffer) == True and isclose(history[-1][0][1], 10, abs_tol=r_buffer) == True and ag0_results['found'] == False:
+		if isclose(history[-1][0][0], goals[0][0], abs_tol=r_buffer) == True and isclose(history[-1][0][1], goals[0][1], abs_tol=r_buffer) == True and ag0_results['found'] == False:
 			ag0_results['found'] = True
 			ag0_results['timestep'] = step
 			ag0_results['position'] = positions[0]
 			if gui == True:
 				print('AGENT 0 TARGET REACHED: %s' % str(positions[0]))
 		
-		if isclose(history[-1][1][0], 0, abs_tol=r_buffer) == True and isclose(history[-1][1][1], 10, abs_tol=r_buffer) == True and ag1_results['found'] == False:
+		if isclose(history[-1][1][0], goals[1][0], abs_tol=r_buffer) == True and isclose(history[-1][1][1], goals[1][1], abs_tol=r_buffer) == True and ag1_results['found'] == False:
 			ag1_results['found'] = True
 			ag1_results['timestep'] = step
 			ag1_results['position'] = positions[1]
 			if gui == True:
 				print('AGENT 1 TARGET REACHED: %s' % str(positions[1]))
 		
-		if isclose(history[-1][2][0], 0, abs_tol=r_buffer) == True and isclose(history[-1][2][1], 0, abs_tol=r_buffer) == True and ag2_results['found'] == False:
+		if isclose(history[-1][2][0], goals[2][0], abs_tol=r_buffer) == True and isclose(history[-1][2][1], goals[2][1], abs_tol=r_buffer) == True and ag2_results['found'] == False:
 			ag2_results['found'] = True
 			ag2_results['timestep'] = step
 			ag2_results['position'] = positions[2]
 			if gui==True:
 				print('AGENT 2 TARGET REACHED: %s' % str(positions[2]))
 		
-		if isclose(history[-1][3][0], 10, abs_tol=r_buffer) == True and isclose(history[-1][3][1], 0, abs_tol=r_buffer) == True and ag3_results['found'] == False:
+		if isclose(history[-1][3][0], goals[3][0], abs_tol=r_buffer) == True and isclose(history[-1][3][1], goals[3][1], abs_tol=r_buffer) == True and ag3_results['found'] == False:
 			ag3_results['found'] = True
 			ag3_results['timestep'] = step
 			ag3_results['position'] = positions[3]
@@ -275,37 +461,41 @@ def collision_avoidance_scenario1(time_step, param0, param1, param2, param3, rad
 		print('Number of collisions: %d'% collisions)
 
 	errors = []
-	errors.append(distance(history[-1][0], (10.0, 10.0)))
-	errors.append(distance(history[-1][1], (0.0, 10.0)))
-	errors.append(distance(history[-1][2], (0.0, 0.0)))
-	errors.append(distance(history[-1][3], (10.0, 0.0)))
+	errors.append(distance(history[-1][0], goals[0]))
+	errors.append(distance(history[-1][1], goals[1]))
+	errors.append(distance(history[-1][2], goals[2]))
+	errors.append(distance(history[-1][3], goals[3]))
 
 	mean_error = statistics.mean(errors)
 	mean_error_norm = mean_error / distance((0,0), (10,10))
 	collisions_norm = collisions / (6*n_iterations)
 	mean_duration = (ag0_results['timestep'] + ag1_results['timestep'] + ag2_results['timestep'] + ag3_results['timestep']) / 4
 	mean_duration_norm = mean_duration / n_iterations
+	objectives = fitness_objectives(errors, [ag0_results['timestep'], ag1_results['timestep'], ag2_results['timestep'], ag3_results['timestep']], collisions, n_iterations, timed_out)
+	if metrics is not None:
+		objectives.update(metric_results(metrics))
 
 
 	fitness = mean_error + mean_duration_norm + collisions
+	if timed_out:
+		fitness = timeout_fitness
 
 	if gui == True:
 		print('Fitness: {0} for set of parameters: [{1}, {2}, {3}, {4}, {5}]'.format(fitness, param0, param1, param2, param3, param4))
 		plt.show()
 		fig, ax = plt.subplots()
-		plt.fill([boundary1[0][0], boundary1[1][0], boundary1[2][0], boundary1[3][0]], [boundary1[0][1], boundary1[1][1], boundary1[2][1], boundary1[3][1]], 'gray')
-		plt.fill([boundary2[0][0], boundary2[1][0], boundary2[2][0], boundary2[3][0]], [boundary2[0][1], boundary2[1][1], boundary2[2][1], boundary2[3][1]], 'gray')
-		plt.fill([boundary3[0][0], boundary3[1][0], boundary3[2][0], boundary3[3][0]], [boundary3[0][1], boundary3[1][1], boundary3[2][1], boundary3[3][1]], 'gray')
-		plt.fill([boundary4[0][0], boundary4[1][0], boundary4[2][0], boundary4[3][0]], [boundary4[0][1], boundary4[1][1], boundary4[2][1], boundary4[3][1]], 'gray')
-		plt.fill([vertices[0][0], vertices[1][0], vertices[2][0], vertices[3][0]], [vertices[0][1], vertices[1][1], vertices[2][1], vertices[3][1]], 'gray')
 
-		plot_agents(history, radius, ax)
-		#plot_paths(history, radius, ax) #DECOMMENT IF ONLY AGENTS PATH LINES ARE NEEDED
+		timer = plot_agents(history, radius, ax, obstacles)
+		#timer = plot_paths(history, radius, ax, obstacles) #DECOMMENT IF ONLY AGENTS PATH LINES ARE NEEDED
 
 		plt.show()
 
 
 
+	if return_trajectory:
+		return fitness, {'history': history, 'obstacles': obstacles, 'radius': radius}
+	if return_objectives:
+		return fitness, objectives
 	return fitness
 
 
@@ -313,9 +503,17 @@ def simulation_evaluator_scenario1(candidates, args):
 	'''
 	Funtion to evaluate the parameters set generated by the EC algorithm for scenario I.
 	- candidates --> candidates chromosomes used to feed the collision-avoidance simulator
+	With "store_objectives" in args, each value is the tuple (fitness, objectives), see objectives_evaluation.
+	The "max_simulation_steps" in args is the step budget of each simulation (None for no budget).
+	The "simulation_metrics" in args are the names of the streaming metrics (see trajectory_metrics.py) added to the objectives of each simulation.
+	With "fitness_formula" in args, the fitness of each simulation is the value of the formula (see formula_fitness) instead of the fitness of the scenario.
 	'''
 	t_step = 1/60.
 	radius = 0.1
+	return_objectives = args.get('store_objectives', False)
+	max_steps = args.get('max_simulation_steps')
+	metric_names = args.get('simulation_metrics')
+	formula = args.get('fitness_formula')
 	fitness=[]
 	for chromosome in candidates:
 		neigh_dist = chromosome[0]
@@ -323,12 +521,18 @@ def simulation_evaluator_scenario1(candidates, args):
 		t_horiz = chromosome[2]
 		t_horiz_obst = chromosome[3]
 		max_speed = chromosome[4]
-		fitness.append(collision_avoidance_scenario1(t_step, neigh_dist, max_neigh, t_horiz, t_horiz_obst, radius, max_speed))
+		result = collision_avoidance_scenario1(t_step, neigh_dist, max_neigh, t_horiz, t_horiz_obst, radius, max_speed, return_objectives=return_objectives or formula is not None,
+								max_steps=max_steps, metrics=None if metric_names is None else make_metrics(metric_names))
+		if formula is not None:
+			fit, objectives = result
+			fit = formula_fitness(formula, fit, objectives)
+			result = (fit, objectives) if return_objectives else fit
+		fitness.append(result)
 	return fitness
 
 
 
-def collision_avoidance_scenario2(time_step, param0, param1, param2, param3, rad, param4, gui_interface=False):
+def collision_avoidance_scenario2(time_step, param0, param1, param2, param3, rad, param4, gui_interface=False, return_objectives=False, max_steps=None, return_trajectory=False, starts=None, goals=None, metrics=None, n_iterations=None):
 	'''
 	Function to run a simulation with RVO2 simulator in scenario II environment. It is used to evaluate the fitness function value of a set of parameters that represent a candidate solution.
 	Returns the fitness function value for the input parameters set.
@@ -340,6 +544,15 @@ def collision_avoidance_scenario2(time_step, param0, param1, param2, param3, rad
 	- rad --> agents radius
 	- param4 --> Fifth parameter to be optimized, which correspond to max_speed
 	- gui_interface --> boolean value use to activate (True) or deactivate (False) the plot of the simulation at the end of the agents path computation.
+	- return_objectives --> boolean value used to return (True) also the components of the fitness function (see fitness_objectives), as the tuple (fitness, objectives)
+	- max_steps --> step budget of the simulation (None for no budget): if the agents did not reach their targets within it, the fitness is "timeout_fitness"
+	- return_trajectory --> boolean value used to return (True) also the trajectory of the simulation, as the tuple (fitness, trajectory),
+		where trajectory is a dictionary with the positions of the agents at each time-step ("history"), the "obstacles" and the agents "radius"
+	- starts, goals --> lists of the initial positions and of the targets of the four agents (None for the ones of the scenario, "agent_starts" and "agent_goals")
+	- metrics --> list of streaming metrics (see trajectory_metrics.py) updated at each time-step with the positions of the agents,
+		whose results are added to the components of the fitness function (None for no metrics)
+	- n_iterations --> number of time-steps of the simulation (None for int(time_step*100000), the one of the training); it fixes the simulated time
+		when the time-step changes, e.g. with the horizon of the training, 1666 time-steps of 1/60 s, n_iterations = int(round(1666/60. / time_step))
 	'''
 	gui = gui_interface
 
@@ -357,10 +570,12 @@ def collision_avoidance_scenario2(time_step, param0, param1, param2, param3, rad
 	t_horiz_obst = param3
 	radius = rad
 	max_speed = param4
+	starts = agent_starts if starts is None else starts
+	goals = agent_goals if goals is None else goals
 
 	sim = rvo2.PyRVOSimulator(t_step, neigh_dist, max_neigh, t_horiz, t_horiz_obst, radius, max_speed)
 
-	n_iterations = int(t_step*100000)
+	n_iterations = int(t_step*100000) if n_iterations is None else n_iterations
 	r_buffer = 1e-1
 
 	boundary1 = [(-1, -1), (-1, 11), (-1.5, 11.5), (-1.5, -1.5)]
@@ -373,11 +588,13 @@ def collision_avoidance_scenario2(time_step, param0, param1, param2, param3, rad
 	vertices2 = [(6, 2), (8, 2), (8, 4), (6, 4)]
 	vertices3 = [(6, 6), (8, 6), (8, 8), (6, 8)]
 	vertices4 = [(2, 6), (4, 6), (4, 8), (2, 8)]
+	obstacles = [boundary1, boundary2, boundary3, boundary4, vertices1, vertices2, vertices3, vertices4]
+
 
-	a0 = sim.addAgent((0, 0))
-	a1 = sim.addAgent((10, 0))
-	a2 = sim.addAgent((10, 10))
-	a3 = sim.addAgent((0, 10))
+	a0 = sim.addAgent(tuple(starts[0]))
+	a1 = sim.addAgent(tuple(starts[1]))
+	a2 = sim.addAgent(tuple(starts[2]))
+	a3 = sim.addAgent(tuple(starts[3]))
 
 
 	b1 = sim.addObstacle(boundary1)
@@ -391,14 +608,14 @@ def collision_avoidance_scenario2(time_step, param0, param1, param2, param3, rad
 	o4 = sim.addObstacle(vertices4)
 	sim.processObstacles()
 
-	sim.setAgentPrefVelocity(a0, (1, 1))
-	sim.setAgentPrefVelocity(a1, (-1, 1))
-	sim.setAgentPrefVelocity(a2, (-1, -1))
-	sim.setAgentPrefVelocity(a3, (1, -1))
+	sim.setAgentPrefVelocity(a0, initial_velocity(starts[0], goals[0]))
+	sim.setAgentPrefVelocity(a1, initial_velocity(starts[1], goals[1]))
+	sim.setAgentPrefVelocity(a2, initial_velocity(starts[2], goals[2]))
+	sim.setAgentPrefVelocity(a3, initial_velocity(starts[3], goals[3]))
 
 	history = []
-	history.append([(0,0), (10,0), (10,10), (0,10)])
-	positions = [(0,0), (10,0), (10,10), (0,10)]
+	history.append([tuple(start) for start in starts])
+	positions = [tuple(start) for start in starts]
 
 	ag0_results = {'agent_nr': 0, 'found': False, 'timestep': n_iterations, 'position': []}
 	ag1_results = {'agent_nr': 1, 'found': False, 'timestep': n_iterations, 'position': []}
@@ -406,12 +623,18 @@ def collision_avoidance_scenario2(time_step, param0, param1, param2, param3, rad
 	ag3_results = {'agent_nr': 3, 'found': False, 'timestep': n_iterations, 'position': []}
 
 	collisions = 0
+	timed_out = False
+	if metrics is not None:
+		start_metrics(metrics, starts, t_step, radius, obstacles)
 
 	for step in range(n_iterations):
 		if ag0_results['found'] == True and ag1_results['found'] == True and ag2_results['found'] == True and ag3_results['found'] == True:
 			if gui:
 				print('ALL AGENTS REACHED THEIR TARGETS! SIMULATION COMPLETED...')
 			break
+		if max_steps is not None and step >= max_steps:
+			timed_out = True
+			break
 
 		sim.doStep()
 		positions = []
@@ -421,6 +644,8 @@ def collision_avoidance_scenario2(time_step, param0, param1, param2, param3, rad
 			positions.append(pos_tuple)
 
 		history.append(positions)
+		if metrics is not None:
+			update_metrics(metrics, [sim.getAgentPosition(agent_no) for agent_no in (a0, a1, a2, a3)])
 
 		if check_collisions(positions[0], positions[1], radius):
 			collisions += 1
@@ -435,33 +660,33 @@ def collision_avoidance_scenario2(time_step, param0, param1, param2, param3, rad
 		if check_collisions(positions[2], positions[3], radius):
 			collisions += 1
 
-		sim.setAgentPrefVelocity(a0, (10 - positions[0][0], 10 - positions[0][1]))
-		sim.setAgentPrefVelocity(a1, (0 - positions[1][0], 10 - positions[1][1]))
-		sim.setAgentPrefVelocity(a2, (0 - positions[2][0], 0 - positions[2][1]))
-		sim.setAgentPrefVelocity(a3, (10 - positions[3][0], 0 - positions[3][1]))
+		sim.setAgentPrefVelocity(a0, (goals[0][0] - positions[0][0], goals[0][1] - positions[0][1]))
+		sim.setAgentPrefVelocity(a1, (goals[1][0] - positions[1][0], goals[1][1] - positions[1][1]))
+		sim.setAgentPrefVelocity(a2, (goals[2][0] - positions[2][0], goals[2][1] - positions[2][1]))
+		sim.setAgentPrefVelocity(a3, (goals[3][0] - positions[3][0], goals[3][1] - positions[3][1]))
 
-		if isclose(history[-1][0][0], 10, abs_tol=r_buffer) == True and isclose(history[-1][0][1], 10, abs_tol=r_buffer) == True and ag0_results['found'] == False:
+		if isclose(history[-1][0][0], goals[0][0], abs_tol=r_buffer) == True and isclose(history[-1][0][1], goals[0][1], abs_tol=r_buffer) == True and ag0_results['found'] == False:
 			ag0_results['found'] = True
 			ag0_results['timestep'] = step
 			ag0_results['position'] = positions[0]
 			if gui == True:
 				print('AGENT 0 TARGET REACHED: %s' % str(positions[0]))
 		
-		if isclose(history[-1][1][0], 0, abs_tol=r_buffer) == True and isclose(history[-1][1][1], 10, abs_tol=r_buffer) == True and ag1_results['found'] == False:
+		if isclose(history[-1][1][0], goals[1][0], abs_tol=r_buffer) == True and isclose(history[-1][1][1], goals[1][1], abs_tol=r_buffer) == True and ag1_results['found'] == False:
 			ag1_results['found'] = True
 			ag1_results['timestep'] = step
 			ag1_results['position'] = positions[1]
 			if gui == True:
 				print('AGENT 1 TARGET REACHED: %s' % str(positions[1]))
 		
-		if isclose(history[-1][2][0], 0, abs_tol=r_buffer) == True and isclose(history[-1][2][1], 0, abs_tol=r_buffer) == True and ag2_results['found'] == False:
+		if isclose(history[-1][2][0], goals[2][0], abs_tol=r_buffer) == True and isclose(history[-1][2][1], goals[2][1], abs_tol=r_buffer) == True and ag2_results['found'] == False:
 			ag2_results['found'] = True
 			ag2_results['timestep'] = step
 			ag2_results['position'] = positions[2]
 			if gui==True:
 				print('AGENT 2 TARGET REACHED: %s' % str(positions[2]))
 		
-		if isclose(history[-1][3][0], 10, abs_tol=r_buffer) == True and isclose(history[-1][3][1], 0, abs_tol=r_buffer) == True and ag3_results['found'] == False:
+		if isclose(history[-1][3][0], goals[3][0], abs_tol=r_buffer) == True and isclose(history[-1][3][1], goals[3][1], abs_tol=r_buffer) == True and ag3_results['found'] == False:
 			ag3_results['found'] = True
 			ag3_results['timestep'] = step
 			ag3_results['position'] = positions[3]
@@ -472,37 +697,38 @@ def collision_avoidance_scenario2(time_step, param0, param1, param2, param3, rad
 		print('Number of collisions: %d'% collisions)
 
 	errors = []
-	errors.append(distance(history[-1][0], (10.0, 10.0)))
-	errors.append(distance(history[-1][1], (0.0, 10.0)))
-	errors.append(distance(history[-1][2], (0.0, 0.0)))
-	errors.append(distance(history[-1][3], (10.0, 0.0)))
+	errors.append(distance(history[-1][0], goals[0]))
+	errors.append(distance(history[-1][1], goals[1]))
+	errors.append(distance(history[-1][2], goals[2]))
+	errors.append(distance(history[-1][3], goals[3]))
 
 	mean_error = statistics.mean(errors)
 	mean_error_norm = mean_error / distance((0,0), (10,10))
 	collisions_norm = collisions / (6*n_iterations)
 	mean_duration = (ag0_results['timestep'] + ag1_results['timestep'] + ag2_results['timestep'] + ag3_results['timestep']) / 4
 	mean_duration_norm = mean_duration / n_iterations
+	objectives = fitness_objectives(errors, [ag0_results['timestep'], ag1_results['timestep'], ag2_results['timestep'], ag3_results['timestep']], collisions, n_iterations, timed_out)
+	if metrics is not None:
+		objectives.update(metric_results(metrics))
 
 	fitness = mean_error + mean_duration_norm + collisions
+	if timed_out:
+		fitness = timeout_fitness
 
 	if gui == True:
 		print('Fitness: {0} for set of parameters: [{1}, {2}, {3}, {4}, {5}]'.format(fitness, param0, param1, param2, param3, param4))
 		plt.show()
 		fig, ax = plt.subplots()
-		plt.fill([boundary1[0][0], boundary1[1][0], boundary1[2][0], boundary1[3][0]], [boundary1[0][1], boundary1[1][1], boundary1[2][1], boundary1[3][1]], 'gray')
-		plt.fill([boundary2[0][0], boundary2[1][0], boundary2[2][0], boundary2[3][0]], [boundary2[0][1], boundary2[1][1], boundary2[2][1], boundary2[3][1]], 'gray')
-		plt.fill([boundary3[0][0], boundary3[1][0], boundary3[2][0], boundary3[3][0]], [boundary3[0][1], boundary3[1][1], boundary3[2][1], boundary3[3][1]], 'gray')
-		plt.fill([boundary4[0][0], boundary4[1][0], boundary4[2][0], boundary4[3][0]], [boundary4[0][1], boundary4[1][1], boundary4[2][1], boundary4[3][1]], 'gray')
-		plt.fill([vertices1[0][0], vertices1[1][0], vertices1[2][0], vertices1[3][0]], [vertices1[0][1], vertices1[1][1], vertices1[2][1], vertices1[3][1]], 'gray')
-		plt.fill([vertices2[0][0], vertices2[1][0], vertices2[2][0], vertices2[3][0]], [vertices2[0][1], vertices2[1][1], vertices2[2][1], vertices2[3][1]], 'gray')
-		plt.fill([vertices3[0][0], vertices3[1][0], vertices3[2][0], vertices3[3][0]], [vertices3[0][1], vertices3[1][1], vertices3[2][1], vertices3[3][1]], 'gray')
-		plt.fill([vertices4[0][0], vertices4[1][0], vertices4[2][0], vertices4[3][0]], [vertices4[0][1], vertices4[1][1], vertices4[2][1], vertices4[3][1]], 'gray')
-
-		plot_agents(history, radius, ax)
-		#plot_paths(history, radius, ax) #DECOMMENT IF ONLY AGENTS PATH LINES ARE NEEDED
+
+		timer = plot_agents(history, radius, ax, obstacles)
+		#timer = plot_paths(history, radius, ax, obstacles) #DECOMMENT IF ONLY AGENTS PATH LINES ARE NEEDED
 
 		plt.show()
 
+	if return_trajectory:
+		return fitness, {'history': history, 'obstacles': obstacles, 'radius': radius}
+	if return_objectives:
+		return fitness, objectives
 	return fitness
 
 
@@ -510,9 +736,17 @@ def simulation_evaluator_scenario2(candidates, args):
 	'''
 	Funtion to evaluate the parameters set generated by the EC algorithm for scenario II.
 	- candidates --> candidates chromosomes used to feed the collision-avoidance simulator
+	With "store_objectives" in args, each value is the tuple (fitness, objectives), see objectives_evaluation.
+	The "max_simulation_steps" in args is the step budget of each simulation (None for no budget).
+	The "simulation_metrics" in args are the names of the streaming metrics (see trajectory_metrics.py) added to the objectives of each simulation.
+	With "fitness_formula" in args, the fitness of each simulation is the value of the formula (see formula_fitness) instead of the fitness of the scenario.
 	'''
 	t_step = 1/60.
 	radius = 0.1
+	return_objectives = args.get('store_objectives', False)
+	max_steps = args.get('max_simulation_steps')
+	metric_names = args.get('simulation_metrics')
+	formula = args.get('fitness_formula')
 	fitness=[]
 	for chromosome in candidates:
 		neigh_dist = chromosome[0]
@@ -520,14 +754,20 @@ def simulation_evaluator_scenario2(candidates, args):
 		t_horiz = chromosome[2]
 		t_horiz_obst = chromosome[3]
 		max_speed = chromosome[4]
-		fitness.append(collision_avoidance_scenario2(t_step, neigh_dist, max_neigh, t_horiz, t_horiz_obst, radius, max_speed))
+		result = collision_avoidance_scenario2(t_step, neigh_dist, max_neigh, t_horiz, t_horiz_obst, radius, max_speed, return_objectives=return_objectives or formula is not None,
+								max_steps=max_steps, metrics=None if metric_names is None else make_metrics(metric_names))
+		if formula is not None:
+			fit, objectives = result
+			fit = formula_fitness(formula, fit, objectives)
+			result = (fit, objectives) if return_objectives else fit
+		fitness.append(result)
 	return fitness
 
 
 
 
 
-def collision_avoidance_scenario3(time_step, param0, param1, param2, param3, rad, param4, gui_interface=False):
+def collision_avoidance_scenario3(time_step, param0, param1, param2, param3, rad, param4, gui_interface=False, return_objectives=False, max_steps=None, return_trajectory=False, starts=None, goals=None, metrics=None, n_iterations=None):
 	'''
 	Function to run a simulation with RVO2 simulator in scenario III environment. It is used to evaluate the fitness function value of a set of parameters that represent a candidate solution.
 	Returns the fitness function value for the input parameters set.
@@ -539,6 +779,15 @@ def collision_avoidance_scenario3(time_step, param0, param1, param2, param3, rad
 	- rad --> agents radius
 	- param4 --> Fifth parameter to be optimized, which correspond to max_speed
 	- gui_interface --> boolean value use to activate (True) or deactivate (False) the plot of the simulation at the end of the agents path computation.
+	- return_objectives --> boolean value used to return (True) also the components of the fitness function (see fitness_objectives), as the tuple (fitness, objectives)
+	- max_steps --> step budget of the simulation (None for no budget): if the agents did not reach their targets within it, the fitness is "timeout_fitness"
+	- return_trajectory --> boolean value used to return (True) also the trajectory of the simulation, as the tuple (fitness, trajectory),
+		where trajectory is a dictionary with the positions of the agents at each time-step ("history"), the "obstacles" and the agents "radius"
+	- starts, goals --> lists of the initial positions and of the targets of the four agents (None for the ones of the scenario, "agent_starts" and "agent_goals")
+	- metrics --> list of streaming metrics (see trajectory_metrics.py) updated at each time-step with the positions of the agents,
+		whose results are added to the components of the fitness function (None for no metrics)
+	- n_iterations --> number of time-steps of the simulation (None for int(time_step*100000), the one of the training); it fixes the simulated time
+		when the time-step changes, e.g. with the horizon of the training, 1666 time-steps of 1/60 s, n_iterations = int(round(1666/60. / time_step))
 	'''
 	gui = gui_interface
 
@@ -556,10 +805,12 @@ def collision_avoidance_scenario3(time_step, param0, param1, param2, param3, rad
 	t_horiz_obst = param3
 	radius = rad
 	max_speed = param4
+	starts = agent_starts if starts is None else starts
+	goals = agent_goals if goals is None else goals
 
 	sim = rvo2.PyRVOSimulator(t_step, neigh_dist, max_neigh, t_horiz, t_horiz_obst, radius, max_speed)
 
-	n_iterations = int(t_step*100000)
+	n_iterations = int(t_step*100000) if n_iterations is None else n_iterations
 	r_buffer = 1e-1
 
 	boundary1 = [(-1, -1), (-1, 11), (-1.5, 11.5), (-1.5, -1.5)]
@@ -578,11 +829,13 @@ def collision_avoidance_scenario3(time_step, param0, param1, param2, param3, rad
 	vertices8 = [(0.5, 4.5), (1.5, 4.5), (1.5, 5.5), (0.5, 5.5)]
 	vertices9 = [(4.5, 4.5), (5.5, 4.5), (5.5, 5.5), (4.5, 5.5)]
 
+	obstacles = [boundary1, boundary2, boundary3, boundary4, vertices1, vertices2, vertices3, vertices4, vertices5, vertices6, vertices7, vertices8, vertices9]
+
 
-	a0 = sim.addAgent((0, 0))
-	a1 = sim.addAgent((10, 0))
-	a2 = sim.addAgent((10, 10))
-	a3 = sim.addAgent((0, 10))
+	a0 = sim.addAgent(tuple(starts[0]))
+	a1 = sim.addAgent(tuple(starts[1]))
+	a2 = sim.addAgent(tuple(starts[2]))
+	a3 = sim.addAgent(tuple(starts[3]))
 
 	b1 = sim.addObstacle(boundary1)
 	b2 = sim.addObstacle(boundary2)
@@ -600,14 +853,14 @@ def collision_avoidance_scenario3(time_step, param0, param1, param2, param3, rad
 	o9 = sim.addObstacle(vertices9)
 	sim.processObstacles()
 
-	sim.setAgentPrefVelocity(a0, (1, 1))
-	sim.setAgentPrefVelocity(a1, (-1, 1))
-	sim.setAgentPrefVelocity(a2, (-1, -1))
-	sim.setAgentPrefVelocity(a3, (1, -1))
+	sim.setAgentPrefVelocity(a0, initial_velocity(starts[0], goals[0]))
+	sim.setAgentPrefVelocity(a1, initial_velocity(starts[1], goals[1]))
+	sim.setAgentPrefVelocity(a2, initial_velocity(starts[2], goals[2]))
+	sim.setAgentPrefVelocity(a3, initial_velocity(starts[3], goals[3]))
 
 	history = []
-	history.append([(0,0), (10,0), (10,10), (0,10)])
-	positions = [(0,0), (10,0), (10,10), (0,10)]
+	history.append([tuple(start) for start in starts])
+	positions = [tuple(start) for start in starts]
 
 	ag0_results = {'agent_nr': 0, 'found': False, 'timestep': n_iterations, 'position': []}
 	ag1_results = {'agent_nr': 1, 'found': False, 'timestep': n_iterations, 'position': []}
@@ -615,12 +868,18 @@ def collision_avoidance_scenario3(time_step, param0, param1, param2, param3, rad
 	ag3_results = {'agent_nr': 3, 'found': False, 'timestep': n_iterations, 'position': []}
 
 	collisions = 0
+	timed_out = False
+	if metrics is not None:
+		start_metrics(metrics, starts, t_step, radius, obstacles)
 
 	for step in range(n_iterations):
 		if ag0_results['found'] == True and ag1_results['found'] == True and ag2_results['found'] == True and ag3_results['found'] == True:
 			if gui:
 				print('ALL AGENTS REACHED THEIR TARGETS! SIMULATION COMPLETED...')
 			break
+		if max_steps is not None and step >= max_steps:
+			timed_out = True
+			break
 
 		sim.doStep()
 		positions = []
@@ -630,6 +889,8 @@ def collision_avoidance_scenario3(time_step, param0, param1, param2, param3, rad
 			positions.append(pos_tuple)
 
 		history.append(positions)
+		if metrics is not None:
+			update_metrics(metrics, [sim.getAgentPosition(agent_no) for agent_no in (a0, a1, a2, a3)])
 
 		if check_collisions(positions[0], positions[1], radius):
 			collisions += 1
@@ -644,33 +905,33 @@ def collision_avoidance_scenario3(time_step, param0, param1, param2, param3, rad
 		if check_collisions(positions[2], positions[3], radius):
 			collisions += 1
 
-		sim.setAgentPrefVelocity(a0, (10 - positions[0][0], 10 - positions[0][1]))
-		sim.setAgentPrefVelocity(a1, (0 - positions[1][0], 10 - positions[1][1]))
-		sim.setAgentPrefVelocity(a2, (0 - positions[2][0], 0 - positions[2][1]))
-		sim.setAgentPrefVelocity(a3, (10 - positions[3][0], 0 - positions[3][1]))
+		sim.setAgentPrefVelocity(a0, (goals[0][0] - positions[0][0], goals[0][1] - positions[0][1]))
+		sim.setAgentPrefVelocity(a1, (goals[1][0] - positions[1][0], goals[1][1] - positions[1][1]))
+		sim.setAgentPrefVelocity(a2, (goals[2][0] - positions[2][0], goals[2][1] - positions[2][1]))
+		sim.setAgentPrefVelocity(a3, (goals[3][0] - positions[3][0], goals[3][1] - positions[3][1]))
 
-		if isclose(history[-1][0][0], 10, abs_tol=r_buffer) == True and isclose(history[-1][0][1], 10, abs_tol=r_buffer) == True and ag0_results['found'] == False:
+		if isclose(history[-1][0][0], goals[0][0], abs_tol=r_buffer) == True and isclose(history[-1][0][1], goals[0][1], abs_tol=r_buffer) == True and ag0_results['found'] == False:
 			ag0_results['found'] = True
 			ag0_results['timestep'] = step
 			ag0_results['position'] = positions[0]
 			if gui == True:
 				print('AGENT 0 TARGET REACHED: %s' % str(positions[0]))
 		
-		if isclose(history[-1][1][0], 0, abs_tol=r_buffer) == True and isclose(history[-1][1][1], 10, abs_tol=r_buffer) == True and ag1_results['found'] == False:
+		if isclose(history[-1][1][0], goals[1][0], abs_tol=r_buffer) == True and isclose(history[-1][1][1], goals[1][1], abs_tol=r_buffer) == True and ag1_results['found'] == False:
 			ag1_results['found'] = True
 			ag1_results['timestep'] = step
 			ag1_results['position'] = positions[1]
 			if gui == True:
 				print('AGENT 1 TARGET REACHED: %s' % str(positions[1]))
 		
-		if isclose(history[-1][2][0], 0, abs_tol=r_buffer) == True and isclose(history[-1][2][1], 0, abs_tol=r_buffer) == True and ag2_results['found'] == False:
+		if isclose(history[-1][2][0], goals[2][0], abs_tol=r_buffer) == True and isclose(history[-1][2][1], goals[2][1], abs_tol=r_buffer) == True and ag2_results['found'] == False:
 			ag2_results['found'] = True
 			ag2_results['timestep'] = step
 			ag2_results['position'] = positions[2]
 			if gui==True:
 				print('AGENT 2 TARGET REACHED: %s' % str(positions[2]))
 		
-		if isclose(history[-1][3][0], 10, abs_tol=r_buffer) == True and isclose(history[-1][3][1], 0, abs_tol=r_buffer) == True and ag3_results['found'] == False:
+		if isclose(history[-1][3][0], goals[3][0], abs_tol=r_buffer) == True and isclose(history[-1][3][1], goals[3][1], abs_tol=r_buffer) == True and ag3_results['found'] == False:
 			ag3_results['found'] = True
 			ag3_results['timestep'] = step
 			ag3_results['position'] = positions[3]
@@ -681,43 +942,39 @@ def collision_avoidance_scenario3(time_step, param0, param1, param2, param3, rad
 		print('Number of collisions: %d'% collisions)
 
 	errors = []
-	errors.append(distance(history[-1][0], (10.0, 10.0)))
-	errors.append(distance(history[-1][1], (0.0, 10.0)))
-	errors.append(distance(history[-1][2], (0.0, 0.0)))
-	errors.append(distance(history[-1][3], (10.0, 0.0)))
+	errors.append(distance(history[-1][0], goals[0]))
+	errors.append(distance(history[-1][1], goals[1]))
+	errors.append(distance(history[-1][2], goals[2]))
+	errors.append(distance(history[-1][3], goals[3]))
 
 	mean_error = statistics.mean(errors)
 	mean_error_norm = mean_error / distance((0,0), (10,10))
 	collisions_norm = collisions / (6*n_iterations)
 	mean_duration = (ag0_results['timestep'] + ag1_results['timestep'] + ag2_results['timestep'] + ag3_results['timestep']) / 4
 	mean_duration_norm = mean_duration / n_iterations
+	objectives = fitness_objectives(errors, [ag0_results['timestep'], ag1_results['timestep'], ag2_results['timestep'], ag3_results['timestep']], collisions, n_iterations, timed_out)
+	if metrics is not None:
+		objectives.update(metric_results(metrics))
 
 	fitness = mean_error + mean_duration_norm + collisions
+	if timed_out:
+		fitness = timeout_fitness
 
 	if gui == True:
 		print('Fitness: {0} for set of parameters: [{1}, {2}, {3}, {4}, {5}]'.format(fitness, param0, param1, param2, param3, param4))
 		plt.show()
 		fig, ax = plt.subplots()
-		plt.fill([boundary1[0][0], boundary1[1][0], boundary1[2][0], boundary1[3][0]], [boundary1[0][1], boundary1[1][1], boundary1[2][1], boundary1[3][1]], 'gray')
-		plt.fill([boundary2[0][0], boundary2[1][0], boundary2[2][0], boundary2[3][0]], [boundary2[0][1], boundary2[1][1], boundary2[2][1], boundary2[3][1]], 'gray')
-		plt.fill([boundary3[0][0], boundary3[1][0], boundary3[2][0], boundary3[3][0]], [boundary3[0][1], boundary3[1][1], boundary3[2][1], boundary3[3][1]], 'gray')
-		plt.fill([boundary4[0][0], boundary4[1][0], boundary4[2][0], boundary4[3][0]], [boundary4[0][1], boundary4[1][1], boundary4[2][1], boundary4[3][1]], 'gray')
-		plt.fill([vertices1[0][0], vertices1[1][0], vertices1[2][0], vertices1[3][0]], [vertices1[0][1], vertices1[1][1], vertices1[2][1], vertices1[3][1]], 'gray')
-		plt.fill([vertices2[0][0], vertices2[1][0], vertices2[2][0], vertices2[3][0]], [vertices2[0][1], vertices2[1][1], vertices2[2][1], vertices2[3][1]], 'gray')
-		plt.fill([vertices3[0][0], vertices3[1][0], vertices3[2][0], vertices3[3][0]], [vertices3[0][1], vertices3[1][1], vertices3[2][1], vertices3[3][1]], 'gray')
-		plt.fill([vertices4[0][0], vertices4[1][0], vertices4[2][0], vertices4[3][0]], [vertices4[0][1], vertices4[1][1], vertices4[2][1], vertices4[3][1]], 'gray')
-		plt.fill([vertices5[0][0], vertices5[1][0], vertices5[2][0], vertices5[3][0]], [vertices5[0][1], vertices5[1][1], vertices5[2][1], vertices5[3][1]], 'gray')
-		plt.fill([vertices6[0][0], vertices6[1][0], vertices6[2][0], vertices6[3][0]], [vertices6[0][1], vertices6[1][1], vertices6[2][1], vertices6[3][1]], 'gray')
-		plt.fill([vertices7[0][0], vertices7[1][0], vertices7[2][0], vertices7[3][0]], [vertices7[0][1], vertices7[1][1], vertices7[2][1], vertices7[3][1]], 'gray')
-		plt.fill([vertices8[0][0], vertices8[1][0], vertices8[2][0], vertices8[3][0]], [vertices8[0][1], vertices8[1][1], vertices8[2][1], vertices8[3][1]], 'gray')
-		plt.fill([vertices9[0][0], vertices9[1][0], vertices9[2][0], vertices9[3][0]], [vertices9[0][1], vertices9[1][1], vertices9[2][1], vertices9[3][1]], 'gray')
-
-		plot_agents(history, radius, ax)
-		#plot_paths(history, radius, ax) #DECOMMENT IF ONLY AGENTS PATH LINES ARE NEEDED
+
+		timer = plot_agents(history, radius, ax, obstacles)
+		#timer = plot_paths(history, radius, ax, obstacles) #DECOMMENT IF ONLY AGENTS PATH LINES ARE NEEDED
 
 		plt.show()
 
 
+	if return_trajectory:
+		return fitness, {'history': history, 'obstacles': obstacles, 'radius': radius}
+	if return_objectives:
+		return fitness, objectives
 	return fitness
 
 
@@ -725,9 +982,17 @@ def simulation_evaluator_scenario3(candidates, args):
 	'''
 	Funtion to evaluate the parameters set generated by the EC algorithm for scenario III.
 	- candidates --> candidates chromosomes used to feed the collision-avoidance simulator
+	With "store_objectives" in args, each value is the tuple (fitness, objectives), see objectives_evaluation.
+	The "max_simulation_steps" in args is the step budget of each simulation (None for no budget).
+	The "simulation_metrics" in args are the names of the streaming metrics (see trajectory_metrics.py) added to the objectives of each simulation.
+	With "fitness_formula" in args, the fitness of each simulation is the value of the formula (see formula_fitness) instead of the fitness of the scenario.
 	'''
 	t_step = 1/60.
 	radius = 0.1
+	return_objectives = args.get('store_objectives', False)
+	max_steps = args.get('max_simulation_steps')
+	metric_names = args.get('simulation_metrics')
+	formula = args.get('fitness_formula')
 	fitness=[]
 	for chromosome in candidates:
 		neigh_dist = chromosome[0]
@@ -735,12 +1000,18 @@ def simulation_evaluator_scenario3(candidates, args):
 		t_horiz = chromosome[2]
 		t_horiz_obst = chromosome[3]
 		max_speed = chromosome[4]
-		fitness.append(collision_avoidance_scenario3(t_step, neigh_dist, max_neigh, t_horiz, t_horiz_obst, radius, max_speed))
+		result = collision_avoidance_scenario3(t_step, neigh_dist, max_neigh, t_horiz, t_horiz_obst, radius, max_speed, return_objectives=return_objectives or formula is not None,
+								max_steps=max_steps, metrics=None if metric_names is None else make_metrics(metric_names))
+		if formula is not None:
+			fit, objectives = result
+			fit = formula_fitness(formula, fit, objectives)
+			result = (fit, objectives) if return_objectives else fit
+		fitness.append(result)
 	return fitness
 
 
 
-def collision_avoidance_scenario4(time_step, param0, param1, param2, param3, rad, param4, gui_interface=False):
+def collision_avoidance_scenario4(time_step, param0, param1, param2, param3, rad, param4, gui_interface=False, return_objectives=False, max_steps=None, return_trajectory=False, starts=None, goals=None, metrics=None, n_iterations=None):
 	'''
 	Function to run a simulation with RVO2 simulator in scenario IV environment. It is used to evaluate the fitness function value of a set of parameters that represent a candidate solution.
 	Returns the fitness function value for the input parameters set.
@@ -752,6 +1023,15 @@ def collision_avoidance_scenario4(time_step, param0, param1, param2, param3, rad
 	- rad --> agents radius
 	- param4 --> Fifth parameter to be optimized, which correspond to max_speed
 	- gui_interface --> boolean value use to activate (True) or deactivate (False) the plot of the simulation at the end of the agents path computation.
+	- return_objectives --> boolean value used to return (True) also the components of the fitness function (see fitness_objectives), as the tuple (fitness, objectives)
+	- max_steps --> step budget of the simulation (None for no budget): if the agents did not reach their targets within it, the fitness is "timeout_fitness"
+	- return_trajectory --> boolean value used to return (True) also the trajectory of the simulation, as the tuple (fitness, trajectory),
+		where trajectory is a dictionary with the positions of the agents at each time-step ("history"), the "obstacles" and the agents "radius"
+	- starts, goals --> lists of the initial positions and of the targets of the four agents (None for the ones of the scenario, "agent_starts" and "agent_goals")
+	- metrics --> list of streaming metrics (see trajectory_metrics.py) updated at each time-step with the positions of the agents,
+		whose results are added to the components of the fitness function (None for no metrics)
+	- n_iterations --> number of time-steps of the simulation (None for int(time_step*100000), the one of the training); it fixes the simulated time
+		when the time-step changes, e.g. with the horizon of the training, 1666 time-steps of 1/60 s, n_iterations = int(round(1666/60. / time_step))
 	'''
 	gui = gui_interface
 
@@ -769,10 +1049,12 @@ def collision_avoidance_scenario4(time_step, param0, param1, param2, param3, rad
 	t_horiz_obst = param3
 	radius = rad
 	max_speed = param4
+	starts = agent_starts if starts is None else starts
+	goals = agent_goals if goals is None else goals
 
 	sim = rvo2.PyRVOSimulator(t_step, neigh_dist, max_neigh, t_horiz, t_horiz_obst, radius, max_speed)
 
-	n_iterations = int(t_step*100000)
+	n_iterations = int(t_step*100000) if n_iterations is None else n_iterations
 	r_buffer = 1e-1
 
 
@@ -796,11 +1078,13 @@ def collision_avoidance_scenario4(time_step, param0, param1, param2, param3, rad
 	vertices23 = [(6.5, 4.5), (7.5, 4.5), (7.5, 5.5), (6.5, 5.5)]
 	vertices24 = [(4.5, 6.5), (5.5, 6.5), (5.5, 7.5), (4.5, 7.5)]
 	vertices25 = [(2.5, 4.5), (3.5, 4.5), (3.5, 5.5), (2.5, 5.5)]
+	obstacles = [boundary1, boundary2, boundary3, boundary4, vertices1, vertices2, vertices3, vertices4, vertices5, vertices6, vertices7, vertices8, vertices9, vertices22, vertices23, vertices24, vertices25]
 
-	a0 = sim.addAgent((0, 0))
-	a1 = sim.addAgent((10, 0))
-	a2 = sim.addAgent((10, 10))
-	a3 = sim.addAgent((0, 10))
+
+	a0 = sim.addAgent(tuple(starts[0]))
+	a1 = sim.addAgent(tuple(starts[1]))
+	a2 = sim.addAgent(tuple(starts[2]))
+	a3 = sim.addAgent(tuple(starts[3]))
 
 
 	b1 = sim.addObstacle(boundary1)
@@ -823,14 +1107,14 @@ def collision_avoidance_scenario4(time_step, param0, param1, param2, param3, rad
 	o25 = sim.addObstacle(vertices25)
 	sim.processObstacles()
 
-	sim.setAgentPrefVelocity(a0, (1, 1))
-	sim.setAgentPrefVelocity(a1, (-1, 1))
-	sim.setAgentPrefVelocity(a2, (-1, -1))
-	sim.setAgentPrefVelocity(a3, (1, -1))
+	sim.setAgentPrefVelocity(a0, initial_velocity(starts[0], goals[0]))
+	sim.setAgentPrefVelocity(a1, initial_velocity(starts[1], goals[1]))
+	sim.setAgentPrefVelocity(a2, initial_velocity(starts[2], goals[2]))
+	sim.setAgentPrefVelocity(a3, initial_velocity(starts[3], goals[3]))
 
 	history = []
-	history.append([(0,0), (10,0), (10,10), (0,10)])
-	positions = [(0,0), (10,0), (10,10), (0,10)]
+	history.append([tuple(start) for start in starts])
+	positions = [tuple(start) for start in starts]
 
 
 	ag0_results = {'agent_nr': 0, 'found': False, 'timestep': n_iterations, 'position': []}
@@ -839,12 +1123,18 @@ def collision_avoidance_scenario4(time_step, param0, param1, param2, param3, rad
 	ag3_results = {'agent_nr': 3, 'found': False, 'timestep': n_iterations, 'position': []}
 
 	collisions = 0
+	timed_out = False
+	if metrics is not None:
+		start_metrics(metrics, starts, t_step, radius, obstacles)
 
 	for step in range(n_iterations):
 		if ag0_results['found'] == True and ag1_results['found'] == True and ag2_results['found'] == True and ag3_results['found'] == True:
 			if gui:
 				print('ALL AGENTS REACHED THEIR TARGETS!')
 			break
+		if max_steps is not None and step >= max_steps:
+			timed_out = True
+			break
 
 		sim.doStep()
 		positions = []
@@ -854,6 +1144,8 @@ def collision_avoidance_scenario4(time_step, param0, param1, param2, param3, rad
 			positions.append(pos_tuple)
 
 		history.append(positions)
+		if metrics is not None:
+			update_metrics(metrics, [sim.getAgentPosition(agent_no) for agent_no in (a0, a1, a2, a3)])
 
 		if check_collisions(positions[0], positions[1], radius):
 			collisions += 1
@@ -868,33 +1160,33 @@ def collision_avoidance_scenario4(time_step, param0, param1, param2, param3, rad
 		if check_collisions(positions[2], positions[3], radius):
 			collisions += 1
 
-		sim.setAgentPrefVelocity(a0, (10 - positions[0][0], 10 - positions[0][1]))
-		sim.setAgentPrefVelocity(a1, (0 - positions[1][0], 10 - positions[1][1]))
-		sim.setAgentPrefVelocity(a2, (0 - positions[2][0], 0 - positions[2][1]))
-		sim.setAgentPrefVelocity(a3, (10 - positions[3][0], 0 - positions[3][1]))
+		sim.setAgentPrefVelocity(a0, (goals[0][0] - positions[0][0], goals[0][1] - positions[0][1]))
+		sim.setAgentPrefVelocity(a1, (goals[1][0] - positions[1][0], goals[1][1] - positions[1][1]))
+		sim.setAgentPrefVelocity(a2, (goals[2][0] - positions[2][0], goals[2][1] - positions[2][1]))
+		sim.setAgentPrefVelocity(a3, (goals[3][0] - positions[3][0], goals[3][1] - positions[3][1]))
 
-		if isclose(history[-1][0][0], 10, abs_tol=r_buffer) == True and isclose(history[-1][0][1], 10, abs_tol=r_buffer) == True and ag0_results['found'] == False:
+		if isclose(history[-1][0][0], goals[0][0], abs_tol=r_buffer) == True and isclose(history[-1][0][1], goals[0][1], abs_tol=r_buffer) == True and ag0_results['found'] == False:
 			ag0_results['found'] = True
 			ag0_results['timestep'] = step
 			ag0_results['position'] = positions[0]
 			if gui == True:
 				print('AGENT 0 TARGET REACHED: %s' % str(positions[0]))
 		
-		if isclose(history[-1][1][0], 0, abs_tol=r_buffer) == True and isclose(history[-1][1][1], 10, abs_tol=r_buffer) == True and ag1_results['found'] == False:
+		if isclose(history[-1][1][0], goals[1][0], abs_tol=r_buffer) == True and isclose(history[-1][1][1], goals[1][1], abs_tol=r_buffer) == True and ag1_results['found'] == False:
 			ag1_results['found'] = True
 			ag1_results['timestep'] = step
 			ag1_results['position'] = positions[1]
 			if gui == True:
 				print('AGENT 1 TARGET REACHED: %s' % str(positions[1]))
 		
-		if isclose(history[-1][2][0], 0, abs_tol=r_buffer) == True and isclose(history[-1][2][1], 0, abs_tol=r_buffer) == True and ag2_results['found'] == False:
+		if isclose(history[-1][2][0], goals[2][0], abs_tol=r_buffer) == True and isclose(history[-1][2][1], goals[2][1], abs_tol=r_buffer) == True and ag2_results['found'] == False:
 			ag2_results['found'] = True
 			ag2_results['timestep'] = step
 			ag2_results['position'] = positions[2]
 			if gui==True:
 				print('AGENT 2 TARGET REACHED: %s' % str(positions[2]))
 		
-		if isclose(history[-1][3][0], 10, abs_tol=r_buffer) == True and isclose(history[-1][3][1], 0, abs_tol=r_buffer) == True and ag3_results['found'] == False:
+		if isclose(history[-1][3][0], goals[3][0], abs_tol=r_buffer) == True and isclose(history[-1][3][1], goals[3][1], abs_tol=r_buffer) == True and ag3_results['found'] == False:
 			ag3_results['found'] = True
 			ag3_results['timestep'] = step
 			ag3_results['position'] = positions[3]
@@ -905,47 +1197,39 @@ def collision_avoidance_scenario4(time_step, param0, param1, param2, param3, rad
 		print('Number of collisions: %d'% collisions)
 
 	errors = []
-	errors.append(distance(history[-1][0], (10.0, 10.0)))
-	errors.append(distance(history[-1][1], (0.0, 10.0)))
-	errors.append(distance(history[-1][2], (0.0, 0.0)))
-	errors.append(distance(history[-1][3], (10.0, 0.0)))
+	errors.append(distance(history[-1][0], goals[0]))
+	errors.append(distance(history[-1][1], goals[1]))
+	errors.append(distance(history[-1][2], goals[2]))
+	errors.append(distance(history[-1][3], goals[3]))
 
 	mean_error = statistics.mean(errors)
 	mean_error_norm = mean_error / distance((0,0), (10,10))
 	collisions_norm = collisions / (6*n_iterations)
 	mean_duration = (ag0_results['timestep'] + ag1_results['timestep'] + ag2_results['timestep'] + ag3_results['timestep']) / 4
 	mean_duration_norm = mean_duration / n_iterations
+	objectives = fitness_objectives(errors, [ag0_results['timestep'], ag1_results['timestep'], ag2_results['timestep'], ag3_results['timestep']], collisions, n_iterations, timed_out)
+	if metrics is not None:
+		objectives.update(metric_results(metrics))
 
 	fitness = mean_error + mean_duration_norm + collisions
+	if timed_out:
+		fitness = timeout_fitness
 
 	if gui == True:
 		print('Fitness: {0} for set of parameters: [{1}, {2}, {3}, {4}, {5}]'.format(fitness, param0, param1, param2, param3, param4))
 		plt.show()
 		fig, ax = plt.subplots()
-		plt.fill([boundary1[0][0], boundary1[1][0], boundary1[2][0], boundary1[3][0]], [boundary1[0][1], boundary1[1][1], boundary1[2][1], boundary1[3][1]], 'gray')
-		plt.fill([boundary2[0][0], boundary2[1][0], boundary2[2][0], boundary2[3][0]], [boundary2[0][1], boundary2[1][1], boundary2[2][1], boundary2[3][1]], 'gray')
-		plt.fill([boundary3[0][0], boundary3[1][0], boundary3[2][0], boundary3[3][0]], [boundary3[0][1], boundary3[1][1], boundary3[2][1], boundary3[3][1]], 'gray')
-		plt.fill([boundary4[0][0], boundary4[1][0], boundary4[2][0], boundary4[3][0]], [boundary4[0][1], boundary4[1][1], boundary4[2][1], boundary4[3][1]], 'gray')
-		plt.fill([vertices1[0][0], vertices1[1][0], vertices1[2][0], vertices1[3][0]], [vertices1[0][1], vertices1[1][1], vertices1[2][1], vertices1[3][1]], 'gray')
-		plt.fill([vertices2[0][0], vertices2[1][0], vertices2[2][0], vertices2[3][0]], [vertices2[0][1], vertices2[1][1], vertices2[2][1], vertices2[3][1]], 'gray')
-		plt.fill([vertices3[0][0], vertices3[1][0], vertices3[2][0], vertices3[3][0]], [vertices3[0][1], vertices3[1][1], vertices3[2][1], vertices3[3][1]], 'gray')
-		plt.fill([vertices4[0][0], vertices4[1][0], vertices4[2][0], vertices4[3][0]], [vertices4[0][1], vertices4[1][1], vertices4[2][1], vertices4[3][1]], 'gray')
-		plt.fill([vertices5[0][0], vertices5[1][0], vertices5[2][0], vertices5[3][0]], [vertices5[0][1], vertices5[1][1], vertices5[2][1], vertices5[3][1]], 'gray')
-		plt.fill([vertices6[0][0], vertices6[1][0], vertices6[2][0], vertices6[3][0]], [vertices6[0][1], vertices6[1][1], vertices6[2][1], vertices6[3][1]], 'gray')
-		plt.fill([vertices7[0][0], vertices7[1][0], vertices7[2][0], vertices7[3][0]], [vertices7[0][1], vertices7[1][1], vertices7[2][1], vertices7[3][1]], 'gray')
-		plt.fill([vertices8[0][0], vertices8[1][0], vertices8[2][0], vertices8[3][0]], [vertices8[0][1], vertices8[1][1], vertices8[2][1], vertices8[3][1]], 'gray')
-		plt.fill([vertices9[0][0], vertices9[1][0], vertices9[2][0], vertices9[3][0]], [vertices9[0][1], vertices9[1][1], vertices9[2][1], vertices9[3][1]], 'gray')
-		plt.fill([vertices22[0][0], vertices22[1][0], vertices22[2][0], vertices22[3][0]], [vertices22[0][1], vertices22[1][1], vertices22[2][1], vertices22[3][1]], 'gray')
-		plt.fill([vertices23[0][0], vertices23[1][0], vertices23[2][0], vertices23[3][0]], [vertices23[0][1], vertices23[1][1], vertices23[2][1], vertices23[3][1]], 'gray')
-		plt.fill([vertices24[0][0], vertices24[1][0], vertices24[2][0], vertices24[3][0]], [vertices24[0][1], vertices24[1][1], vertices24[2][1], vertices24[3][1]], 'gray')
-		plt.fill([vertices25[0][0], vertices25[1][0], vertices25[2][0], vertices25[3][0]], [vertices25[0][1], vertices25[1][1], vertices25[2][1], vertices25[3][1]], 'gray')
-		
-		plot_agents(history, radius, ax)
-		#plot_paths(history, radius, ax) #DECOMMENT IF ONLY AGENTS PATH LINES ARE NEEDED
+
+		timer = plot_agents(history, radius, ax, obstacles)
+		#timer = plot_paths(history, radius, ax, obstacles) #DECOMMENT IF ONLY AGENTS PATH LINES ARE NEEDED
 
 		plt.show()
 
 
+	if return_trajectory:
+		return fitness, {'history': history, 'obstacles': obstacles, 'radius': radius}
+	if return_objectives:
+		return fitness, objectives
 	return fitness
 
 
@@ -953,9 +1237,17 @@ def simulation_evaluator_scenario4(candidates, args):
 	'''
 	Funtion to evaluate the parameters set generated by the EC algorithm for scenario IV.
 	- candidates --> candidates chromosomes used to feed the collision-avoidance simulator
+	With "store_objectives" in args, each value is the tuple (fitness, objectives), see objectives_evaluation.
+	The "max_simulation_steps" in args is the step budget of each simulation (None for no budget).
+	The "simulation_metrics" in args are the names of the streaming metrics (see trajectory_metrics.py) added to the objectives of each simulation.
+	With "fitness_formula" in args, the fitness of each simulation is the value of the formula (see formula_fitness) instead of the fitness of the scenario.
 	'''
 	t_step = 1/60.
 	radius = 0.1
+	return_objectives = args.get('store_objectives', False)
+	max_steps = args.get('max_simulation_steps')
+	metric_names = args.get('simulation_metrics')
+	formula = args.get('fitness_formula')
 	fitness=[]
 	for chromosome in candidates:
 		neigh_dist = chromosome[0]
@@ -963,8 +1255,29 @@ def simulation_evaluator_scenario4(candidates, args):
 		t_horiz = chromosome[2]
 		t_horiz_obst = chromosome[3]
 		max_speed = chromosome[4]
-		fitness.append(collision_avoidance_scenario4(t_step, neigh_dist, max_neigh, t_horiz, t_horiz_obst, radius, max_speed))
+		result = collision_avoidance_scenario4(t_step, neigh_dist, max_neigh, t_horiz, t_horiz_obst, radius, max_speed, return_objectives=return_objectives or formula is not None,
+								max_steps=max_steps, metrics=None if metric_names is None else make_metrics(metric_names))
+		if formula is not None:
+			fit, objectives = result
+			fit = formula_fitness(formula, fit, objectives)
+			result = (fit, objectives) if return_objectives else fit
+		fitness.append(result)
 	return fitness
 
 
 
+
+
+scenario_evaluators = {1: simulation_evaluator_scenario1, 2: simulation_evaluator_scenario2, 3: simulation_evaluator_scenario3, 4: simulation_evaluator_scenario4}
+scenario_simulations = {1: collision_avoidance_scenario1, 2: collision_avoidance_scenario2, 3: collision_avoidance_scenario3, 4: collision_avoidance_scenario4}
+
+
+def simulation_trajectory(scenario, chromosome, max_steps=None):
+	'''
+	Function to simulate a candidate of a scenario, with the settings of the simulation evaluators, and record its trajectory.
+	Returns the tuple (fitness, trajectory), see the "return_trajectory" of the collision_avoidance_scenario functions.
+	- scenario --> number of the scenario
+	- chromosome --> candidate's chromosome (neigh_dist, max_neigh, t_horiz, t_horiz_obst, max_speed)
+	- max_steps --> step budget of the simulation (None for no budget)
+	'''
+	return scenario_simulations[scenario](1/60., chromosome[0], chromosome[1], chromosome[2], chromosome[3], 0.1, chromosome[4], max_steps=max_steps, return_trajectory=True)
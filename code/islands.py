@@ -0,0 +1,199 @@
+'''
+islands.py
+This module contains the island model of the optimizer: several independent populations evolve in separate processes,
+and periodically send copies of their best individuals to the neighbouring islands.
+The migrants travel through one multiprocessing queue (a pipe) per island, so the exchange is asynchronous and an island never waits for the others.
+The migrants replace the worst individuals of the population of the genetic algorithm, so the island model is available only with the 'ga' optimizer:
+the ask/tell backends rebuild their population from the state of the optimizer at every generation, where the migrants would be lost.
+'''
+
+import multiprocessing
+import queue
+import csv
+from time import time
+from datetime import datetime
+from evolution import run_optimization
+from run_catalog import RunCatalog
+from surrogate import simulated_best
+
+
+def topology_neighbors(topology, island, num_islands, random):
+	'''
+	Function to find the islands which receive the migrants of an island.
+	Returns the list of the destination islands.
+	- topology --> 'ring' (next island), 'fully_connected' (all the other islands) or 'random' (one other island chosen at each migration)
+	- island --> index of the sending island
+	- num_islands --> number of islands
+	- random --> random number generator of the sending island
+	'''
+	others = [i for i in range(num_islands) if i != island]
+	if topology == 'ring':
+		return [(island + 1) % num_islands]
+	elif topology == 'fully_connected':
+		return others
+	elif topology == 'random':
+		return [random.choice(others)]
+	raise ValueError('unknown migration topology {0}'.format(topology))
+
+
+class TopologyMigrator(object):
+	'''
+	Migrator of an island. Every "migration_interval" generations it sends copies of its "num_migrants" best individuals to the neighbouring islands,
+	and at every generation it replaces its worst individuals with the migrants received from the other islands.
+	The inboxes are bounded: when the inbox of a neighbour is full the migrant is dropped, so a slow island never blocks the others.
+	- inboxes --> list of the multiprocessing queues of all the islands
+	- island --> index of this island
+	- topology --> migration topology, see topology_neighbors
+	- migration_interval --> number of generations between two migrations
+	- num_migrants --> number of individuals sent to each neighbour at each migration
+	'''
+	def __init__(self, inboxes, island, topology='ring', migration_interval=10, num_migrants=1):
+		self.inboxes = inboxes
+		self.island = island
+		self.topology = topology
+		self.migration_interval = migration_interval
+		self.num_migrants = num_migrants
+		self.num_sent = 0
+		self.num_received = 0
+		self.__name__ = self.__class__.__name__
+
+	def __call__(self, random, population, args):
+		population.sort(reverse=True)
+
+		immigrants = []
+		while True:
+			try:
+				immigrants.append(self.inboxes[self.island].get(block=False))
+			except queue.Empty:
+				break
+		immigrants.sort(reverse=True)
+		immigrants = immigrants[:len(population) - self.num_migrants]
+		if len(immigrants) > 0:
+			population[len(population) - len(immigrants):] = immigrants
+			self.num_received += len(immigrants)
+
+		if (args['_ec'].num_generations + 1) % self.migration_interval == 0:
+			for neighbor in topology_neighbors(self.topology, self.island, len(self.inboxes), random):
+				for migrant in population[:self.num_migrants]:
+					try:
+						self.inboxes[neighbor].put(migrant, block=False)
+						self.num_sent += 1
+					except queue.Full:
+						pass
+		return population
+
+
+def island_observer(population, num_generations, num_evaluations, args):
+	'''
+	Function to send the progress of an island to the main process through the "island_reports" queue in args.
+	'''
+	best = simulated_best(population)
+	args['island_reports'].put(('progress', args['island'], num_generations, num_evaluations, best.fitness, list(best.candidate)))
+
+
+def _island_process(island, scenario, evaluator, constraints, seed, name, inboxes, reports, migration_topology, migration_interval, num_migrants, settings):
+	for inbox in inboxes:
+		inbox.cancel_join_thread()
+	migrator = TopologyMigrator(inboxes, island, migration_topology, migration_interval, num_migrants)
+	algorithm = run_optimization(scenario, evaluator, constraints, seed=seed, name=name, migrator=migrator, observers=[island_observer], verbose=False,
+								island=island, island_reports=reports, **settings)
+	best = algorithm.best
+	reports.put(('done', island, list(best.candidate), best.fitness, migrator.num_sent, migrator.num_received))
+
+
+def run_islands(scenario, evaluator, constraints, num_islands=4, migration_topology='ring', migration_interval=10, num_migrants=1, max_eval=100000,
+		optimizer='ga', catalog='drones_ec_catalog.sqlite', poll_interval=1.0, **settings):
+	'''
+	Function to run the island model of the optimizer on one scenario. Each island is a separate process running run_optimization,
+	with its own seed and its own individuals, statistics and progress files (tagged with "_island<i>").
+	The main process prints the progress of every island and the global best, saves the per-island progress to
+	"drones_ec_islands_scenario<x>_<timestamp>.csv" and the global best to the usual best individual parameters file.
+	An island whose process dies without completing (e.g. an exception, or a crash of the simulator) is reported and counted as finished,
+	so the other islands still complete the run; an island killed by a signal is marked as failed in the run catalog.
+	Returns the tuple (best candidate, best fitness) of all the islands.
+	- scenario --> number of the scenario, used to name the output files
+	- evaluator --> simulation evaluator of the scenario
+	- constraints --> boundaries of the candidate's chromosomes
+	- num_islands --> number of islands (i.e. of processes)
+	- migration_topology --> 'ring', 'fully_connected' or 'random', see topology_neighbors
+	- migration_interval --> number of generations between two migrations
+	- num_migrants --> number of elites sent to each neighbour at each migration
+	- max_eval --> maximum number of evaluations of the whole model, split evenly among the islands
+	- optimizer --> optimizer backend of the islands, only 'ga' (see the module description)
+	- catalog --> SQLite run catalog of the islands runs (None to not record them)
+	- poll_interval --> seconds the main process waits for a report before checking that the island processes are alive
+	- settings --> other settings of run_optimization (e.g. popul_size), used by every island
+	'''
+	if optimizer != 'ga' and num_islands > 1:
+		raise ValueError('the island model migrates individuals of the genetic algorithm, it is not available with the {0} optimizer'.format(optimizer))
+	now = datetime.now()
+	timestamp = now.strftime('%Y_%m_%d_%H_%M_%S')
+	seed = int(time())
+
+	inboxes = [multiprocessing.Queue(4 * num_migrants * num_islands) for i in range(num_islands)]
+	reports = multiprocessing.Queue()
+	processes = []
+	names = []
+	for island in range(num_islands):
+		name = 'scenario{0}_{1}_island{2}'.format(scenario, timestamp, island)
+		island_settings = dict(settings, max_eval=max_eval // num_islands, optimizer=optimizer, catalog=catalog)
+		names.append(name)
+		process = multiprocessing.Process(target=_island_process, args=(island, scenario, evaluator, constraints, seed + island, name, inboxes, reports,
+														migration_topology, migration_interval, num_migrants, island_settings))
+		process.start()
+		processes.append(process)
+
+	best_candidate = None
+	best_fitness = None
+	island_best = [None] * num_islands
+	status = [None] * num_islands
+	exited = set()
+	with open('drones_ec_islands_scenario{0}_{1}.csv'.format(scenario, timestamp), mode='w') as islands_file:
+		islands_writer = csv.writer(islands_file, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+		while None in status:
+			try:
+				report = reports.get(timeout=poll_interval)
+			except queue.Empty:
+				# a process which exited has already flushed its reports: if it is still not done one poll later, it died
+				for island, process in enumerate(processes):
+					if status[island] is None and not process.is_alive():
+						if island not in exited:
+							exited.add(island)
+							continue
+						status[island] = 'failed'
+						print('Island {0} failed: its process exited with code {1}'.format(island, process.exitcode))
+						if catalog is not None and process.exitcode < 0:
+							RunCatalog(catalog).finish_run(names[island], 'failed', error='killed by signal {0}'.format(-process.exitcode))
+				continue
+			if report[0] == 'progress':
+				island, num_generations, num_evaluations, fitness, candidate = report[1:]
+				islands_writer.writerow([island, num_generations, num_evaluations, fitness])
+				island_best[island] = fitness
+				if best_fitness is None or fitness < best_fitness:
+					best_candidate, best_fitness = candidate, fitness
+				print('Island: {0}  Generations: {1}  Evaluations: {2}  Best: {3}  Global best: {4}'.format(island, num_generations, num_evaluations, fitness, best_fitness))
+			else:
+				island, candidate, fitness, num_sent, num_received = report[1:]
+				if best_fitness is None or fitness < best_fitness:
+					best_candidate, best_fitness = candidate, fitness
+				print('Island {0} completed, best: {1}, migrants sent: {2}, received: {3}'.format(island, fitness, num_sent, num_received))
+				status[island] = 'completed'
+			islands_file.flush()
+
+	for process in processes:
+		process.join()
+
+	failed = [island for island in range(num_islands) if status[island] == 'failed']
+	if failed:
+		print('\n{0} of {1} islands failed: {2}'.format(len(failed), num_islands, failed))
+	if best_candidate is None:
+		raise RuntimeError('all the islands failed before reporting any individual')
+
+	print('\nFittest individual of all the islands:\n')
+	print('{0} : {1}'.format(best_candidate, best_fitness))
+
+	with open('best_individual_parameters_scenario{0}_{1}.csv'.format(scenario, timestamp), mode='w') as best_individual_file:
+		best_individual_writer = csv.writer(best_individual_file, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+		best_individual_writer.writerow(best_candidate[:len(constraints[0])])
+
+	return best_candidate, best_fitness
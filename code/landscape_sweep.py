@@ -0,0 +1,274 @@
+'''
+landscape_sweep.py
+This module evaluates the fitness landscape of a scenario over a subset of the genes, with the other genes fixed, to see how the fitness varies
+within the constraints without running the optimizer. The design is a full-factorial grid with --levels values of each swept gene, or a
+Latin hypercube ('lhs') or scrambled Sobol ('sobol') design of --samples points. The sweep is a directory with:
+- "points.npy" --> one row of genes (all of them, the fixed ones included) per point of the design
+- "fitness.npy" --> fitness of each point, nan until the point is evaluated; for a grid, point i is the i-th of the grid in C order, so the
+	array reshaped to the levels of the swept genes is indexed by their level numbers
+- "sweep.json" --> scenario, swept genes, design and their levels, fixed genes and step budget
+Both arrays are memory-mapped. The points which are still nan are evaluated in batches by a pool of processes, and the fitness of every batch
+is written as soon as it is evaluated, so an interrupted sweep is resumed by running the same command again. The heatmaps (a line for one gene)
+of the stored fitness are rendered with --plot, also while the sweep is running, without evaluating anything; the other swept genes are
+reduced with the minimum or the mean of the fitness, or sliced at the level nearest to --at.
+
+Usage:
+python landscape_sweep.py sweep_scenario1_t_horiz_max_speed --scenario 1 --genes t_horiz max_speed --levels 40 --workers 16
+python landscape_sweep.py sweep_scenario3_lhs --scenario 3 --genes neigh_dist t_horiz t_horiz_obst --design lhs --samples 5000 --base best_individual_parameters_scenario3.csv
+python landscape_sweep.py sweep_scenario1_t_horiz_max_speed --plot t_horiz max_speed --log
+python landscape_sweep.py sweep_scenario3_lhs --plot t_horiz t_horiz_obst --bins 30 --show
+'''
+
+import matplotlib
+import argparse
+import json
+import os
+import warnings
+from multiprocessing import Pool
+from random import Random
+from time import time
+import numpy as np
+from parameters import gene_names, constraints, read_parameters
+from sampling import space_filling_design
+
+
+def create_sweep(directory, scenario, genes, base, design='grid', levels=(20,), samples=1000, seed=0, max_steps=None):
+	'''
+	Function to create the store of a sweep, with the points of its design and no fitness yet.
+	Returns the settings of the sweep.
+	- genes --> names of the swept genes
+	- base --> chromosome whose values are used for the genes which are not swept
+	- design --> 'grid' (full factorial), 'lhs' (Latin hypercube) or 'sobol' (scrambled Sobol sequence)
+	- levels --> number of values of each swept gene in the grid (one number for all of them)
+	- samples, seed --> number of points and seed of the 'lhs' and 'sobol' designs
+	- max_steps --> step budget of each simulation (None for no budget)
+	'''
+	indices = [gene_names.index(gene) for gene in genes]
+	lower_bound = [constraints[0][i] for i in indices]
+	upper_bound = [constraints[1][i] for i in indices]
+	settings = {'scenario': scenario, 'genes': list(genes), 'design': design, 'base': list(base), 'max_steps': max_steps}
+	if design == 'grid':
+		levels = list(levels) * len(genes) if len(levels) == 1 else list(levels)
+		settings['levels'] = [list(np.linspace(lo, hi, n)) for lo, hi, n in zip(lower_bound, upper_bound, levels)]
+		values = np.stack(np.meshgrid(*settings['levels'], indexing='ij'), axis=-1).reshape(-1, len(genes))
+	else:
+		values = np.asarray(space_filling_design(Random(seed), samples, lower_bound, upper_bound, method=design))
+		settings['seed'] = seed
+	points = np.tile(np.asarray(base, dtype=float), (len(values), 1))
+	points[:, indices] = values
+	create_store(directory, points, settings)
+	return settings
+
+
+def create_store(directory, points, settings):
+	'''
+	Function to save the points of a design, with no fitness yet, to the store of a sweep.
+	- points --> numpy array with one chromosome per row
+	- settings --> dictionary saved to "sweep.json", with at least the scenario, the swept genes, the design and the step budget (max_steps)
+	'''
+	if not os.path.isdir(directory):
+		os.makedirs(directory)
+	np.save(os.path.join(directory, 'points.npy'), points)
+	np.save(os.path.join(directory, 'fitness.npy'), np.full(len(points), np.nan))
+	with open(os.path.join(directory, 'sweep.json'), mode='w') as sweep_file:
+		json.dump(settings, sweep_file, indent=1)
+
+
+class SweepStore(object):
+	'''
+	Reader of the store of a sweep.
+	- directory --> directory of the sweep
+	- mode --> 'r' to read the fitness, 'r+' to write it
+	'''
+	def __init__(self, directory, mode='r'):
+		with open(os.path.join(directory, 'sweep.json'), mode='r') as sweep_file:
+			self.settings = json.load(sweep_file)
+		self.points = np.load(os.path.join(directory, 'points.npy'), mmap_mode='r')
+		self.fitness = np.load(os.path.join(directory, 'fitness.npy'), mmap_mode=mode)
+
+	def missing(self):
+		'''
+		Function to find the points of the design which are not evaluated yet.
+		Returns the numpy array of their indices.
+		'''
+		return np.nonzero(np.isnan(self.fitness))[0]
+
+	def grid(self):
+		'''
+		Function to read the fitness of a grid design, indexed by the level numbers of the swept genes.
+		Returns the numpy array with one axis per swept gene.
+		'''
+		return np.asarray(self.fitness).reshape([len(levels) for levels in self.settings['levels']])
+
+
+def evaluate_batch(task):
+	'''
+	Function to evaluate a batch of points of a sweep with the simulation evaluator of its scenario, in a process of the pool.
+	Returns the tuple (indices, fitness) of the batch.
+	'''
+	from inspyred_functions import scenario_evaluators
+	scenario, indices, points, max_steps = task
+	return indices, scenario_evaluators[scenario](points.tolist(), {'max_simulation_steps': max_steps})
+
+
+def run_sweep(directory, workers=os.cpu_count(), batch_size=50, verbose=True):
+	'''
+	Function to evaluate the points of a sweep which are not evaluated yet, writing the fitness of each batch as soon as it is evaluated.
+	Returns the number of points evaluated.
+	'''
+	store = SweepStore(directory, mode='r+')
+	missing = store.missing()
+	batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+	tasks = [(store.settings['scenario'], indices, np.asarray(store.points[indices]), store.settings['max_steps']) for indices in batches]
+	start = time()
+	done = 0
+	with Pool(workers) as pool:
+		for indices, fitness in pool.imap_unordered(evaluate_batch, tasks):
+			store.fitness[indices] = fitness
+			store.fitness.flush()
+			done += len(indices)
+			if verbose:
+				print('{0}/{1} points evaluated ({2} in this session, {3:.1f} points/s)'.format(len(store.fitness) - len(missing) + done, len(store.fitness),
+																							done, done / max(time() - start, 1e-9)))
+	return done
+
+
+def landscape_slice(store, genes, reduce='min', at=None, bins=20):
+	'''
+	Function to compute the fitness over one or two swept genes from the stored fitness (the points not evaluated yet are nan).
+	Returns the tuple (axes, values): the list of the values of each gene and the numpy array of the fitness, with one axis per gene.
+	- reduce --> 'min' or 'mean', reduction of the fitness over the other swept genes (and, for the 'lhs' and 'sobol' designs, within each bin)
+	- at --> dictionary with values of other swept genes of a grid: the slice is taken at their nearest levels instead of reducing them
+	- bins --> number of bins of each gene for the 'lhs' and 'sobol' designs
+	'''
+	swept = store.settings['genes']
+	reducer = np.nanmin if reduce == 'min' else np.nanmean
+	if store.settings['design'] == 'grid':
+		values = store.grid()
+		index = []
+		for gene, levels in zip(swept, store.settings['levels']):
+			if at is not None and gene in at and gene not in genes:
+				index.append(int(np.argmin(np.abs(np.asarray(levels) - at[gene]))))
+			else:
+				index.append(slice(None))
+		values = values[tuple(index)]
+		remaining = [gene for gene, i in zip(swept, index) if isinstance(i, slice)]
+		other = tuple(i for i, gene in enumerate(remaining) if gene not in genes)
+		if other:
+			values = reducer(values, axis=other)
+		kept = [gene for gene in remaining if gene in genes]
+		if kept != list(genes):
+			values = values.T
+		return [np.asarray(store.settings['levels'][swept.index(gene)]) for gene in genes], values
+
+	columns = [gene_names.index(gene) for gene in genes]
+	edges = [np.linspace(constraints[0][i], constraints[1][i], bins + 1) for i in columns]
+	evaluated = ~np.isnan(store.fitness)
+	cells = [np.clip(np.digitize(store.points[evaluated, i], e) - 1, 0, bins - 1) for i, e in zip(columns, edges)]
+	flat = np.ravel_multi_index(cells, [bins] * len(genes))
+	fitness = np.asarray(store.fitness)[evaluated]
+	values = np.full(bins ** len(genes), np.nan)
+	for cell in np.unique(flat):
+		values[cell] = reducer(fitness[flat == cell])
+	return [(e[:-1] + e[1:]) / 2 for e in edges], values.reshape([bins] * len(genes))
+
+
+def plot_landscape(ax, store, genes, reduce='min', at=None, bins=20, log=False):
+	'''
+	Function to plot the fitness over one gene (line) or two genes (heatmap) of a sweep, see landscape_slice, marking the fittest value.
+	'''
+	with warnings.catch_warnings():
+		warnings.simplefilter('ignore', RuntimeWarning) # the cells with no evaluated points yet are nan
+		axes, values = landscape_slice(store, genes, reduce, at, bins)
+	if len(genes) == 1:
+		ax.plot(axes[0], values, color='b', marker='.')
+		ax.set_xlabel(genes[0])
+		ax.set_ylabel('Fitness')
+		if log:
+			ax.set_yscale('log')
+		if not np.all(np.isnan(values)):
+			best = np.nanargmin(values)
+			ax.plot(axes[0][best], values[best], 'r*', markersize=12)
+		return
+	norm = matplotlib.colors.LogNorm() if log else None
+	mesh = ax.pcolormesh(axes[0], axes[1], values.T, shading='nearest', cmap='viridis', norm=norm)
+	ax.figure.colorbar(mesh, ax=ax, label='Fitness')
+	if not np.all(np.isnan(values)):
+		best = np.unravel_index(np.nanargmin(values), values.shape)
+		ax.plot(axes[0][best[0]], axes[1][best[1]], 'r*', markersize=12)
+	ax.set_xlabel(genes[0])
+	ax.set_ylabel(genes[1])
+
+
+def parse_value(text):
+	'''
+	Function to parse a "gene=value" argument of the command line.
+	'''
+	gene, value = text.split('=', 1)
+	if gene not in gene_names:
+		raise argparse.ArgumentTypeError('unknown gene {0}'.format(gene))
+	return gene, float(value)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Evaluate the fitness landscape over some genes in resumable parallel batches, or plot it from the stored fitness.')
+	parser.add_argument('sweep', help='directory of the sweep, created if missing and resumed otherwise')
+	parser.add_argument('--scenario', type=int, choices=[1, 2, 3, 4], default=None)
+	parser.add_argument('--genes', nargs='+', choices=gene_names, default=None, help='swept genes')
+	parser.add_argument('--design', choices=['grid', 'lhs', 'sobol'], default='grid')
+	parser.add_argument('--levels', type=int, nargs='+', default=[20], help='values of each swept gene in the grid (one number for all of them)')
+	parser.add_argument('--samples', type=int, default=1000, help='points of the lhs and sobol designs')
+	parser.add_argument('--seed', type=int, default=0, help='seed of the lhs and sobol designs')
+	parser.add_argument('--base', default=None, help='best individual parameters file with the values of the genes which are not swept (default: middle of the constraints)')
+	parser.add_argument('--fixed', type=parse_value, nargs='+', default=[], help='values of genes which are not swept, as gene=value')
+	parser.add_argument('--max_steps', type=int, default=None, help='step budget of each simulation (None for no budget)')
+	parser.add_argument('--batch_size', type=int, default=50, help='points evaluated by a task of the pool')
+	parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of processes which run the simulations')
+	parser.add_argument('--plot', nargs='+', choices=gene_names, default=None, help='plot the stored fitness over one or two swept genes, without evaluating')
+	parser.add_argument('--reduce', choices=['min', 'mean'], default='min', help='reduction of the fitness over the other swept genes')
+	parser.add_argument('--at', type=parse_value, nargs='+', default=[], help='slice a grid at these values of other swept genes, as gene=value')
+	parser.add_argument('--bins', type=int, default=20, help='bins of each gene in the plots of the lhs and sobol designs')
+	parser.add_argument('--log', action='store_true', help='logarithmic fitness scale')
+	parser.add_argument('--show', action='store_true', help='show the plot in a window instead of saving it in the sweep directory')
+	args = parser.parse_args()
+
+	if args.plot is not None:
+		store = SweepStore(args.sweep)
+		if len(args.plot) > 2 or any(gene not in store.settings['genes'] for gene in args.plot):
+			parser.error('the plot needs one or two of the swept genes {0}'.format(store.settings['genes']))
+		if not args.show:
+			matplotlib.use('Agg')
+		from matplotlib import pyplot
+		fig, ax = pyplot.subplots()
+		plot_landscape(ax, store, args.plot, args.reduce, dict(args.at), args.bins, args.log)
+		ax.set_title('Scenario {0}: {1} of {2} points evaluated'.format(store.settings['scenario'], len(store.fitness) - len(store.missing()), len(store.fitness)))
+		if args.show:
+			pyplot.show()
+		else:
+			filename = os.path.join(args.sweep, 'landscape_{0}.png'.format('_'.join(args.plot)))
+			fig.savefig(filename)
+			print('Saved ' + filename)
+		return
+
+	if os.path.isfile(os.path.join(args.sweep, 'sweep.json')):
+		store = SweepStore(args.sweep)
+		print('Resuming the sweep of scenario {0} over {1}: {2} of {3} points to evaluate'.format(store.settings['scenario'], ', '.join(store.settings['genes']),
+																								len(store.missing()), len(store.fitness)))
+	else:
+		if args.scenario is None or args.genes is None:
+			parser.error('a new sweep needs --scenario and --genes')
+		base = read_parameters(args.base) if args.base is not None else [(lo + hi) / 2. for lo, hi in zip(*constraints)]
+		for gene, value in args.fixed:
+			base[gene_names.index(gene)] = value
+		create_sweep(args.sweep, args.scenario, args.genes, base[:len(gene_names)], args.design, args.levels, args.samples, args.seed, args.max_steps)
+	start = time()
+	done = run_sweep(args.sweep, args.workers, args.batch_size)
+	store = SweepStore(args.sweep)
+	best = int(np.nanargmin(store.fitness))
+	print('{0} points evaluated in {1:.0f} s. Fittest point: {2} (fitness {3})'.format(done, time() - start,
+		', '.join('{0}={1:.4f}'.format(gene, value) for gene, value in zip(gene_names, store.points[best])), store.fitness[best]))
+
+
+
+if __name__ == '__main__':
+	main()
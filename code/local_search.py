@@ -0,0 +1,100 @@
+'''
+local_search.py
+This module contains the memetic phase of the optimizer: a pattern search which polishes the elite of the population
+every "local_search_interval" generations and the best individual at the end of the run.
+The probe points of each iteration are evaluated as one batch, so they run in parallel when the evaluator is parallel (see "num_workers"),
+and all the simulations are counted in the evaluations of the run.
+'''
+
+from surrogate import simulated_best
+from inspyred_functions import remaining_budget
+
+
+def pattern_search(evaluator, candidate, fitness, lower_bound, upper_bound, args, step=0.05, min_step=1e-3, max_evaluations=50):
+	'''
+	Function to polish a candidate with a compass pattern search (the fitness is minimized).
+	At each iteration the points at +/- step along each gene (the step is relative to the range of the gene) are evaluated in one batch:
+	the search moves to the best of them if it improves the fitness, otherwise the step is halved.
+	The search stops when the step falls below "min_step" or when "max_evaluations" probe points have been evaluated.
+	Returns the tuple (candidate, fitness, number of evaluations).
+	- evaluator --> evaluator of the probe points (e.g. the simulation evaluator of the scenario)
+	- candidate --> chromosome to polish; the values after the genes (e.g. the step sizes of the self-adaptive mutation) are kept unchanged
+	- fitness --> fitness of the candidate
+	- lower_bound / upper_bound --> boundaries of the genes
+	- args --> arguments of the EC, passed to the evaluator
+	'''
+	num_genes = len(lower_bound)
+	x = list(candidate[:num_genes])
+	tail = list(candidate[num_genes:])
+	evaluations = 0
+	while step >= min_step and evaluations < max_evaluations:
+		probes = []
+		for i, (lo, hi) in enumerate(zip(lower_bound, upper_bound)):
+			for direction in (1, -1):
+				probe = list(x)
+				probe[i] = min(max(x[i] + direction * step * (hi - lo), lo), hi)
+				if probe[i] != x[i]:
+					probes.append(probe)
+		probes = probes[:max_evaluations - evaluations]
+		if len(probes) == 0:
+			break
+		probe_fitness = evaluator([probe + tail for probe in probes], args)
+		evaluations += len(probes)
+		best = min(range(len(probes)), key=lambda k: probe_fitness[k])
+		if probe_fitness[best] < fitness:
+			x, fitness = probes[best], probe_fitness[best]
+		else:
+			step /= 2.0
+	return x + tail, fitness, evaluations
+
+
+def polish_individual(individual, args, phase='periodic'):
+	'''
+	Function to polish an individual with the pattern search, within the evaluations left in the budget of the run.
+	The individual is updated in place when the search improves it, the evaluations spent are added to the ones of the EC,
+	and the outcome is written to the "local_search_file" in args.
+	Returns the number of evaluations spent.
+	- individual --> individual to polish
+	- args --> arguments of the EC: "local_search_evaluator", "local_search_evaluations" (maximum evaluations of one search) and "local_search_step"
+	- phase --> 'periodic' (elite of a generation) or 'final' (best individual of the run), written to the local search file
+	'''
+	ec = args['_ec']
+	budget = min(args.setdefault('local_search_evaluations', 50), remaining_budget(ec.num_evaluations, args))
+	if budget <= 0:
+		return 0
+
+	before = individual.fitness
+	candidate, fitness, evaluations = pattern_search(args['local_search_evaluator'], individual.candidate, individual.fitness,
+													ec.bounder.lower_bound, ec.bounder.upper_bound, args,
+													step=args.setdefault('local_search_step', 0.05), max_evaluations=budget)
+	ec.num_evaluations += evaluations
+	if fitness < before:
+		individual.candidate = candidate
+		individual.fitness = fitness
+
+	args['local_search_spent'] = args.get('local_search_spent', 0) + evaluations
+	args['local_search_improvement'] = args.get('local_search_improvement', 0.0) + before - individual.fitness
+	local_search_file = args.get('local_search_file')
+	if local_search_file is not None:
+		local_search_file.write('{0}, {1}, {2}, {3}, {4}, {5}, {6}\n'.format(ec.num_generations, ec.num_evaluations, phase, evaluations,
+																			before, individual.fitness, (before - individual.fitness) / max(evaluations, 1)))
+		local_search_file.flush()
+	return evaluations
+
+
+class LocalSearchReplacer(object):
+	'''
+	Replacer which polishes the elite of the population with the pattern search every "local_search_interval" generations.
+	The elite is polished after the replacement of the wrapped replacer, so the improved individual takes part in the next selection.
+	- replacer --> replacer of the EC which is wrapped (e.g. generational_replacement)
+	'''
+	def __init__(self, replacer):
+		self.replacer = replacer
+		self.__name__ = self.__class__.__name__
+
+	def __call__(self, random, population, parents, offspring, args):
+		interval = args.setdefault('local_search_interval', 10)
+		survivors = self.replacer(random=random, population=population, parents=parents, offspring=offspring, args=args)
+		if interval > 0 and (args['_ec'].num_generations + 1) % interval == 0:
+			polish_individual(simulated_best(survivors), args)
+		return survivors
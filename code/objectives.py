@@ -0,0 +1,90 @@
+'''
+objectives.py
+This module contains the store of the fitness components of every simulation of a run, so that the run can be re-scored
+with a different fitness function without simulating again (see rescore_objectives.py in extras).
+The store is a directory with one binary file of 64-bit floats per column (the genes of the candidate, the generation, the fitness
+and the components returned by fitness_objectives) and a "columns.csv" file with the names of the columns.
+The columns are appended after each batch, so the store of an interrupted run is still readable.
+'''
+
+import os
+import numpy as np
+from parameters import gene_names
+
+
+class ObjectivesStore(object):
+	'''
+	Columnar store of the fitness components, keyed by the genes of the candidates.
+	- directory --> directory of the store, created if missing
+	- num_genes --> number of genes of the candidates
+	'''
+	def __init__(self, directory, num_genes):
+		self.directory = directory
+		self.num_genes = num_genes
+		self.columns = None
+		self.rows = []
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+
+	def add(self, generation, candidate, fitness, objectives):
+		'''
+		Function to add the components of one simulation to the store.
+		The components of a simulation stopped by its wall-clock budget are missing (None): they are saved as nan, with "timed_out" set to 1.
+		The names of the components are taken from the first simulation which returns them, so the rows added before it are written by a later flush.
+		'''
+		if objectives is not None and self.columns is None:
+			names = gene_names if self.num_genes == len(gene_names) else ['gene_{0}'.format(i) for i in range(self.num_genes)]
+			self.columns = list(names) + ['generation', 'fitness'] + list(objectives.keys())
+			with open(os.path.join(self.directory, 'columns.csv'), mode='w') as columns_file:
+				columns_file.write(','.join(self.columns) + '\n')
+		self.rows.append((list(candidate[:self.num_genes]) + [generation, fitness], objectives))
+
+	def flush(self):
+		'''
+		Function to append the added rows to the column files.
+		'''
+		if len(self.rows) == 0 or self.columns is None:
+			return
+		missing = dict((name, float('nan')) for name in self.columns[self.num_genes + 2:])
+		missing['timed_out'] = 1.0
+		data = np.asarray([values + [(missing if objectives is None else objectives)[name] for name in self.columns[self.num_genes + 2:]]
+						for values, objectives in self.rows], dtype='<f8')
+		for i, name in enumerate(self.columns):
+			with open(os.path.join(self.directory, name + '.f8'), mode='ab') as column_file:
+				data[:, i].tofile(column_file)
+		self.rows = []
+
+
+def read_objectives(directory):
+	'''
+	Function to read a store of fitness components.
+	Returns a dictionary with one numpy array per column, in the order of the store.
+	'''
+	with open(os.path.join(directory, 'columns.csv'), mode='r') as columns_file:
+		columns = columns_file.readline().strip().split(',')
+	data = {}
+	for name in columns:
+		data[name] = np.fromfile(os.path.join(directory, name + '.f8'), dtype='<f8')
+	size = min(len(values) for values in data.values())
+	return {name: values[:size] for name, values in data.items()}
+
+
+def objectives_evaluation(candidates, args):
+	'''
+	Funtion to evaluate the candidates with the "objectives_evaluator" in args and save the components of their fitness
+	to the "objectives_store" in args, tagged with the current generation.
+	The evaluator is called with "store_objectives" in args, so it returns the tuples (fitness, objectives) (see the simulation evaluators).
+	Returns the list of fitness values.
+	- candidates --> candidates chromosomes generated by the EC
+	'''
+	evaluator = args['objectives_evaluator']
+	store = args['objectives_store']
+	generation = args['_ec'].num_generations
+
+	results = evaluator(candidates, args)
+	fitness = []
+	for chromosome, (fit, objectives) in zip(candidates, results):
+		store.add(generation, chromosome, fit, objectives)
+		fitness.append(fit)
+	store.flush()
+	return fitness
@@ -0,0 +1,181 @@
+'''
+optimizers.py
+This module contains the ask/tell optimizer backends (CMA-ES and Differential Evolution) and the evolutionary computation which drives them.
+The optimizers work on whole batches with numpy: "ask" returns the candidates of a generation, "tell" receives their fitness values.
+They run inside the evolve loop of inspyred, so they use the same bounder, evaluators, observers and output files of the genetic algorithm.
+'''
+
+import inspyred
+import numpy as np
+from math import log, sqrt
+
+
+class CMAES(object):
+	'''
+	Covariance Matrix Adaptation Evolution Strategy, (mu/mu_w, lambda) version with cumulative step-size adaptation.
+	The search runs in the unit hypercube obtained by normalizing the genes with the bounder limits. Fitness is minimized.
+	- lower_bound / upper_bound --> bounder limits
+	- random --> random number generator of the run, used to seed the numpy generator
+	- mean --> initial mean of the search distribution (default: center of the bounds)
+	- popsize --> number of candidates per generation (default: 4 + 3 ln(n))
+	- sigma --> initial step size, relative to the bounds ranges
+	'''
+	def __init__(self, lower_bound, upper_bound, random, mean=None, popsize=None, sigma=0.3):
+		self.lower_bound = np.asarray(lower_bound, dtype=float)
+		self.scale = np.asarray(upper_bound, dtype=float) - self.lower_bound
+		self.rng = np.random.RandomState(random.randint(0, 2**32 - 1))
+		n = len(self.lower_bound)
+		self.n = n
+		self.popsize = popsize if popsize else 4 + int(3 * log(n))
+		self.mu = self.popsize // 2
+		weights = log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+		self.weights = weights / weights.sum()
+		self.mueff = 1.0 / (self.weights ** 2).sum()
+		self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+		self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+		self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+		self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+		self.damps = 1 + 2 * max(0, sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+		self.chi_n = sqrt(n) * (1 - 1.0 / (4 * n) + 1.0 / (21 * n ** 2))
+		if mean is None:
+			self.mean = np.full(n, 0.5)
+		else:
+			self.mean = (np.asarray(mean[:n], dtype=float) - self.lower_bound) / self.scale
+		self.sigma = sigma
+		self.pc = np.zeros(n)
+		self.ps = np.zeros(n)
+		self.C = np.eye(n)
+		self.B = np.eye(n)
+		self.D = np.ones(n)
+		self.generation = 0
+
+	def ask(self):
+		'''
+		Function to sample a new generation.
+		Returns the list of candidates, in the gene space.
+		'''
+		z = self.rng.standard_normal((self.popsize, self.n))
+		x = self.mean + self.sigma * (z * self.D).dot(self.B.T)
+		return (self.lower_bound + x * self.scale).tolist()
+
+	def tell(self, candidates, fitness):
+		'''
+		Function to update the search distribution with the evaluated candidates of a generation.
+		The candidates are the ones actually evaluated (i.e. after the bounder), so the update follows the repaired points.
+		'''
+		x = (np.asarray(candidates, dtype=float)[:, :self.n] - self.lower_bound) / self.scale
+		order = np.argsort(fitness)[:self.mu]
+		y = (x[order] - self.mean) / self.sigma
+		step = self.weights.dot(y)
+		self.mean = self.mean + self.sigma * step
+		self.generation += 1
+
+		inv_sqrt_c = self.B.dot(np.diag(1 / self.D)).dot(self.B.T)
+		self.ps = (1 - self.cs) * self.ps + sqrt(self.cs * (2 - self.cs) * self.mueff) * inv_sqrt_c.dot(step)
+		norm_ps = np.linalg.norm(self.ps)
+		hsig = norm_ps / sqrt(1 - (1 - self.cs) ** (2 * self.generation)) / self.chi_n < 1.4 + 2.0 / (self.n + 1)
+		self.pc = (1 - self.cc) * self.pc + hsig * sqrt(self.cc * (2 - self.cc) * self.mueff) * step
+		rank_mu = (self.weights[:, None] * y).T.dot(y)
+		self.C = (1 - self.c1 - self.cmu) * self.C + self.c1 * (np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C) + self.cmu * rank_mu
+		self.sigma *= np.exp((self.cs / self.damps) * (norm_ps / self.chi_n - 1))
+
+		self.C = np.triu(self.C) + np.triu(self.C, 1).T
+		eigenvalues, self.B = np.linalg.eigh(self.C)
+		self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+
+
+class DifferentialEvolution(object):
+	'''
+	Differential Evolution, DE/rand/1/bin version with one-to-one greedy replacement. Fitness is minimized.
+	- population --> initial population, as a list of candidates
+	- fitness --> fitness values of the initial population
+	- random --> random number generator of the run, used to seed the numpy generator
+	- differential_weight --> scale factor F of the difference vectors
+	- crossover_probability --> probability CR of taking each gene from the mutant vector
+	'''
+	def __init__(self, population, fitness, random, differential_weight=0.5, crossover_probability=0.9):
+		self.rng = np.random.RandomState(random.randint(0, 2**32 - 1))
+		self.x = np.asarray(population, dtype=float)
+		self.fitness = np.asarray(fitness, dtype=float)
+		self.differential_weight = differential_weight
+		self.crossover_probability = crossover_probability
+		self.popsize, self.n = self.x.shape
+
+	def ask(self):
+		'''
+		Function to create one trial vector for each member of the population.
+		Returns the list of trial candidates, in the same order as the population.
+		'''
+		others = np.array([self.rng.choice(np.delete(np.arange(self.popsize), i), 3, replace=False) for i in range(self.popsize)])
+		mutant = self.x[others[:, 0]] + self.differential_weight * (self.x[others[:, 1]] - self.x[others[:, 2]])
+		cross = self.rng.random_sample((self.popsize, self.n)) < self.crossover_probability
+		cross[np.arange(self.popsize), self.rng.randint(0, self.n, self.popsize)] = True
+		return np.where(cross, mutant, self.x).tolist()
+
+	def tell(self, candidates, fitness):
+		'''
+		Function to replace each member of the population by its trial vector, if the trial is not worse.
+		'''
+		trial = np.asarray(candidates, dtype=float)
+		trial_fitness = np.asarray(fitness, dtype=float)
+		better = trial_fitness <= self.fitness
+		self.x[better] = trial[better]
+		self.fitness[better] = trial_fitness[better]
+
+
+class AskTellEC(inspyred.ec.EvolutionaryComputation):
+	'''
+	Evolutionary computation driven by an ask/tell optimizer.
+	The initial population is created by the generator of the run. Then, at each generation, the offspring are asked to the optimizer,
+	bounded with the bounder of the run, evaluated in one batch by the evaluator and told back to the optimizer.
+	For CMA-ES the population is the last generation plus the "num_elites" best individuals, for DE it is the DE population itself.
+	- random --> random number generator of the run
+	- optimizer --> name of the optimizer, 'cmaes' or 'de'
+
+	Optional keyword arguments in evolve args:
+	- optimizer_popsize --> number of candidates per generation of CMA-ES (default: 4 + 3 ln(n)); DE uses the population size
+	- cmaes_sigma --> initial step size of CMA-ES, relative to the bounds ranges (default 0.3)
+	- de_differential_weight / de_crossover_probability --> F and CR of DE (default 0.5 and 0.9)
+	'''
+	def __init__(self, random, optimizer):
+		inspyred.ec.EvolutionaryComputation.__init__(self, random)
+		self.optimizer_name = optimizer
+		self.optimizer = None
+		self.selector = inspyred.ec.selectors.default_selection
+		self.variator = self._ask
+		self.replacer = self._tell
+
+	def _sign(self):
+		return -1.0 if self.maximize else 1.0
+
+	def _create_optimizer(self, args):
+		fitness = [self._sign() * p.fitness for p in self.population]
+		if self.optimizer_name == 'cmaes':
+			best = min(zip(fitness, range(len(fitness))))[1]
+			return CMAES(self.bounder.lower_bound, self.bounder.upper_bound, self._random,
+						mean=self.population[best].candidate,
+						popsize=args.setdefault('optimizer_popsize', None),
+						sigma=args.setdefault('cmaes_sigma', 0.3))
+		elif self.optimizer_name == 'de':
+			return DifferentialEvolution([p.candidate for p in self.population], fitness, self._random,
+						differential_weight=args.setdefault('de_differential_weight', 0.5),
+						crossover_probability=args.setdefault('de_crossover_probability', 0.9))
+		raise ValueError('unknown optimizer {0}'.format(self.optimizer_name))
+
+	def _ask(self, random, candidates, args):
+		if self.optimizer is None:
+			self.optimizer = self._create_optimizer(args)
+		return [self.bounder(c, args) for c in self.optimizer.ask()]
+
+	def _tell(self, random, population, parents, offspring, args):
+		self.optimizer.tell([o.candidate for o in offspring], [self._sign() * o.fitness for o in offspring])
+		if isinstance(self.optimizer, DifferentialEvolution):
+			survivors = []
+			for candidate, fit in zip(self.optimizer.x.tolist(), self.optimizer.fitness):
+				ind = inspyred.ec.Individual(candidate, maximize=self.maximize)
+				ind.fitness = self._sign() * fit
+				survivors.append(ind)
+			return survivors
+		num_elites = args.setdefault('num_elites', 0)
+		population.sort(reverse=True)
+		return sorted(offspring + population[:num_elites], reverse=True)
@@ -0,0 +1,26 @@
+'''
+parameters.py
+This module contains the parameters of ORCA optimized by the EC: the names of the genes of the candidates, their boundaries, the penalty fitness
+of the timed-out simulations and the reader of the best individual parameters files. It does not import RVO2, so the scripts which only read
+or plot the results can use it without the simulator.
+'''
+
+import csv
+
+gene_names = ['neigh_dist', 'max_neigh', 't_horiz', 't_horiz_obst', 'max_speed']
+# 				neigh_dist	maxNeigh	    t_horiz  	     t_horiz_obst      max_speed
+constraints=((0.1,		1,    		0.1,   				0.1,				0.5),
+             	(5,    		3, 			10,   				10,				5))
+
+# Penalty fitness of the simulations which exceed their step budget ("max_simulation_steps") or their wall-clock budget ("evaluation_time_budget"):
+# it is worse than the fitness of any completed simulation, so the timed-out candidates are discarded by the selection
+timeout_fitness = 1e4
+
+
+def read_parameters(filename):
+	'''
+	Function to read a best individual parameters file.
+	Returns the list of the parameters.
+	'''
+	with open(filename, mode='r') as best_individual_file:
+		return [float(value) for row in csv.reader(best_individual_file, delimiter=',') for value in row]
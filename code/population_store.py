@@ -0,0 +1,159 @@
+'''
+population_store.py
+This module contains the binary replacement of inspyred's file_observer.
+The individuals and the statistics of every generation are appended, as one block of 64-bit values, to the column files of a store directory
+("generation.i4", "fitness.f8", "candidates.f8" with one row of genes per individual, "integers.u1" with one byte per gene, set for the genes which
+are integers in the candidate, e.g. the ones clipped by the bounder to an integer bound, and "statistics.f8" with one row per generation).
+The blocks are written by a background thread, through a bounded queue, so the evolution does not wait for the disk.
+The store can be exported to the CSV layout of file_observer with export_csv, or from the command line:
+
+python population_store.py drones_ec_population_scenario1_2020_09_01_10_00_00
+'''
+
+import json
+import os
+import queue
+import sys
+import threading
+from time import time
+import numpy as np
+import inspyred
+
+
+class PopulationWriter(object):
+	'''
+	Background writer of a population store.
+	- directory --> directory of the store, created if missing
+	- max_queue --> maximum number of generation blocks waiting to be written; when the queue is full the evolution waits for the writer
+	'''
+	def __init__(self, directory, max_queue=16):
+		self.directory = directory
+		self.queue = queue.Queue(max_queue)
+		self.width = None
+		self.write_time = 0.0
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+		self.thread = threading.Thread(target=self._write)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def put(self, generation, fitness, candidates, statistics, integers=None):
+		'''
+		Function to queue the block of one generation.
+		- generation --> number of the generation
+		- fitness --> numpy array with the fitness of the individuals
+		- candidates --> numpy array with one row of genes per individual
+		- statistics --> list with size, worst, best, median, mean and standard deviation of the fitness
+		- integers --> boolean numpy array with the shape of candidates, True for the genes which are integers in the candidates (None for none)
+		'''
+		if integers is None:
+			integers = np.zeros(candidates.shape, dtype=bool)
+		self.queue.put((generation, fitness, candidates, statistics, integers))
+
+	def _append(self, name, data):
+		with open(os.path.join(self.directory, name), mode='ab') as column_file:
+			data.tofile(column_file)
+
+	def _write(self):
+		while True:
+			block = self.queue.get()
+			if block is None:
+				break
+			start = time()
+			generation, fitness, candidates, statistics, integers = block
+			if self.width is None:
+				self.width = candidates.shape[1]
+				with open(os.path.join(self.directory, 'store.json'), mode='w') as store_file:
+					json.dump({'width': self.width, 'statistics': ['generation', 'size', 'worst', 'best', 'median', 'mean', 'std']}, store_file)
+			self._append('generation.i4', np.full(len(fitness), generation, dtype='<i4'))
+			self._append('fitness.f8', fitness.astype('<f8'))
+			self._append('candidates.f8', candidates.astype('<f8'))
+			self._append('integers.u1', integers.astype('u1'))
+			self._append('statistics.f8', np.asarray([generation] + list(statistics), dtype='<f8'))
+			self.write_time += time() - start
+
+	def close(self):
+		'''
+		Function to write the queued blocks and stop the writer.
+		'''
+		self.queue.put(None)
+		self.thread.join()
+
+
+def binary_observer(population, num_generations, num_evaluations, args):
+	'''
+	Function to save the individuals and the statistics of the population to the "population_writer" in args.
+	It replaces inspyred's file_observer: the same values are saved, in binary, by the background thread of the writer.
+	'''
+	stats = inspyred.ec.analysis.fitness_statistics(population)
+	fitness = np.asarray([p.fitness for p in population], dtype=float)
+	candidates = np.asarray([p.candidate for p in population], dtype=float)
+	integers = np.asarray([[isinstance(gene, int) for gene in p.candidate] for p in population], dtype=bool)
+	args['population_writer'].put(num_generations, fitness, candidates, [len(population), stats['worst'], stats['best'], stats['median'], stats['mean'], stats['std']],
+								integers)
+
+
+class TimedObserver(object):
+	'''
+	Observer which measures the time spent by the wrapped observer on the evolution thread, accumulated in "observer_time" in args.
+	- observer --> observer of the EC which is wrapped (e.g. file_observer or binary_observer)
+	'''
+	def __init__(self, observer):
+		self.observer = observer
+		self.__name__ = observer.__name__
+
+	def __call__(self, population, num_generations, num_evaluations, args):
+		start = time()
+		self.observer(population, num_generations, num_evaluations, args)
+		args['observer_time'] = args.get('observer_time', 0.0) + time() - start
+
+
+def read_population(directory):
+	'''
+	Function to read a population store.
+	Returns the tuple (generations, fitness, candidates, statistics) of numpy arrays, with one row per individual (one row per generation for the statistics).
+	'''
+	with open(os.path.join(directory, 'store.json'), mode='r') as store_file:
+		width = json.load(store_file)['width']
+	generations = np.fromfile(os.path.join(directory, 'generation.i4'), dtype='<i4')
+	fitness = np.fromfile(os.path.join(directory, 'fitness.f8'), dtype='<f8')
+	candidates = np.fromfile(os.path.join(directory, 'candidates.f8'), dtype='<f8')
+	statistics = np.fromfile(os.path.join(directory, 'statistics.f8'), dtype='<f8')
+	size = min(len(generations), len(fitness), len(candidates) // width)
+	return generations[:size], fitness[:size], candidates[:size * width].reshape(size, width), statistics[:len(statistics) // 7 * 7].reshape(-1, 7)
+
+
+def export_csv(directory, individuals_file_name, statistics_file_name):
+	'''
+	Function to export a population store to the individuals and statistics files of file_observer, with the same layout.
+	The integer genes are written as integers, as file_observer does (all the genes are written as floats for the stores without "integers.u1").
+	'''
+	generations, fitness, candidates, statistics = read_population(directory)
+	integers = np.zeros(candidates.shape, dtype=bool)
+	if os.path.isfile(os.path.join(directory, 'integers.u1')):
+		mask = np.fromfile(os.path.join(directory, 'integers.u1'), dtype='u1').astype(bool)
+		size = min(len(candidates), len(mask) // candidates.shape[1])
+		integers[:size] = mask[:size * candidates.shape[1]].reshape(size, -1)
+	with open(statistics_file_name, mode='w') as statistics_file:
+		for row in statistics:
+			statistics_file.write('{0}, {1}, {2}, {3}, {4}, {5}, {6}\n'.format(int(row[0]), int(row[1]), *row[2:]))
+	with open(individuals_file_name, mode='w') as individuals_file:
+		index = 0
+		for i in range(len(fitness)):
+			if i > 0 and generations[i] != generations[i - 1]:
+				index = 0
+			genes = [int(gene) if integer else gene for gene, integer in zip(candidates[i].tolist(), integers[i])]
+			individuals_file.write('{0}, {1}, {2}, {3}\n'.format(generations[i], index, fitness[i], str(genes)))
+			index += 1
+
+
+def main():
+	directory = sys.argv[1].rstrip('/\\')
+	name = os.path.basename(directory).replace('drones_ec_population_', '')
+	export_csv(directory, os.path.join(os.path.dirname(directory), 'drones_ec_individuals_'+name+'.csv'),
+				os.path.join(os.path.dirname(directory), 'drones_ec_statistics_'+name+'.csv'))
+
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,175 @@
+'''
+renderer.py
+This module contains the animation of a simulation, used by plot_agents and plot_paths in inspyred_functions.py and to replay the trajectory stores.
+The obstacles are drawn once, as one collection, and every frame only moves a fixed set of artists (one circle and one trail line per agent),
+which are redrawn with blitting over the cached background, so the time of a frame does not grow with the number of frames already shown:
+the part of the trails drawn at each frame is added to the background.
+The frame rate of a trajectory can be measured with the "--benchmark" option, which renders the frames off screen.
+
+Usage:
+python renderer.py drones_ec_trajectories_scenario1_2020_09_01_10_00_00 --index -1
+python renderer.py drones_ec_trajectories_scenario1_2020_09_01_10_00_00 --index -1 --benchmark
+'''
+
+import argparse
+from time import time
+import numpy as np
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from trajectories import TrajectoryStore
+
+agent_colors = ['b', 'g', 'r', 'y']
+
+
+class TrajectoryAnimation(object):
+	'''
+	Animation of the agents of a simulation.
+	- ax --> axes where the simulation is drawn
+	- positions --> positions of the agents at each time-step, with shape (time-steps, agents, 2) (e.g. the "history" of a simulation)
+	- radius --> agents radius
+	- obstacles --> list of the obstacles, each one a list of vertices (None if they are already drawn on the axes)
+	- move_agents --> boolean value used to move (True) the circles of the agents along their paths or to leave them (False) at the start
+	- trail_length --> number of time-steps of the trail drawn behind each agent (None for the whole path: the new part of the path
+		is added to the background at each frame, so that it is not drawn again)
+	- step --> number of time-steps between two frames
+	'''
+	def __init__(self, ax, positions, radius, obstacles=None, move_agents=True, trail_length=None, step=5):
+		self.ax = ax
+		self.positions = np.asarray(positions, dtype=float)
+		self.move_agents = move_agents
+		self.trail_length = trail_length
+		self.step = step
+		self.background = None
+		self.last_frame = 0
+		self.timer = None
+		if obstacles is not None:
+			ax.add_collection(PolyCollection(obstacles, facecolors='gray', edgecolors='gray'))
+		self.circles = []
+		self.trails = []
+		for agent in range(self.positions.shape[1]):
+			color = agent_colors[agent % len(agent_colors)]
+			circle = matplotlib.patches.Circle(self.positions[0, agent], radius=radius, facecolor='none', edgecolor=color, label='Agent {0}'.format(agent), animated=True)
+			ax.add_patch(circle)
+			self.circles.append(circle)
+			self.trails.append(ax.plot([], [], color=color, linewidth=1, animated=True)[0])
+		points = self.positions.reshape(-1, 2)
+		if obstacles is not None:
+			points = np.concatenate([points] + [np.asarray(obstacle, dtype=float) for obstacle in obstacles])
+		ax.set_xlim(points[:, 0].min() - 0.5, points[:, 0].max() + 0.5)
+		ax.set_ylim(points[:, 1].min() - 0.5, points[:, 1].max() + 0.5)
+		ax.set_aspect('equal')
+		ax.legend(handles=self.circles, loc='best')
+
+	@property
+	def frames(self):
+		'''
+		Time-steps drawn by the animation (the last one is always drawn).
+		'''
+		return list(range(0, len(self.positions) - 1, self.step)) + [len(self.positions) - 1]
+
+	def _draw_trails(self, start, stop):
+		for agent, trail in enumerate(self.trails):
+			trail.set_data(self.positions[start:stop + 1, agent, 0], self.positions[start:stop + 1, agent, 1])
+			self.ax.draw_artist(trail)
+
+	def draw_frame(self, canvas, frame):
+		'''
+		Function to draw the time-step "frame" on the canvas, with blitting.
+		Only the circles and the part of the trails after the previous frame are drawn, over the cached background.
+		'''
+		if self.background is None:
+			canvas.draw()
+			if self.trail_length is None:
+				self._draw_trails(0, frame)
+			self.background = canvas.copy_from_bbox(self.ax.bbox)
+		else:
+			canvas.restore_region(self.background)
+			if self.trail_length is None:
+				self._draw_trails(self.last_frame, frame)
+				self.background = canvas.copy_from_bbox(self.ax.bbox)
+		if self.trail_length is not None:
+			self._draw_trails(max(0, frame - self.trail_length), frame)
+		for agent, circle in enumerate(self.circles):
+			if self.move_agents:
+				circle.center = self.positions[frame, agent]
+			self.ax.draw_artist(circle)
+		canvas.blit(self.ax.bbox)
+		self.last_frame = frame
+
+	def _on_draw(self, event):
+		self.background = None
+		if self.timer is not None and not self.started:
+			self.started = True
+			self.timer.start()
+
+	def _next_frame(self):
+		frame = next(self.pending, None)
+		if frame is None:
+			self.timer.stop()
+			return
+		self.draw_frame(self.ax.figure.canvas, frame)
+
+	def animate(self, interval=20):
+		'''
+		Function to start the animation on the figure of the axes, when the figure is shown.
+		A full redraw of the figure (e.g. after a resize) draws again the background and the trails up to the current frame.
+		Returns the timer of the animation, which must be kept until the figure is closed.
+		'''
+		canvas = self.ax.figure.canvas
+		self.pending = iter(self.frames)
+		self.started = False
+		self.timer = canvas.new_timer(interval=interval)
+		self.timer.add_callback(self._next_frame)
+		canvas.mpl_connect('draw_event', self._on_draw)
+		return self.timer
+
+	def benchmark(self):
+		'''
+		Function to render all the frames off screen, with blitting, and measure the time of each frame.
+		Returns the numpy array of the frame times in seconds.
+		'''
+		canvas = FigureCanvasAgg(self.ax.figure)
+		self.background = None
+		self.draw_frame(canvas, 0)
+		times = []
+		for frame in self.frames:
+			start = time()
+			self.draw_frame(canvas, frame)
+			times.append(time() - start)
+		return np.asarray(times)
+
+
+def print_benchmark(times):
+	'''
+	Function to print the frame rate of a benchmark, overall and over the first and last tenth of the frames.
+	'''
+	tenth = max(1, len(times) // 10)
+	print('{0} frames: {1:.1f} frames/s, {2:.2f} ms per frame (first tenth: {3:.2f} ms, last tenth: {4:.2f} ms)'.format(
+		len(times), len(times) / times.sum(), 1000 * times.mean(), 1000 * times[:tenth].mean(), 1000 * times[-tenth:].mean()))
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Replay a trajectory of a trajectory store, or measure its frame rate.')
+	parser.add_argument('store', help='trajectory store directory')
+	parser.add_argument('--index', type=int, default=-1, help='record of the trajectory (-1 for the best individual at the end of the run)')
+	parser.add_argument('--trail_length', type=int, default=None, help='number of time-steps of the trails (default: whole path)')
+	parser.add_argument('--step', type=int, default=5, help='number of time-steps between two frames')
+	parser.add_argument('--benchmark', action='store_true', help='render the frames off screen and print the frame rate')
+	args = parser.parse_args()
+
+	store = TrajectoryStore(args.store)
+	i = store.final() if args.index == -1 else args.index
+	fig, ax = plt.subplots()
+	animation = TrajectoryAnimation(ax, store.trajectory(i), store.radius, store.obstacles, trail_length=args.trail_length, step=args.step)
+	if args.benchmark:
+		print_benchmark(animation.benchmark())
+		return
+	timer = animation.animate()
+	plt.show()
+
+
+
+if __name__ == '__main__':
+	main()
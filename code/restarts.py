@@ -0,0 +1,136 @@
+'''
+restarts.py
+This module contains the stagnation detection of the optimizer, with the automatic restarts and the early termination of the evolution.
+The stagnation is measured on the improvement of the best and of the average fitness over a window of generations,
+and on the diversity of the population in the gene space (computed with numpy on the whole population at once).
+'''
+
+import inspyred
+import numpy as np
+from optimizers import CMAES
+from surrogate import simulated_best
+from inspyred_functions import remaining_budget
+
+
+def population_diversity(population, lower_bound, upper_bound):
+	'''
+	Function to calculate the diversity of a population in the gene space.
+	Returns the average over the genes of the standard deviation of the population, with each gene scaled to the [0, 1] range of the constraints.
+	- population --> list of individuals
+	- lower_bound / upper_bound --> boundaries of the genes
+	'''
+	lower_bound = np.asarray(lower_bound, dtype=float)
+	x = np.asarray([p.candidate[:len(lower_bound)] for p in population], dtype=float)
+	x = (x - lower_bound) / (np.asarray(upper_bound, dtype=float) - lower_bound)
+	return float(x.std(axis=0).mean())
+
+
+def relative_improvement(old, new, maximize):
+	'''
+	Function to calculate the relative improvement between two fitness values.
+	'''
+	improvement = new - old if maximize else old - new
+	return improvement / max(abs(old), 1e-12)
+
+
+class StagnationController(object):
+	'''
+	Replacer which detects the stagnation of the evolution and restarts it, IPOP style, or requests its termination.
+	After the replacement of the wrapped replacer, it compares the best and the average fitness with the ones of "stagnation_window" generations before:
+	when both improved less than "stagnation_tolerance", or when the population diversity drops below "min_diversity", the evolution is stagnating.
+	On stagnation, if "stagnation_action" is 'restart' and less than "max_restarts" restarts were done, the population is replaced by a new one drawn by the generator (with the run's initializer),
+	"restart_popsize_factor" times larger and evaluated at once; otherwise stagnation_termination stops the evolution.
+	The restarted population is capped at the evaluations left in the budget (see remaining_budget), and when they are fewer than the current population size
+	the evolution is stopped instead (cause 'budget').
+	The best individual ever found is kept in "global_best" in args across the restarts, and every event is written to the "restarts_file" in args,
+	with the evaluations of the budget saved by a stop, which are also kept in "saved_evaluations" in args.
+	- replacer --> replacer of the EC which is wrapped (e.g. generational_replacement)
+	'''
+	def __init__(self, replacer):
+		self.replacer = replacer
+		self.__name__ = self.__class__.__name__
+
+	def __call__(self, random, population, parents, offspring, args):
+		ec = args['_ec']
+		action = args.setdefault('stagnation_action', 'restart')
+		window = args.setdefault('stagnation_window', 20)
+		tolerance = args.setdefault('stagnation_tolerance', 1e-3)
+		min_diversity = args.setdefault('min_diversity', 1e-3)
+		max_restarts = args.setdefault('max_restarts', 5)
+		factor = args.setdefault('restart_popsize_factor', 2)
+
+		survivors = self.replacer(random=random, population=population, parents=parents, offspring=offspring, args=args)
+
+		best = simulated_best(survivors)
+		if args.get('global_best') is None or best > args['global_best']:
+			args['global_best'] = best
+		history = args.setdefault('stagnation_history', [])
+		history.append((best.fitness, float(np.mean([p.fitness for p in survivors]))))
+		diversity = population_diversity(survivors, ec.bounder.lower_bound, ec.bounder.upper_bound)
+
+		cause = None
+		if diversity < min_diversity:
+			cause = 'diversity'
+		elif len(history) > window:
+			old_best, old_mean = history[-window - 1]
+			new_best, new_mean = history[-1]
+			if relative_improvement(old_best, new_best, ec.maximize) < tolerance and relative_improvement(old_mean, new_mean, ec.maximize) < tolerance:
+				cause = 'fitness'
+		if cause is None:
+			return survivors
+
+		num_restarts = args.setdefault('num_restarts', 0)
+		remaining = remaining_budget(ec.num_evaluations, args)
+		if action == 'restart' and num_restarts < max_restarts and remaining < len(survivors):
+			cause = 'budget'
+		if action != 'restart' or num_restarts >= max_restarts or cause == 'budget':
+			args['stagnation_stop'] = cause
+			self._log(args, 'stop', cause, len(survivors), diversity)
+			return survivors
+
+		pop_size = min(int(len(survivors) * factor), remaining)
+		args['num_selected'] = pop_size
+		args['initial_design'] = None
+		candidates = [ec.generator(random=random, args=args) for i in range(pop_size)]
+		fitness = ec.evaluator(candidates=candidates, args=args)
+		ec.num_evaluations += len(fitness)
+		restarted = []
+		for candidate, fit in zip(candidates, fitness):
+			individual = inspyred.ec.Individual(candidate, maximize=ec.maximize)
+			individual.fitness = fit
+			restarted.append(individual)
+
+		optimizer = getattr(ec, 'optimizer', None)
+		if isinstance(optimizer, CMAES):
+			args['optimizer_popsize'] = int(optimizer.popsize * factor)
+		if optimizer is not None:
+			ec.optimizer = None
+
+		args['num_restarts'] = num_restarts + 1
+		args['stagnation_history'] = []
+		self._log(args, 'restart', cause, pop_size, diversity)
+		return restarted
+
+	def _log(self, args, event, cause, pop_size, diversity):
+		ec = args['_ec']
+		num_simulations = ec.num_evaluations - args.get('num_skipped_evaluations', 0)
+		saved = max(remaining_budget(ec.num_evaluations, args), 0) if event == 'stop' else 0
+		args['saved_evaluations'] = saved
+		restarts_file = args.get('restarts_file')
+		if restarts_file is not None:
+			restarts_file.write('{0}, {1}, {2}, {3}, {4}, {5}, {6}, {7}, {8}\n'.format(ec.num_generations, ec.num_evaluations, num_simulations, event, cause, pop_size, diversity,
+																				args['global_best'].fitness, saved))
+			restarts_file.flush()
+		if not args.get('verbose', True):
+			return
+		if event == 'stop':
+			print('Stagnation ({0}): evolution stopped at {1} simulations, {2} evaluations of the budget saved'.format(cause, num_simulations, saved))
+		else:
+			print('Stagnation ({0}): restart {1} with population size {2}'.format(cause, args['num_restarts'], pop_size))
+
+
+def stagnation_termination(population, num_generations, num_evaluations, args):
+	'''
+	Function to terminate the evolution when the StagnationController requested it.
+	'''
+	return args.get('stagnation_stop') is not None
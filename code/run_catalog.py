@@ -0,0 +1,212 @@
+'''
+run_catalog.py
+This module contains the catalog of the runs: a SQLite database (by default "drones_ec_catalog.sqlite" in the working directory) with one row per run,
+written by run_optimization when the run starts and when it ends. Each row holds the scenario, the seed, the status ('running', 'completed' or 'failed'),
+the start time and the wall-clock time, the best fitness and its candidate, the numbers of evaluations and generations, all the settings of the run
+(as a JSON dictionary) and the absolute paths of its output files. The columns used to select runs are indexed, so the analysis tools get the files
+of the runs they need with a query, instead of scanning the result directories and parsing the file names.
+The runs of run_experiments.py and of the islands write to the same catalog concurrently: every operation opens its own short connection,
+which waits up to "timeout" seconds for the lock of the other writers, and the catalog is in WAL mode, so the writers never block the readers
+(WAL needs a local file system: the catalog should not be on a network share).
+
+Usage:
+python run_catalog.py --scenario 1 2 --status completed
+python run_catalog.py --scenario 3 --setting optimizer=cmaes popul_size=100 --best 10
+python ../extras/fitness_analytics.py $(python run_catalog.py --scenario 1 --status completed --files statistics population)
+'''
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from time import time
+
+schema = '''
+CREATE TABLE IF NOT EXISTS runs (
+	name TEXT PRIMARY KEY,
+	scenario INTEGER,
+	seed INTEGER,
+	status TEXT,
+	optimizer TEXT,
+	popul_size INTEGER,
+	max_eval INTEGER,
+	started TEXT,
+	start_time REAL,
+	wall_time REAL,
+	best_fitness REAL,
+	best_candidate TEXT,
+	evaluations INTEGER,
+	simulations INTEGER,
+	generations INTEGER,
+	saved_evaluations INTEGER,
+	host TEXT,
+	directory TEXT,
+	settings TEXT,
+	output_files TEXT,
+	error TEXT);
+CREATE INDEX IF NOT EXISTS runs_scenario_fitness ON runs (scenario, best_fitness);
+CREATE INDEX IF NOT EXISTS runs_status ON runs (status, scenario);
+CREATE INDEX IF NOT EXISTS runs_optimizer ON runs (optimizer, popul_size);
+CREATE INDEX IF NOT EXISTS runs_start_time ON runs (start_time);
+'''
+# columns added to the schema after its first version, which the catalogs created before get when they are opened
+added_columns = [('saved_evaluations', 'INTEGER')]
+
+
+class RunCatalog(object):
+	'''
+	Catalog of the runs.
+	- path --> SQLite database of the catalog, created if missing
+	- timeout --> seconds an operation waits for the runs which are writing to the catalog at the same time
+	'''
+	def __init__(self, path='drones_ec_catalog.sqlite', timeout=60.0):
+		self.path = os.path.abspath(path)
+		self.timeout = timeout
+		with closing(self._connect()) as connection:
+			connection.execute('PRAGMA journal_mode=WAL')
+			with connection:
+				connection.executescript(schema)
+				existing = [row['name'] for row in connection.execute('PRAGMA table_info(runs)')]
+				for column, kind in added_columns:
+					if column not in existing:
+						connection.execute('ALTER TABLE runs ADD COLUMN {0} {1}'.format(column, kind))
+
+	def _connect(self):
+		connection = sqlite3.connect(self.path, timeout=self.timeout)
+		connection.row_factory = sqlite3.Row
+		return connection
+
+	def _execute(self, statement, parameters=()):
+		with closing(self._connect()) as connection:
+			with connection:
+				return connection.execute(statement, parameters).fetchall()
+
+	def start_run(self, name, scenario, seed, settings, output_files):
+		'''
+		Function to add a run to the catalog when it starts (a run with the same name is replaced).
+		- name --> tag of the output files of the run
+		- scenario, seed --> number of the scenario and seed of the random number generator of the run
+		- settings --> dictionary of the settings of the run (the ones which are not JSON values are saved as their repr)
+		- output_files --> dictionary of the output files of the run, saved with absolute paths
+		'''
+		self._execute('INSERT OR REPLACE INTO runs (name, scenario, seed, status, optimizer, popul_size, max_eval, started, start_time, host, directory, settings, output_files) '
+					'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+					(name, scenario, seed, 'running', settings.get('optimizer'), settings.get('popul_size'), settings.get('max_eval'),
+					datetime.now().isoformat(sep=' ', timespec='seconds'), time(), socket.gethostname(), os.getcwd(),
+					json.dumps(settings, default=repr), json.dumps({key: os.path.abspath(path) for key, path in output_files.items()})))
+
+	def finish_run(self, name, status='completed', best_fitness=None, best_candidate=None, evaluations=None, simulations=None, generations=None,
+					output_files=None, error=None, saved_evaluations=None):
+		'''
+		Function to record the end of a run: its status ('completed' or 'failed'), its results and its wall-clock time.
+		- saved_evaluations --> evaluations of the budget saved by an early termination of the stagnating evolution (see restarts.py)
+		- output_files --> dictionary of the output files of the run, if they changed since its start (None to keep them)
+		- error --> description of the error which stopped a failed run
+		'''
+		values = {'status': status, 'best_fitness': best_fitness, 'evaluations': evaluations, 'simulations': simulations, 'generations': generations, 'error': error,
+				'saved_evaluations': saved_evaluations,
+				'best_candidate': None if best_candidate is None else json.dumps(list(best_candidate))}
+		if output_files is not None:
+			values['output_files'] = json.dumps({key: os.path.abspath(path) for key, path in output_files.items()})
+		self._execute('UPDATE runs SET wall_time = ? - start_time, ' + ', '.join('{0} = ?'.format(key) for key in values) + ' WHERE name = ?',
+					[time()] + list(values.values()) + [name])
+
+	def query(self, scenario=None, status=None, optimizer=None, settings=None, since=None, best=None):
+		'''
+		Function to select runs from the catalog.
+		Returns the list of the selected runs, as dictionaries with the columns of the catalog (settings, output_files and best_candidate decoded),
+		sorted by best fitness when "best" is set and by start time otherwise.
+		- scenario, status, optimizer --> lists of the allowed values of the column (None for any)
+		- settings --> dictionary of the required values of other settings (e.g. {'initializer': 'sobol'})
+		- since --> earliest start of the runs, as a date or date and time ('2020-09-01' or '2020-09-01 10:00:00')
+		- best --> number of the fittest runs selected (None for all of them)
+		'''
+		conditions = []
+		parameters = []
+		for column, values in (('scenario', scenario), ('status', status), ('optimizer', optimizer)):
+			if values is not None:
+				conditions.append('{0} IN ({1})'.format(column, ', '.join('?' * len(values))))
+				parameters.extend(values)
+		for key, value in (settings or {}).items():
+			if value is None:
+				conditions.append('json_extract(settings, ?) IS NULL')
+				parameters.append('$.' + key)
+			else:
+				conditions.append('json_extract(settings, ?) = ?')
+				parameters.extend(['$.' + key, value])
+		if since is not None:
+			conditions.append('started >= ?')
+			parameters.append(since)
+		statement = 'SELECT * FROM runs'
+		if conditions:
+			statement += ' WHERE ' + ' AND '.join(conditions)
+		if best is not None:
+			statement += ' AND best_fitness IS NOT NULL' if conditions else ' WHERE best_fitness IS NOT NULL'
+			statement += ' ORDER BY best_fitness LIMIT {0}'.format(int(best))
+		else:
+			statement += ' ORDER BY start_time'
+		runs = []
+		for row in self._execute(statement, parameters):
+			run = dict(row)
+			for key in ('settings', 'output_files', 'best_candidate'):
+				run[key] = None if run[key] is None else json.loads(run[key])
+			runs.append(run)
+		return runs
+
+
+def run_files(runs, kinds):
+	'''
+	Function to find the output files of the selected runs.
+	Returns the list with the file of the first of "kinds" (e.g. ['statistics', 'population']) which each run has.
+	'''
+	files = []
+	for run in runs:
+		for kind in kinds:
+			if kind in run['output_files']:
+				files.append(run['output_files'][kind])
+				break
+	return files
+
+
+def parse_setting(text):
+	'''
+	Function to parse a "key=value" setting of the command line, where the value is read as JSON when possible (e.g. 100, true, null).
+	'''
+	key, value = text.split('=', 1)
+	try:
+		return key, json.loads(value)
+	except ValueError:
+		return key, value
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Select runs from the catalog and list them, or print the paths of their output files.')
+	parser.add_argument('--catalog', default='drones_ec_catalog.sqlite')
+	parser.add_argument('--scenario', type=int, nargs='+', default=None)
+	parser.add_argument('--status', nargs='+', choices=['running', 'completed', 'failed'], default=None)
+	parser.add_argument('--optimizer', nargs='+', default=None)
+	parser.add_argument('--setting', type=parse_setting, nargs='+', default=[], help='required settings, as key=value')
+	parser.add_argument('--since', default=None, help='earliest start of the runs, e.g. 2020-09-01')
+	parser.add_argument('--best', type=int, default=None, help='number of the fittest runs selected')
+	parser.add_argument('--files', nargs='+', default=None, help='print the paths of these output files (the first one each run has) instead of the list')
+	args = parser.parse_args()
+
+	if not os.path.isfile(args.catalog):
+		parser.error('the catalog {0} does not exist'.format(args.catalog))
+	runs = RunCatalog(args.catalog).query(args.scenario, args.status, args.optimizer, dict(args.setting), args.since, args.best)
+	if args.files is not None:
+		print('\n'.join(run_files(runs, args.files)))
+		return
+	print('{0:<40} {1:<9} {2:<11} {3:<10} {4:<20} {5:<10} {6:<12} {7}'.format('name', 'scenario', 'seed', 'status', 'started', 'wall time', 'evaluations', 'best fitness'))
+	for run in runs:
+		print('{0:<40} {1:<9} {2:<11} {3:<10} {4:<20} {5:<10} {6:<12} {7}'.format(run['name'], run['scenario'], run['seed'], run['status'], run['started'],
+			'' if run['wall_time'] is None else '{0:.1f} s'.format(run['wall_time']), '' if run['evaluations'] is None else run['evaluations'],
+			'' if run['best_fitness'] is None else '{0:.6g}'.format(run['best_fitness'])))
+
+
+
+if __name__ == '__main__':
+	main()
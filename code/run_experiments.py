@@ -0,0 +1,115 @@
+'''
+run_experiments.py
+This module runs an experiment matrix: every scenario with every seed, e.g. the standard study of 10 seeds on the 4 scenarios.
+All the runs progress together, each in a thread of this process, and their simulations share one pool of worker processes,
+whose idle workers take the candidates of the runs in turn. The seeds are drawn without repetitions from the base seed, so that
+no two runs share a seed and the whole experiment is reproducible, and every run has its own output files, tagged with the experiment,
+the scenario and the seed. The manifest "experiment_manifest_<timestamp>.json" lists the settings, the seed, the best fitness and
+the output files of every run, and is updated whenever a run completes.
+
+Usage:
+python run_experiments.py --scenarios 1 2 3 4 --seeds 10 --popul_size 100 --max_eval 10000 --num_workers 8
+python run_experiments.py --scenarios 2 --seeds 5 --settings '{"optimizer": "cmaes", "initializer": "sobol"}'
+'''
+
+import argparse
+import json
+import threading
+from random import Random
+from time import time
+from datetime import datetime
+from inspyred_functions import *
+from evolution import run_optimization
+from parameters import constraints
+from workers import WorkerPool
+
+
+def experiment_seeds(base_seed, num_runs):
+	'''
+	Function to draw the seeds of the runs of an experiment.
+	Returns the list of "num_runs" distinct seeds, drawn from the base seed.
+	'''
+	return Random(base_seed).sample(range(2**31), num_runs)
+
+
+def write_manifest(filename, manifest):
+	'''
+	Function to save the manifest of an experiment.
+	'''
+	with open(filename, mode='w') as manifest_file:
+		json.dump(manifest, manifest_file, indent=1)
+
+
+def _run(entry, pool, settings, manifest, manifest_file_name, lock, slots):
+	with slots:
+		with lock:
+			entry['status'] = 'running'
+		start = time()
+		outcome = {}
+		try:
+			algorithm = run_optimization(entry['scenario'], scenario_evaluators[entry['scenario']], constraints, seed=entry['seed'], name=entry['name'],
+										worker_pool=pool, verbose=False, **settings)
+			outcome['status'] = 'completed'
+			outcome['best_fitness'] = algorithm.best.fitness
+			outcome['evaluations'] = algorithm.num_evaluations
+			outcome['output_files'] = algorithm.output_files
+		except Exception as error:
+			outcome['status'] = 'failed'
+			outcome['error'] = repr(error)
+		outcome['seconds'] = time() - start
+		with lock:
+			entry.update(outcome)
+			write_manifest(manifest_file_name, manifest)
+			done = sum(1 for e in manifest['runs'] if e['status'] in ('completed', 'failed'))
+			print('[{0}/{1}] scenario {2} seed {3}: {4} {5}'.format(done, len(manifest['runs']), entry['scenario'], entry['seed'],
+																	entry['status'], entry.get('best_fitness', entry.get('error'))))
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Run every scenario with every seed over one shared pool of worker processes.')
+	parser.add_argument('--scenarios', type=int, nargs='+', default=[1, 2, 3, 4])
+	parser.add_argument('--seeds', type=int, default=10, help='number of seeds (runs) of each scenario')
+	parser.add_argument('--base_seed', type=int, default=None, help='seed from which the seeds of the runs are drawn (default: current time)')
+	parser.add_argument('--popul_size', type=int, default=100)
+	parser.add_argument('--max_eval', type=int, default=10000)
+	parser.add_argument('--num_workers', default='auto', help='number of worker processes shared by all the runs, or auto')
+	parser.add_argument('--max_parallel_runs', type=int, default=None, help='maximum number of runs in progress at the same time (default: all)')
+	parser.add_argument('--evaluation_time_budget', type=float, default=None, help='wall-clock budget in seconds of each simulation')
+	parser.add_argument('--worker_memory_limit', type=float, default=None, help='memory ceiling in megabytes of the worker processes')
+	parser.add_argument('--settings', default='{}', help='other settings of run_optimization, as a JSON dictionary')
+	args = parser.parse_args()
+
+	now = datetime.now()
+	timestamp = now.strftime('%Y_%m_%d_%H_%M_%S')
+	base_seed = int(time()) if args.base_seed is None else args.base_seed
+	num_workers = args.num_workers if args.num_workers == 'auto' else int(args.num_workers)
+	settings = dict(json.loads(args.settings), popul_size=args.popul_size, max_eval=args.max_eval)
+
+	seeds = experiment_seeds(base_seed, len(args.scenarios) * args.seeds)
+	runs = []
+	for i, scenario in enumerate(args.scenarios):
+		for seed in seeds[i * args.seeds:(i + 1) * args.seeds]:
+			runs.append({'scenario': scenario, 'seed': seed, 'name': 'experiment_{0}_scenario{1}_seed{2}'.format(timestamp, scenario, seed), 'status': 'pending'})
+	manifest = {'timestamp': timestamp, 'base_seed': base_seed, 'num_workers': args.num_workers, 'settings': settings,
+				'evaluation_time_budget': args.evaluation_time_budget, 'worker_memory_limit': args.worker_memory_limit, 'runs': runs}
+	manifest_file_name = 'experiment_manifest_{0}.json'.format(timestamp)
+	write_manifest(manifest_file_name, manifest)
+
+	pool = WorkerPool(num_workers, args.evaluation_time_budget, args.worker_memory_limit)
+	lock = threading.Lock()
+	slots = threading.Semaphore(args.max_parallel_runs or len(runs))
+	threads = [threading.Thread(target=_run, args=(entry, pool, settings, manifest, manifest_file_name, lock, slots)) for entry in runs]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	pool.close()
+
+	manifest['num_workers'] = pool.num_active
+	write_manifest(manifest_file_name, manifest)
+	print('\nExperiment completed: {0} runs, manifest saved to {1}'.format(len(runs), manifest_file_name))
+
+
+
+if __name__ == '__main__':
+	main()
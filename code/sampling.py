@@ -0,0 +1,106 @@
+'''
+sampling.py
+This module contains the space-filling designs which sample the chromosomes within their boundaries: Latin hypercube sampling and the scrambled
+Sobol sequence. They draw from the random number generator of the run, so that the designs are reproducible under the run's seed, and they do not
+import RVO2, so the sweeps and the sensitivity analysis use them without the simulator.
+'''
+
+
+def latin_hypercube(random, size, lower_bound, upper_bound):
+	'''
+	Function to sample a set of chromosomes with Latin hypercube sampling: the range of each gene is split into "size" strata,
+	and each stratum is sampled exactly once, so that the whole set covers every range evenly.
+	Returns the list of "size" chromosomes.
+	- random --> random number generator of the run, which makes the sampling reproducible under the run's seed
+	- size --> number of chromosomes to sample
+	- lower_bound / upper_bound --> boundaries of the genes
+	'''
+	columns = []
+	for lo, hi in zip(lower_bound, upper_bound):
+		strata = list(range(size))
+		random.shuffle(strata)
+		columns.append([lo + (hi - lo) * (s + random.random()) / size for s in strata])
+	return [list(chromosome) for chromosome in zip(*columns)]
+
+
+# Primitive polynomials (degree s, coefficients a) and initial direction numbers m of the Sobol sequence (Joe and Kuo), from the second dimension on
+sobol_directions = [(1, 0, [1]), (2, 1, [1, 3]), (3, 1, [1, 3, 1]), (3, 2, [1, 1, 1]), (4, 1, [1, 1, 3, 3]),
+					(4, 4, [1, 3, 5, 13]), (5, 2, [1, 1, 5, 5, 17]), (5, 4, [1, 1, 5, 5, 5]), (5, 7, [1, 1, 7, 11, 19])]
+
+
+def sobol_sequence(random, size, dimensions, bits=30):
+	'''
+	Function to sample points of a scrambled Sobol sequence in the unit hypercube.
+	The sequence is scrambled with a random linear matrix scrambling and a random digital shift, both drawn with the run's random number generator.
+	Returns the list of "size" points, each a list of "dimensions" values in [0, 1).
+	- random --> random number generator of the run
+	- size --> number of points
+	- dimensions --> number of dimensions (at most 10)
+	- bits --> number of binary digits of each coordinate
+	'''
+	if dimensions > len(sobol_directions) + 1:
+		raise ValueError('sobol_sequence supports at most {0} dimensions'.format(len(sobol_directions) + 1))
+
+	directions = []
+	for d in range(dimensions):
+		if d == 0:
+			v = [1 << (bits - k) for k in range(1, bits + 1)]
+		else:
+			s, a, m = sobol_directions[d - 1]
+			v = [0] * (bits + 1)
+			for k in range(1, bits + 1):
+				if k <= s:
+					v[k] = m[k - 1] << (bits - k)
+				else:
+					v[k] = v[k - s] ^ (v[k - s] >> s)
+					for j in range(1, s):
+						v[k] ^= ((a >> (s - 1 - j)) & 1) * v[k - j]
+			v = v[1:]
+		# Linear matrix scrambling: digit i of a scrambled value is the parity of digit i and of a random subset of the digits before it
+		rows = []
+		for i in range(bits):
+			row = 1 << (bits - 1 - i)
+			for j in range(i):
+				if random.random() < 0.5:
+					row |= 1 << (bits - 1 - j)
+			rows.append(row)
+		scrambled = []
+		for value in v:
+			result = 0
+			for i, row in enumerate(rows):
+				if bin(value & row).count('1') % 2 == 1:
+					result |= 1 << (bits - 1 - i)
+			scrambled.append(result)
+		directions.append(scrambled)
+
+	shift = [random.getrandbits(bits) for d in range(dimensions)]
+	x = [0] * dimensions
+	points = []
+	for i in range(size):
+		points.append([((xi ^ si) + random.random()) / float(1 << bits) for xi, si in zip(x, shift)])
+		c = 0
+		j = i
+		while j & 1:
+			j >>= 1
+			c += 1
+		x = [xi ^ v[c] for xi, v in zip(x, directions)]
+	return points
+
+
+def space_filling_design(random, size, lower_bound, upper_bound, method='lhs'):
+	'''
+	Function to sample a set of chromosomes which covers the boundaries evenly.
+	Returns the list of "size" chromosomes.
+	- random --> random number generator of the run
+	- size --> number of chromosomes to sample
+	- lower_bound / upper_bound --> boundaries of the genes
+	- method --> 'lhs' (Latin hypercube sampling), 'sobol' (scrambled Sobol sequence) or 'uniform' (independent uniform genes, not space-filling)
+	'''
+	if method == 'uniform':
+		return [[random.uniform(lo, hi) for lo, hi in zip(lower_bound, upper_bound)] for i in range(size)]
+	elif method == 'lhs':
+		return latin_hypercube(random, size, lower_bound, upper_bound)
+	elif method == 'sobol':
+		points = sobol_sequence(random, size, len(lower_bound))
+		return [[lo + (hi - lo) * u for u, lo, hi in zip(point, lower_bound, upper_bound)] for point in points]
+	raise ValueError('unknown space-filling method {0}'.format(method))
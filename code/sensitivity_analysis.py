@@ -0,0 +1,170 @@
+'''
+sensitivity_analysis.py
+This module computes the Sobol sensitivity indices of the fitness of each scenario with respect to the five parameters of RVO2, to find the ones
+which matter and the ones which can be fixed to shrink the search space. The Saltelli design of --samples base points is drawn from a scrambled
+Sobol sequence within the limits of the Bounder of the optimizer: the matrices A and B, and for each gene the matrix A with the column of the gene
+taken from B, for samples * (genes + 2) simulations. The design of each scenario is evaluated in batches by a pool of processes through the
+landscape sweep store "<output>/scenario<x>" (see landscape_sweep.py), so an interrupted analysis is resumed by running it again, and the
+fitness of the points already evaluated is reused when the analysis is run again with more samples and the same seed (the first points of the
+Sobol sequence do not change). The first-order indices (Saltelli 2010) and the total-order indices (Jansen) are computed with their bootstrap
+confidence intervals, printed, saved to "<output>/sobol_indices.csv" and plotted to "<output>/sobol_indices.png".
+
+Usage:
+python sensitivity_analysis.py --scenarios 1 2 3 4 --samples 1024 --workers 32
+python sensitivity_analysis.py --scenarios 3 --samples 2048 --max_steps 3000 --transform log --output sensitivity_scenario3
+'''
+
+import matplotlib
+import argparse
+import csv
+import os
+from random import Random
+import numpy as np
+import inspyred
+from landscape_sweep import SweepStore, create_store, run_sweep
+from parameters import gene_names, constraints
+from sampling import sobol_sequence
+
+
+def saltelli_design(random, samples, lower_bound, upper_bound):
+	'''
+	Function to draw the Saltelli design of the Sobol indices from a scrambled Sobol sequence.
+	Returns the numpy array with the rows of A, then the rows of B, then the rows of each matrix AB_i (A with the i-th column of B).
+	- random --> random number generator of the scrambling of the sequence
+	- samples --> number of rows of each matrix
+	- lower_bound / upper_bound --> boundaries of the genes, e.g. of the Bounder of the optimizer
+	'''
+	lower_bound = np.asarray(lower_bound, dtype=float)
+	upper_bound = np.asarray(upper_bound, dtype=float)
+	num_genes = len(lower_bound)
+	unit = np.asarray(sobol_sequence(random, samples, 2 * num_genes))
+	a, b = unit[:, :num_genes], unit[:, num_genes:]
+	blocks = [a, b]
+	for i in range(num_genes):
+		ab = a.copy()
+		ab[:, i] = b[:, i]
+		blocks.append(ab)
+	return lower_bound + (upper_bound - lower_bound) * np.concatenate(blocks)
+
+
+def estimate_indices(f_a, f_b, f_ab):
+	'''
+	Function to estimate the first-order (Saltelli 2010) and total-order (Jansen) Sobol indices, for the samples on the last axis.
+	Returns the tuple (first, total) of numpy arrays with one index per gene.
+	- f_a, f_b --> fitness of the rows of A and B
+	- f_ab --> fitness of the rows of the matrices AB_i, with the genes on the second last axis
+	'''
+	variance = np.var(np.concatenate([f_a, f_b], axis=-1), axis=-1)[..., None]
+	first = np.mean(f_b[..., None, :] * (f_ab - f_a[..., None, :]), axis=-1) / variance
+	total = 0.5 * np.mean((f_a[..., None, :] - f_ab) ** 2, axis=-1) / variance
+	return first, total
+
+
+def sobol_indices(fitness, num_genes, resamples=1000, confidence=0.95, seed=0):
+	'''
+	Function to compute the Sobol indices from the fitness of a Saltelli design, with bootstrap confidence intervals.
+	Returns a dictionary with the numpy arrays "first", "first_low", "first_high", "total", "total_low" and "total_high", with one value per gene.
+	- fitness --> fitness of the rows of the design, in the order of saltelli_design
+	- resamples --> number of bootstrap resamples of the base points
+	- confidence --> level of the confidence intervals
+	'''
+	values = np.asarray(fitness, dtype=float).reshape(num_genes + 2, -1)
+	f_a, f_b, f_ab = values[0], values[1], values[2:]
+	first, total = estimate_indices(f_a, f_b, f_ab)
+	rows = np.random.default_rng(seed).integers(0, len(f_a), size=(resamples, len(f_a)))
+	boot_first, boot_total = estimate_indices(f_a[rows], f_b[rows], f_ab[:, rows].transpose(1, 0, 2))
+	tails = [50 * (1 - confidence), 50 * (1 + confidence)]
+	first_low, first_high = np.percentile(boot_first, tails, axis=0)
+	total_low, total_high = np.percentile(boot_total, tails, axis=0)
+	return {'first': first, 'first_low': first_low, 'first_high': first_high, 'total': total, 'total_low': total_low, 'total_high': total_high}
+
+
+def prepare_store(directory, scenario, samples, seed, max_steps):
+	'''
+	Function to create the sweep store of the Saltelli design of a scenario, reusing the fitness of the points of the store already in the directory
+	(e.g. of an analysis with fewer samples and the same seed). A complete or interrupted store with the same design is kept as it is.
+	'''
+	settings = {'scenario': scenario, 'genes': gene_names, 'design': 'saltelli', 'samples': samples, 'seed': seed, 'max_steps': max_steps}
+	known = {}
+	if os.path.isfile(os.path.join(directory, 'sweep.json')):
+		store = SweepStore(directory)
+		if store.settings == settings:
+			return
+		if store.settings.get('max_steps') == max_steps and store.settings['scenario'] == scenario:
+			evaluated = ~np.isnan(store.fitness)
+			known = dict(zip((point.tobytes() for point in np.asarray(store.points[evaluated])), store.fitness[evaluated]))
+		del store
+	bounder = inspyred.ec.Bounder(constraints[0], constraints[1])
+	points = saltelli_design(Random(seed), samples, bounder.lower_bound, bounder.upper_bound)
+	create_store(directory, points, settings)
+	if known:
+		store = SweepStore(directory, mode='r+')
+		store.fitness[:] = [known.get(point.tobytes(), np.nan) for point in points]
+		store.fitness.flush()
+		print('Scenario {0}: {1} of {2} points reused from the previous analysis'.format(scenario, int(np.sum(~np.isnan(store.fitness))), len(points)))
+
+
+def plot_indices(ax, indices, title):
+	x = np.arange(len(gene_names))
+	for offset, name, color in ((-0.2, 'first', 'b'), (0.2, 'total', 'r')):
+		errors = [indices[name] - indices[name + '_low'], indices[name + '_high'] - indices[name]]
+		ax.bar(x + offset, indices[name], width=0.4, color=color, yerr=np.maximum(errors, 0), capsize=3, label='{0}-order'.format(name.capitalize()))
+	ax.set_xticks(x)
+	ax.set_xticklabels(gene_names)
+	ax.set_ylabel('Sobol index')
+	ax.set_title(title)
+	ax.grid(axis='y')
+	ax.legend(loc='best')
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Compute the Sobol sensitivity indices of the fitness of the scenarios with respect to the parameters.')
+	parser.add_argument('--scenarios', type=int, nargs='+', choices=[1, 2, 3, 4], default=[1, 2, 3, 4])
+	parser.add_argument('--samples', type=int, default=1024, help='base points of the Saltelli design (samples * 7 simulations per scenario)')
+	parser.add_argument('--seed', type=int, default=0, help='seed of the scrambling of the Sobol sequence and of the bootstrap')
+	parser.add_argument('--max_steps', type=int, default=None, help='step budget of each simulation (None for no budget)')
+	parser.add_argument('--transform', choices=['none', 'log'], default='none', help='transform of the fitness analysed (log: log(1 + fitness), less dominated by the collisions)')
+	parser.add_argument('--resamples', type=int, default=1000, help='bootstrap resamples')
+	parser.add_argument('--confidence', type=float, default=0.95)
+	parser.add_argument('--batch_size', type=int, default=50, help='points evaluated by a task of the pool')
+	parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of processes which run the simulations')
+	parser.add_argument('--output', default='sensitivity', help='directory of the stores, the indices and the plot')
+	parser.add_argument('--show', action='store_true', help='show the plot in a window instead of saving it')
+	args = parser.parse_args()
+
+	if not args.show:
+		matplotlib.use('Agg')
+	from matplotlib import pyplot
+
+	rows = []
+	fig, axes = pyplot.subplots(len(args.scenarios), 1, figsize=(8, 3 * len(args.scenarios)), squeeze=False)
+	for scenario, ax in zip(args.scenarios, axes[:, 0]):
+		directory = os.path.join(args.output, 'scenario{0}'.format(scenario))
+		prepare_store(directory, scenario, args.samples, args.seed, args.max_steps)
+		run_sweep(directory, args.workers, args.batch_size, verbose=False)
+		fitness = np.asarray(SweepStore(directory).fitness)
+		if args.transform == 'log':
+			fitness = np.log1p(fitness)
+		indices = sobol_indices(fitness, len(gene_names), args.resamples, args.confidence, args.seed)
+		print('Scenario {0} ({1} simulations, fitness variance {2:.4g}):'.format(scenario, len(fitness), np.var(fitness[:2 * args.samples])))
+		print('  {0:<14} {1:<26} {2}'.format('gene', 'first-order', 'total-order'))
+		for i, gene in enumerate(gene_names):
+			print('  {0:<14} {1:>7.3f} [{2:>6.3f}, {3:>6.3f}]    {4:>7.3f} [{5:>6.3f}, {6:>6.3f}]'.format(gene, indices['first'][i], indices['first_low'][i], indices['first_high'][i],
+																								indices['total'][i], indices['total_low'][i], indices['total_high'][i]))
+			rows.append(dict([('scenario', scenario), ('gene', gene)] + [(name, values[i]) for name, values in indices.items()]))
+		plot_indices(ax, indices, 'Scenario {0}'.format(scenario))
+
+	with open(os.path.join(args.output, 'sobol_indices.csv'), mode='w') as indices_file:
+		writer = csv.DictWriter(indices_file, fieldnames=list(rows[0].keys()))
+		writer.writeheader()
+		writer.writerows(rows)
+	fig.tight_layout()
+	if args.show:
+		pyplot.show()
+	else:
+		fig.savefig(os.path.join(args.output, 'sobol_indices.png'))
+
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,122 @@
+'''
+settings.py
+This module contains the settings of the optimizer shared by the "collision_avoidance_EC_scenario" files: every scenario runs with the defaults of
+"default_settings" (the settings of run_optimization) and "island_settings" (the ones of the island model), and a scenario file sets only the settings
+it changes, which are given to run_scenario.
+The settings are:
+- popul_size (int) --> population size of the evolutionary strategy
+- max_eval (int) --> maximum number of evaluation to terminate the evolution strategy
+- constraints --> boundaries of the candidate's chromosomes, compiled as [(l_1, ..., l_n), (u_1, ..., u_n)] (default: the ones of parameters.py)
+- tournament_size --> tournament size of the EC selector
+- num_elites --> number of elites for the generational replacement
+- mutation_rate/crossover_rate --> respectively, the mutation and crossover rates of the EC variators
+- mutation_operator --> mutation of the genetic algorithm: 'gaussian' (fixed standard deviation) or 'self_adaptive' (per-gene step sizes which evolve with each individual)
+- initial_step_size --> initial step size of the self-adaptive mutation, relative to the range of each gene
+- initializer --> sampling of the initial population: 'uniform', 'lhs' (Latin hypercube) or 'sobol' (scrambled Sobol sequence)
+- optimizer --> optimizer backend: 'ga' (genetic algorithm), 'cmaes' (CMA-ES) or 'de' (Differential Evolution)
+- optimizer_popsize --> number of candidates per generation of CMA-ES (None for the default of the strategy)
+- skip_known_candidates --> if True, offspring left unchanged by the variators inherit the parent's fitness and duplicates in a generation are simulated once
+- budget_counts_simulations --> if True, max_eval counts only the simulations actually run (with at most 10 times max_eval evaluations); if False, every
+	evaluation counts, as in the paper. Both are False by default, so that the evaluation counts and runtimes of the paper are reproduced
+- use_surrogate --> if True, the offspring are pre-screened by a surrogate model and only the most promising ones are simulated
+- surrogate_fraction/surrogate_exploration --> respectively, the fractions of each batch simulated by predicted fitness and at random
+- surrogate_min_archive --> number of simulated candidates needed before the surrogate is used
+- warm_start --> list of directories or glob patterns of earlier best individual parameters/individuals files used to seed the initial population (None for a random one)
+- warm_start_top_k/warm_start_perturbation --> respectively, the number of distinct earlier solutions injected and the relative noise added to them
+- num_workers --> number of processes which run the simulations of each generation in parallel, longest predicted first ('auto' to choose it at startup)
+- evaluation_time_budget/max_simulation_steps --> respectively, the wall-clock (seconds) and step budgets of each simulation (None for no budget):
+	the timed-out candidates get the penalty fitness "timeout_fitness" (see parameters.py)
+- worker_memory_limit --> memory ceiling (megabytes) of the worker processes, which are terminated when they exceed it during a simulation (None for no ceiling)
+- store_objectives --> if True, the components of the fitness of every simulation are saved, to re-score the run with rescore_objectives.py in extras
+- simulation_metrics --> names of the trajectory metrics computed in every simulation and saved with the fitness components ('path_length', 'min_separation',
+	'jerk', 'obstacle_proximity', see trajectory_metrics.py), None for no metrics; they need store_objectives or fitness_formula
+- fitness_formula --> expression of the fitness components and of the metrics results which replaces the fitness of the scenario, e.g.
+	"mean_error + mean_duration_norm + collisions + 0.1 * path_length" (None for the fitness of the scenario)
+- individuals_format --> 'csv' to write the individuals and statistics files during the run, or 'binary' to append them to a binary store in a background thread
+- export_csv --> with the 'binary' format, if True the binary store is exported to the individuals and statistics files at the end of the run
+- record_trajectories/trajectory_elites --> if True, the trajectories of the trajectory_elites best individuals of each generation and of the best individual
+	at the end of the run are saved, to be replayed and plotted without simulating again (see trajectories.py)
+- catalog --> SQLite run catalog where the run is recorded with its settings, results and output files, to select runs with run_catalog.py (None to not record it)
+- local_search --> if True, a pattern search polishes the elite every local_search_interval generations (0 for never) and the best individual at the end of the run
+- local_search_evaluations/local_search_step --> respectively, the maximum evaluations of one pattern search (counted in max_eval) and its initial relative step
+- stagnation_action --> None to disable the stagnation detection, 'restart' for IPOP-style restarts or 'stop' to terminate early when the evolution stagnates
+- stagnation_window/stagnation_tolerance --> the evolution stagnates when the best and average fitness improve less than stagnation_tolerance (relative) in stagnation_window generations...
+- min_diversity --> ...or when the diversity of the population in the normalized gene space falls below min_diversity
+- max_restarts/restart_popsize_factor --> respectively, the maximum number of restarts and the growth factor of the population size at each restart
+- num_islands --> number of populations evolved in parallel processes (island model, only with the 'ga' optimizer), 1 to run a single population
+- migration_topology --> topology of the island model: 'ring', 'fully_connected' or 'random'
+- migration_interval/num_migrants --> respectively, the generations between two migrations and the elites sent to each neighbouring island
+'''
+
+from evolution import run_optimization
+from islands import run_islands
+from parameters import constraints
+
+default_settings = dict(popul_size=100,
+						max_eval=100000,
+						tournament_size=4,
+						num_elites=1,
+						mutation_rate=0.4,
+						crossover_rate=0.6,
+						mutation_operator='gaussian',
+						initial_step_size=0.1,
+						initializer='uniform',
+						optimizer='ga',
+						optimizer_popsize=None,
+						skip_known_candidates=False,
+						budget_counts_simulations=False,
+						use_surrogate=False,
+						surrogate_fraction=0.3,
+						surrogate_exploration=0.1,
+						surrogate_min_archive=200,
+						warm_start=None,
+						warm_start_top_k=10,
+						warm_start_perturbation=0.05,
+						num_workers=1,
+						evaluation_time_budget=None,
+						max_simulation_steps=None,
+						worker_memory_limit=None,
+						store_objectives=False,
+						simulation_metrics=None,
+						fitness_formula=None,
+						individuals_format='csv',
+						export_csv=True,
+						record_trajectories=False,
+						trajectory_elites=1,
+						catalog='drones_ec_catalog.sqlite',
+						local_search=False,
+						local_search_interval=10,
+						local_search_evaluations=50,
+						local_search_step=0.05,
+						stagnation_action=None,
+						stagnation_window=20,
+						stagnation_tolerance=1e-3,
+						min_diversity=1e-3,
+						max_restarts=5,
+						restart_popsize_factor=2)
+
+island_settings = dict(num_islands=1,
+						migration_topology='ring',
+						migration_interval=10,
+						num_migrants=1)
+
+
+def run_scenario(scenario, evaluator, **settings):
+	'''
+	Function to run the optimizer on one scenario with the default settings, updated by the settings of the scenario.
+	Returns the evolutionary computation instance of run_optimization, or the tuple (best candidate, best fitness) of run_islands with more than one island.
+	- scenario --> number of the scenario
+	- evaluator --> simulation evaluator of the scenario (e.g. simulation_evaluator_scenario1)
+	- settings --> settings changed for the scenario: "constraints" and the keys of default_settings and island_settings
+	'''
+	unknown = [key for key in settings if key != 'constraints' and key not in default_settings and key not in island_settings]
+	if unknown:
+		raise ValueError('unknown settings: {0}'.format(', '.join(unknown)))
+	scenario_constraints = settings.pop('constraints', constraints)
+	islands = dict(island_settings, **{key: settings.pop(key) for key in island_settings if key in settings})
+	settings = dict(default_settings, **settings)
+
+	if islands['num_islands'] > 1:
+		return run_islands(scenario, evaluator, scenario_constraints, **islands, **settings)
+
+	return run_optimization(scenario, evaluator, scenario_constraints, **settings)
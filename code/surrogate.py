@@ -0,0 +1,214 @@
+'''
+surrogate.py
+This module contains the surrogate model used to pre-screen the offspring before the simulation.
+The model is a cubic radial basis function interpolant with a linear tail, fitted on the archive of the simulated candidates.
+Only the most promising fraction of each batch (plus a random exploration share) is simulated, the rest receives the predicted fitness.
+The predicted values are PredictedFitness instances, so the individuals which were not simulated can be told apart: they take part in the
+selection, but their fitness is never inherited by other candidates, written to the output files or reported as the best fitness of the run.
+'''
+
+import numpy as np
+from math import ceil
+
+
+class PredictedFitness(float):
+	'''
+	Fitness value predicted by the surrogate instead of simulated. It compares and computes as a float.
+	'''
+	pass
+
+
+def is_predicted(individual):
+	'''
+	Function to check if the fitness of an individual was predicted by the surrogate instead of simulated.
+	'''
+	return isinstance(individual.fitness, PredictedFitness)
+
+
+def simulated_best(population):
+	'''
+	Function to find the best individual of a population among the simulated ones.
+	Returns the best simulated individual, or the best individual if none of them was simulated.
+	'''
+	simulated = [individual for individual in population if not is_predicted(individual)]
+	return max(simulated or population)
+
+
+class SimulatedObserver(object):
+	'''
+	Observer which passes only the simulated individuals of the population to the wrapped observer, so that the individuals and statistics files
+	contain only simulated fitness values.
+	- observer --> observer of the EC which is wrapped (e.g. file_observer or binary_observer)
+	'''
+	def __init__(self, observer):
+		self.observer = observer
+		self.__name__ = observer.__name__
+
+	def __call__(self, population, num_generations, num_evaluations, args):
+		simulated = [individual for individual in population if not is_predicted(individual)]
+		self.observer(simulated or population, num_generations, num_evaluations, args)
+
+
+class RBFSurrogate(object):
+	'''
+	Radial basis function model of the fitness landscape.
+	The genes are normalized with the bounder limits, so that parameters with different ranges weigh the same,
+	and the fitness values are compressed with a logarithm, so that the few candidates with many collisions do not dominate the fit.
+	- lower_bound --> lower limits of the genes
+	- upper_bound --> upper limits of the genes
+	- max_archive --> maximum number of points used in the fit (the most recent ones are kept)
+	- smoothing --> regularization added to the diagonal of the interpolation matrix
+	'''
+	def __init__(self, lower_bound, upper_bound, max_archive=1000, smoothing=1e-8):
+		self.lower_bound = np.asarray(lower_bound, dtype=float)
+		self.scale = np.asarray(upper_bound, dtype=float) - self.lower_bound
+		self.max_archive = max_archive
+		self.smoothing = smoothing
+		self.x = np.empty((0, len(self.lower_bound)))
+		self.y = np.empty(0)
+		self.weights = None
+
+	def __len__(self):
+		return len(self.y)
+
+	def _normalize(self, candidates):
+		x = np.asarray([c[:len(self.lower_bound)] for c in candidates], dtype=float)
+		return (x - self.lower_bound) / self.scale
+
+	def add(self, candidates, fitness):
+		'''
+		Function to add the simulated candidates to the archive and refit the model.
+		Candidates already in the archive are skipped, since duplicated points make the interpolation matrix singular.
+		'''
+		x = self._normalize(candidates)
+		y = np.asarray(fitness, dtype=float)
+		known = set(map(tuple, self.x))
+		keep = []
+		for i, row in enumerate(map(tuple, x)):
+			if row not in known:
+				known.add(row)
+				keep.append(i)
+		self.x = np.vstack((self.x, x[keep]))[-self.max_archive:]
+		self.y = np.concatenate((self.y, y[keep]))[-self.max_archive:]
+		self._fit()
+
+	def _fit(self):
+		n, d = self.x.shape
+		self.offset = self.y.min()
+		target = np.log1p(self.y - self.offset)
+		phi = self._kernel(self.x, self.x) + self.smoothing * np.eye(n)
+		tail = np.hstack((np.ones((n, 1)), self.x))
+		system = np.zeros((n + d + 1, n + d + 1))
+		system[:n, :n] = phi
+		system[:n, n:] = tail
+		system[n:, :n] = tail.T
+		rhs = np.concatenate((target, np.zeros(d + 1)))
+		solution = np.linalg.lstsq(system, rhs, rcond=None)[0]
+		self.weights = solution[:n]
+		self.coefficients = solution[n:]
+
+	def _kernel(self, x1, x2):
+		r = np.sqrt(((x1[:, None, :] - x2[None, :, :]) ** 2).sum(axis=2))
+		return r ** 3
+
+	def predict(self, candidates):
+		'''
+		Function to predict the fitness of the candidates.
+		Returns a numpy array with one predicted fitness value per candidate.
+		'''
+		x = self._normalize(candidates)
+		value = self._kernel(x, self.x).dot(self.weights) + self.coefficients[0] + x.dot(self.coefficients[1:])
+		return np.expm1(np.maximum(value, 0.0)) + self.offset
+
+
+def rank_correlation(a, b):
+	'''
+	Function to calculate the Spearman rank correlation between two sequences of values.
+	Returns nan if one of the sequences is constant or shorter than 2 elements.
+	'''
+	if len(a) < 2:
+		return float('nan')
+	ra = np.argsort(np.argsort(a)).astype(float)
+	rb = np.argsort(np.argsort(b)).astype(float)
+	if ra.std() == 0 or rb.std() == 0:
+		return float('nan')
+	return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def surrogate_evaluation(candidates, args):
+	'''
+	Funtion to evaluate the candidates with surrogate pre-screening.
+	The batch is ranked by the predicted fitness: the best "surrogate_fraction" of it and a random "surrogate_exploration" share of the rest are simulated
+	with the "surrogate_evaluator" in args, and the simulated values are added to the archive of the model.
+	The candidates which are not simulated get their predicted fitness as a PredictedFitness, always worse than the worst simulated fitness of the batch,
+	so that a predicted individual never becomes the elite of a generation: the best individual of the run is always simulated.
+	The model is used only once the archive contains "surrogate_min_archive" candidates, before that every candidate is simulated.
+	- candidates --> candidates chromosomes generated by the EC
+	'''
+	evaluator = args['surrogate_evaluator']
+	fraction = args.setdefault('surrogate_fraction', 0.3)
+	exploration = args.setdefault('surrogate_exploration', 0.1)
+	min_archive = args.setdefault('surrogate_min_archive', 200)
+	ec = args['_ec']
+
+	model = args.get('surrogate_model')
+	if model is None:
+		model = RBFSurrogate(ec.bounder.lower_bound, ec.bounder.upper_bound)
+		args['surrogate_model'] = model
+
+	stats = {'archive': len(model), 'simulated': len(candidates), 'skipped': 0, 'rmse': float('nan'), 'rank_corr': float('nan'), 'explore_rmse': float('nan')}
+	args['surrogate_statistics'] = stats
+
+	if len(model) < min_archive:
+		fitness = evaluator(candidates, args)
+		model.add(candidates, fitness)
+		return fitness
+
+	predicted = model.predict(candidates)
+	order = list(np.argsort(predicted))
+	if ec.maximize:
+		order.reverse()
+	n_promising = min(len(candidates), int(ceil(fraction * len(candidates))))
+	promising = order[:n_promising]
+	rest = order[n_promising:]
+	n_explore = min(len(rest), int(ceil(exploration * len(candidates))))
+	explore = ec._random.sample(rest, n_explore)
+	selected = promising + explore
+
+	simulated = evaluator([candidates[i] for i in selected], args)
+	model.add([candidates[i] for i in selected], simulated)
+
+	real = np.asarray(simulated, dtype=float)
+	guess = predicted[selected]
+	stats['simulated'] = len(selected)
+	stats['skipped'] = len(candidates) - len(selected)
+	stats['rmse'] = float(np.sqrt(np.mean((real - guess) ** 2)))
+	stats['rank_corr'] = rank_correlation(real, guess)
+	if n_explore > 0:
+		stats['explore_rmse'] = float(np.sqrt(np.mean((real[n_promising:] - guess[n_promising:]) ** 2)))
+	args['num_skipped_evaluations'] = args.get('num_skipped_evaluations', 0) + stats['skipped']
+
+	worst = real.min() if ec.maximize else real.max()
+	worse = np.nextafter(worst, -np.inf if ec.maximize else np.inf)
+	fitness = []
+	for i in range(len(candidates)):
+		if ec.maximize:
+			fitness.append(PredictedFitness(min(predicted[i], worse)))
+		else:
+			fitness.append(PredictedFitness(max(predicted[i], worse)))
+	for i, fit in zip(selected, simulated):
+		fitness[i] = fit
+	return fitness
+
+
+def surrogate_observer(population, num_generations, num_evaluations, args):
+	'''
+	Function to save the statistics of the surrogate to the "surrogate_file" in args, one row per generation.
+	Each row contains: generation, archive size, simulated candidates, skipped candidates, cumulative fraction of skipped evaluations,
+	RMSE and Spearman rank correlation of the predictions on the simulated candidates, RMSE on the exploration share only.
+	'''
+	surrogate_file = args['surrogate_file']
+	stats = args['surrogate_statistics']
+	skipped_fraction = args.get('num_skipped_evaluations', 0) / float(num_evaluations)
+	surrogate_file.write('{0}, {1}, {2}, {3}, {4}, {5}, {6}, {7}\n'.format(num_generations, stats['archive'], stats['simulated'], stats['skipped'], skipped_fraction, stats['rmse'], stats['rank_corr'], stats['explore_rmse']))
+	surrogate_file.flush()
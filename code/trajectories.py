@@ -0,0 +1,186 @@
+'''
+trajectories.py
+This module contains the store of the trajectories of a run: the elites of each generation and the best individual at the end of the run
+are simulated once more, recording the positions of the agents at each time-step, so that they can be replayed, plotted and measured
+later without running RVO2 again (this module does not import it).
+The store is a directory with:
+- "positions.f4" --> 32-bit floats with one row of (x, y) per agent for each time-step; the first row of a trajectory contains the
+	positions of the agents, the next ones the displacements from the previous time-step (delta encoding)
+- "index.f8" --> one record of 64-bit floats per stored elite (see index_columns): where its trajectory starts in "positions.f4",
+	its number of time-steps, its generation, rank and fitness and its genes. The same candidate, elite in many generations, is simulated once
+- "store.json" --> scenario, agents radius, obstacles and number of agents and genes
+The positions file is memory-mapped, so a trajectory is read from its index record without reading the rest of the store.
+
+Usage:
+python trajectories.py drones_ec_trajectories_scenario1_2020_09_01_10_00_00
+python trajectories.py drones_ec_trajectories_scenario1_2020_09_01_10_00_00 --index 12
+'''
+
+import argparse
+import json
+import os
+import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.patches import Circle
+from parameters import gene_names
+
+index_columns = ['offset', 'steps', 'generation', 'rank', 'final', 'fitness']
+
+
+class TrajectoryWriter(object):
+	'''
+	Writer of a trajectory store.
+	- directory --> directory of the store, created if missing
+	- scenario --> number of the scenario
+	- num_genes --> number of genes of the candidates (the self-adaptive step sizes after them are not saved)
+	- simulate --> function of a chromosome which returns the tuple (fitness, trajectory), see simulation_trajectory in inspyred_functions.py
+	'''
+	def __init__(self, directory, scenario, num_genes, simulate):
+		self.directory = directory
+		self.scenario = scenario
+		self.num_genes = num_genes
+		self.simulate = simulate
+		self.num_rows = 0
+		self.known = {}
+		self.num_simulations = 0
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+
+	def record(self, candidate, fitness, generation, rank, final=False):
+		'''
+		Function to add an elite to the store. Its trajectory is simulated only if the candidate is not in the store yet.
+		- candidate, fitness --> chromosome and fitness of the elite
+		- generation, rank --> generation of the elite and its rank in the population (0 for the best individual)
+		- final --> boolean value used to mark (True) the best individual at the end of the run
+		'''
+		genes = tuple(candidate[:self.num_genes])
+		if genes not in self.known:
+			trajectory = self.simulate(genes)[1]
+			positions = np.asarray(trajectory['history'], dtype=float).reshape(len(trajectory['history']), -1)
+			if self.num_rows == 0:
+				with open(os.path.join(self.directory, 'store.json'), mode='w') as store_file:
+					json.dump({'scenario': self.scenario, 'radius': trajectory['radius'], 'obstacles': trajectory['obstacles'],
+								'num_agents': positions.shape[1] // 2, 'num_genes': self.num_genes, 'index_columns': index_columns}, store_file)
+			deltas = np.diff(positions, axis=0, prepend=np.zeros((1, positions.shape[1])))
+			with open(os.path.join(self.directory, 'positions.f4'), mode='ab') as positions_file:
+				deltas.astype('<f4').tofile(positions_file)
+			self.known[genes] = (self.num_rows, len(positions))
+			self.num_rows += len(positions)
+			self.num_simulations += 1
+		offset, steps = self.known[genes]
+		with open(os.path.join(self.directory, 'index.f8'), mode='ab') as index_file:
+			np.asarray([offset, steps, generation, rank, float(final), fitness] + list(genes), dtype='<f8').tofile(index_file)
+
+
+def trajectory_observer(population, num_generations, num_evaluations, args):
+	'''
+	Function to record the trajectories of the "trajectory_elites" best individuals of each generation to the "trajectory_writer" in args.
+	'''
+	writer = args['trajectory_writer']
+	for rank, individual in enumerate(sorted(population, reverse=True)[:args.setdefault('trajectory_elites', 1)]):
+		writer.record(individual.candidate, individual.fitness, num_generations, rank)
+
+
+class TrajectoryStore(object):
+	'''
+	Reader of a trajectory store.
+	- directory --> directory of the store
+	'''
+	def __init__(self, directory):
+		with open(os.path.join(directory, 'store.json'), mode='r') as store_file:
+			settings = json.load(store_file)
+		self.scenario = settings['scenario']
+		self.radius = settings['radius']
+		self.obstacles = settings['obstacles']
+		self.num_agents = settings['num_agents']
+		self.gene_names = gene_names[:settings['num_genes']]
+		index = np.fromfile(os.path.join(directory, 'index.f8'), dtype='<f8')
+		width = len(index_columns) + settings['num_genes']
+		self.index = index[:len(index) // width * width].reshape(-1, width)
+		self.positions = np.memmap(os.path.join(directory, 'positions.f4'), dtype='<f4', mode='r').reshape(-1, self.num_agents * 2)
+
+	def __len__(self):
+		return len(self.index)
+
+	def record(self, i):
+		'''
+		Function to read the index record of the i-th stored elite.
+		Returns a dictionary with the columns of the record and the genes.
+		'''
+		row = self.index[i]
+		record = dict(zip(index_columns, row))
+		record['genes'] = list(row[len(index_columns):])
+		return record
+
+	def trajectory(self, i):
+		'''
+		Function to read the trajectory of the i-th stored elite.
+		Returns the numpy array of the positions, with shape (time-steps, agents, 2).
+		The positions are saved by the simulations with 3 decimals, which the decoded positions are rounded to.
+		'''
+		offset, steps = int(self.index[i, 0]), int(self.index[i, 1])
+		positions = np.cumsum(self.positions[offset:offset + steps], axis=0, dtype=float)
+		return np.round(positions, 3).reshape(steps, self.num_agents, 2)
+
+	def final(self):
+		'''
+		Function to find the best individual at the end of the run.
+		Returns the index of its record, or of the fittest stored elite if the run did not end.
+		'''
+		final = np.nonzero(self.index[:, 4])[0]
+		if len(final) > 0:
+			return int(final[-1])
+		return int(np.argmin(self.index[:, 5]))
+
+
+def plot_positions(ax, positions, obstacles, radius):
+	'''
+	Function to plot the obstacles and the paths of the agents, with one line per agent and the circles of the agents at the start and at the end.
+	- positions --> positions of the agents at each time-step, with shape (time-steps, agents, 2)
+	'''
+	colors = ['b', 'g', 'r', 'y']
+	ax.add_collection(PolyCollection(obstacles, facecolors='gray', edgecolors='gray'))
+	for agent in range(positions.shape[1]):
+		color = colors[agent % len(colors)]
+		ax.plot(positions[:, agent, 0], positions[:, agent, 1], color=color, linewidth=1, label='Agent {0}'.format(agent))
+		for step in (0, -1):
+			ax.add_patch(Circle(positions[step, agent], radius=radius, facecolor='none', edgecolor=color))
+	ax.autoscale_view()
+	ax.set_aspect('equal')
+	ax.legend(loc='best')
+
+
+def plot_trajectory(store, i, ax):
+	'''
+	Function to plot the obstacles and the paths of the agents of the i-th stored elite.
+	'''
+	plot_positions(ax, store.trajectory(i), store.obstacles, store.radius)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='List the trajectories of a trajectory store, or plot one of them.')
+	parser.add_argument('store', help='trajectory store directory')
+	parser.add_argument('--index', type=int, default=None, help='record of the trajectory plotted (-1 for the best individual at the end of the run)')
+	args = parser.parse_args()
+
+	store = TrajectoryStore(args.store)
+	if args.index is None:
+		print('record  generation  rank  final  steps   fitness       ' + '  '.join(store.gene_names))
+		for i in range(len(store)):
+			record = store.record(i)
+			print('{0:<7} {1:<11} {2:<5} {3:<6} {4:<7} {5:<13.6g} '.format(i, int(record['generation']), int(record['rank']), int(record['final']),
+																			int(record['steps']), record['fitness']) +
+				'  '.join('{0:.4f}'.format(value) for value in record['genes']))
+		return
+
+	import matplotlib.pyplot as plt
+	i = store.final() if args.index == -1 else args.index
+	fig, ax = plt.subplots()
+	plot_trajectory(store, i, ax)
+	ax.set_title('Scenario {0}, generation {1}, fitness {2:.6g}'.format(store.scenario, int(store.index[i, 2]), store.index[i, 5]))
+	plt.show()
+
+
+
+if __name__ == '__main__':
+	main()
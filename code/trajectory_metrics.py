@@ -0,0 +1,155 @@
+'''
+trajectory_metrics.py
+This module contains the streaming metrics of the quality of the trajectories, computed inside the step loop of the "collision_avoidance_scenario"
+functions instead of from the stored history of the simulation. Each metric keeps a running state of a few values per agent, updated at each
+time-step with numpy operations on the positions of all the agents, so a simulation with metrics needs no more memory than one without.
+A metric is an object with a "columns" attribute, the names of the values of its result, and three methods:
+- start(positions, time_step, radius, obstacles) --> called before the first time-step, with the initial positions of the agents
+- update(positions) --> called after each time-step, with the numpy array of the positions of the agents, with shape (agents, 2)
+- result() --> called at the end of the simulation, returns a dictionary of values, which are added to the objectives of the simulation
+New metrics are added to "metric_classes", so that they can be chosen by name (e.g. with "simulation_metrics" in the scenario files).
+'''
+
+import numpy as np
+
+
+class PathLength(object):
+	'''
+	Length of the path of each agent. Results: mean and maximum path length of the agents.
+	'''
+	columns = ['path_length', 'path_length_max']
+
+	def start(self, positions, time_step, radius, obstacles):
+		self.previous = np.asarray(positions, dtype=float)
+		self.length = np.zeros(len(self.previous))
+
+	def update(self, positions):
+		self.length += np.hypot(positions[:, 0] - self.previous[:, 0], positions[:, 1] - self.previous[:, 1])
+		self.previous = positions
+
+	def result(self):
+		return {'path_length': self.length.mean(), 'path_length_max': self.length.max()}
+
+
+class MinSeparation(object):
+	'''
+	Minimum distance of each agent from the nearest other agent. Results: minimum clearance between two agents (distance of the centres less
+	the two radii, negative when they overlap) and mean over the agents of their minimum clearance.
+	'''
+	columns = ['min_separation', 'mean_min_separation']
+
+	def start(self, positions, time_step, radius, obstacles):
+		self.radius = radius
+		self.minimum = np.full(len(positions), np.inf)
+		self.update(np.asarray(positions, dtype=float))
+
+	def update(self, positions):
+		differences = positions[:, None, :] - positions[None, :, :]
+		distances = np.hypot(differences[..., 0], differences[..., 1])
+		np.fill_diagonal(distances, np.inf)
+		self.minimum = np.minimum(self.minimum, distances.min(axis=1))
+
+	def result(self):
+		clearance = self.minimum - 2 * self.radius
+		return {'min_separation': clearance.min(), 'mean_min_separation': clearance.mean()}
+
+
+class Jerk(object):
+	'''
+	Jerk of the agents (third derivative of the positions), from the last four positions of each agent. Results: mean over the agents
+	of the mean squared jerk (lower is smoother) and maximum jerk.
+	'''
+	columns = ['mean_squared_jerk', 'max_jerk']
+
+	def start(self, positions, time_step, radius, obstacles):
+		self.time_step = time_step
+		self.last = [np.asarray(positions, dtype=float)]
+		self.squares = np.zeros(len(positions))
+		self.maximum = np.zeros(len(positions))
+		self.count = 0
+
+	def update(self, positions):
+		if len(self.last) == 3:
+			jerk = (positions - 3 * self.last[0] + 3 * self.last[1] - self.last[2]) / self.time_step ** 3
+			magnitude = np.hypot(jerk[:, 0], jerk[:, 1])
+			self.squares += magnitude ** 2
+			self.maximum = np.maximum(self.maximum, magnitude)
+			self.count += 1
+		self.last = [positions] + self.last[:2]
+
+	def result(self):
+		return {'mean_squared_jerk': (self.squares / max(self.count, 1)).mean(), 'max_jerk': self.maximum.max()}
+
+
+class ObstacleProximity(object):
+	'''
+	Time each agent spends near the obstacles (and the boundaries), i.e. with a clearance from the nearest obstacle edge below "margin".
+	Results: mean over the agents of the time near the obstacles (seconds of simulated time) and minimum clearance from the obstacles.
+	- margin --> clearance (beyond the agents radius) under which an agent is near an obstacle
+	'''
+	columns = ['time_near_obstacles', 'min_obstacle_clearance']
+
+	def __init__(self, margin=0.3):
+		self.margin = margin
+
+	def start(self, positions, time_step, radius, obstacles):
+		self.time_step = time_step
+		self.radius = radius
+		vertices = [np.asarray(obstacle, dtype=float) for obstacle in obstacles]
+		self.a = np.concatenate(vertices)
+		self.b = np.concatenate([np.roll(v, -1, axis=0) for v in vertices])
+		self.edges = self.b - self.a
+		self.lengths = np.maximum((self.edges ** 2).sum(axis=1), 1e-12)
+		self.time = np.zeros(len(positions))
+		self.minimum = np.full(len(positions), np.inf)
+
+	def update(self, positions):
+		relative = positions[:, None, :] - self.a[None, :, :]
+		t = np.clip((relative * self.edges[None, :, :]).sum(axis=2) / self.lengths[None, :], 0.0, 1.0)
+		nearest = relative - t[..., None] * self.edges[None, :, :]
+		clearance = np.hypot(nearest[..., 0], nearest[..., 1]).min(axis=1) - self.radius
+		self.time += (clearance < self.margin) * self.time_step
+		self.minimum = np.minimum(self.minimum, clearance)
+
+	def result(self):
+		return {'time_near_obstacles': self.time.mean(), 'min_obstacle_clearance': self.minimum.min()}
+
+
+metric_classes = {'path_length': PathLength, 'min_separation': MinSeparation, 'jerk': Jerk, 'obstacle_proximity': ObstacleProximity}
+
+
+def make_metrics(names):
+	'''
+	Function to create the metrics of a simulation.
+	Returns the list of the metrics.
+	- names --> names of the metrics, keys of metric_classes
+	'''
+	return [metric_classes[name]() for name in names]
+
+
+def start_metrics(metrics, positions, time_step, radius, obstacles):
+	'''
+	Function to start the metrics of a simulation, before its first time-step.
+	'''
+	for metric in metrics:
+		metric.start(positions, time_step, radius, obstacles)
+
+
+def update_metrics(metrics, positions):
+	'''
+	Function to update the metrics of a simulation with the positions of the agents after a time-step.
+	'''
+	positions = np.asarray(positions, dtype=float)
+	for metric in metrics:
+		metric.update(positions)
+
+
+def metric_results(metrics):
+	'''
+	Function to collect the results of the metrics at the end of a simulation.
+	Returns the dictionary with the results of all the metrics.
+	'''
+	results = {}
+	for metric in metrics:
+		results.update(metric.result())
+	return results
@@ -0,0 +1,175 @@
+'''
+validate_parameters.py
+This module validates best individual parameters files on perturbed variants of the scenarios, instead of the single replay of the training scenario.
+Every variant of a scenario moves the initial positions and the targets of the agents by up to --jitter on each axis, draws the agents radius in
+--radius and the simulation time-step from --rates (time-steps per second); the variant 0 of each scenario is the training scenario. The variants
+are drawn from --seed, so every parameters file is simulated on the same variants and the files can be compared variant by variant.
+Every variant simulates the same time as the training scenario ("horizon", 1666 time-steps of 1/60 s): the number of time-steps of a variant is the
+horizon divided by its time-step, so the success, the fitness and the normalized duration are measured against the same simulated time at every rate.
+The collisions are counted at every time-step, so the collision time (collisions times the time-step) is saved too, which does not grow with the rate.
+The simulations are split in chunks which run in a pool of processes. For every simulation the file "<output>_simulations.csv" saves the fitness,
+the collisions and the collision time, the success (all the agents reached their targets within the horizon with no collisions), the mean and
+maximum arrival time of the agents (seconds of simulated time) and the wall-clock time of the simulation; for every parameters file and scenario
+the file "<output>_summary.csv" saves the success rate, the collision statistics and the distributions of the arrival and wall-clock times,
+which are also printed. With --metrics, the results of
+the streaming trajectory metrics (see trajectory_metrics.py) of every simulation are saved too, with their medians in the summary.
+
+Usage:
+python validate_parameters.py "results/best_individual_parameters_*.csv" --variants 1000 --workers 32
+python validate_parameters.py best_individual_parameters_scenario2_2020_09_01_10_00_00.csv --scenarios 2 3 --jitter 0.5 --radius 0.1 0.2 --rates 30 60
+'''
+
+import argparse
+import csv
+import glob
+import os
+from datetime import datetime
+from multiprocessing import Pool
+from random import Random
+from time import time
+import numpy as np
+from parameters import read_parameters
+from inspyred_functions import scenario_simulations, agent_starts, agent_goals, timeout_fitness
+from trajectory_metrics import make_metrics, metric_classes
+
+simulation_columns = ['file', 'scenario', 'variant', 'time_step', 'radius', 'fitness', 'collisions', 'success', 'timed_out',
+					'collision_time', 'mean_arrival_time', 'max_arrival_time', 'mean_error', 'wall_time']
+training_time_step = 1/60.
+horizon = int(training_time_step*100000) * training_time_step # simulated time of the training scenario, in seconds
+
+
+def scenario_variant(seed, scenario, variant, jitter, radius_range, rates):
+	'''
+	Function to draw a perturbed variant of a scenario (the variant 0 is the training scenario).
+	Returns a dictionary with the "time_step", the number of time-steps of the horizon ("n_iterations"), the agents "radius" and the "starts" and "goals" of the agents.
+	- seed --> seed of the variants of the validation
+	- jitter --> maximum displacement of the initial positions and of the targets on each axis
+	- radius_range --> tuple (minimum, maximum) of the agents radius
+	- rates --> list of the time-steps per second from which the time-step is drawn
+	'''
+	if variant == 0:
+		return {'time_step': training_time_step, 'n_iterations': int(round(horizon / training_time_step)), 'radius': 0.1, 'starts': agent_starts, 'goals': agent_goals}
+	rand = Random('{0}_{1}_{2}'.format(seed, scenario, variant))
+	move = lambda point: (point[0] + rand.uniform(-jitter, jitter), point[1] + rand.uniform(-jitter, jitter))
+	time_step = 1. / rand.choice(rates)
+	return {'time_step': time_step,
+			'n_iterations': int(round(horizon / time_step)),
+			'radius': rand.uniform(radius_range[0], radius_range[1]),
+			'starts': [move(start) for start in agent_starts],
+			'goals': [move(goal) for goal in agent_goals]}
+
+
+def simulate_chunk(task):
+	'''
+	Function to simulate a parameters file on a chunk of the variants of a scenario, in a process of the pool.
+	Returns the list of the rows of the simulations, with the columns of simulation_columns followed by the ones of the metrics.
+	'''
+	file_index, parameters, scenario, variants, settings = task
+	rows = []
+	for variant in variants:
+		config = scenario_variant(settings['seed'], scenario, variant, settings['jitter'], settings['radius'], settings['rates'])
+		metrics = make_metrics(settings['metrics'])
+		# the step budget is given at the time-step of the training, so it is the same simulated time at every rate
+		max_steps = None if settings['max_steps'] is None else int(round(settings['max_steps'] * training_time_step / config['time_step']))
+		start = time()
+		fitness, objectives = scenario_simulations[scenario](config['time_step'], parameters[0], parameters[1], parameters[2], parameters[3], config['radius'], parameters[4],
+															return_objectives=True, max_steps=max_steps, starts=config['starts'], goals=config['goals'], metrics=metrics or None,
+															n_iterations=config['n_iterations'])
+		wall_time = time() - start
+		arrival_steps = np.asarray([objectives['arrival_step_{0}'.format(i)] for i in range(len(agent_starts))])
+		arrived = arrival_steps < objectives['n_iterations']
+		success = bool(arrived.all()) and objectives['collisions'] == 0 and fitness != timeout_fitness
+		rows.append([file_index, scenario, variant, config['time_step'], config['radius'], fitness, objectives['collisions'], int(success), int(objectives['timed_out']),
+					objectives['collisions'] * config['time_step'], arrival_steps.mean() * config['time_step'], arrival_steps.max() * config['time_step'], objectives['mean_error'], wall_time] +
+					[objectives[column] for metric in metrics for column in metric.columns])
+	return rows
+
+
+def summarize(results, metric_columns=()):
+	'''
+	Function to compute the statistics of the simulations of a parameters file on a scenario.
+	Returns a dictionary with the number of variants, the success rate, the collision statistics, the median and 95% quantile of the arrival
+	and wall-clock times and the median of the results of the metrics.
+	- results --> numpy array of the rows of the simulations, with the columns of simulation_columns followed by "metric_columns"
+	'''
+	column = lambda name: results[:, simulation_columns.index(name)]
+	collisions = column('collisions')
+	summary = {'variants': len(results),
+			'success_rate': column('success').mean(),
+			'collision_rate': np.mean(collisions > 0),
+			'mean_collisions': collisions.mean(),
+			'max_collisions': collisions.max(),
+			'mean_collision_time': column('collision_time').mean(),
+			'timeout_rate': column('timed_out').mean(),
+			'median_fitness': np.median(column('fitness')),
+			'median_arrival_time': np.median(column('max_arrival_time')),
+			'p95_arrival_time': np.percentile(column('max_arrival_time'), 95),
+			'median_wall_time': np.median(column('wall_time')),
+			'p95_wall_time': np.percentile(column('wall_time'), 95)}
+	for i, name in enumerate(metric_columns):
+		summary['median_' + name] = np.median(results[:, len(simulation_columns) + i])
+	return summary
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Validate best individual parameters files on perturbed variants of the scenarios, in parallel.')
+	parser.add_argument('inputs', nargs='+', help='best individual parameters files or glob patterns of them')
+	parser.add_argument('--scenarios', type=int, nargs='+', choices=[1, 2, 3, 4], default=[1, 2, 3, 4])
+	parser.add_argument('--variants', type=int, default=1000, help='number of variants of each scenario (the first one is the training scenario)')
+	parser.add_argument('--jitter', type=float, default=0.3, help='maximum displacement of the initial positions and of the targets on each axis')
+	parser.add_argument('--radius', type=float, nargs=2, default=[0.1, 0.15], help='range of the agents radius')
+	parser.add_argument('--rates', type=float, nargs='+', default=[30, 60, 120], help='time-steps per second from which the time-step of a variant is drawn')
+	parser.add_argument('--metrics', nargs='+', choices=list(metric_classes.keys()), default=[], help='trajectory metrics computed in every simulation')
+	parser.add_argument('--max_steps', type=int, default=None, help='step budget of each simulation, in time-steps of 1/60 s (None for no budget)')
+	parser.add_argument('--seed', type=int, default=0, help='seed of the variants')
+	parser.add_argument('--chunk_size', type=int, default=20, help='number of variants simulated by a task of the pool')
+	parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of processes which run the simulations')
+	parser.add_argument('--output', default='validation_' + datetime.now().strftime('%Y_%m_%d_%H_%M_%S'), help='prefix of the output files')
+	args = parser.parse_args()
+
+	filenames = []
+	for pattern in args.inputs:
+		filenames.extend(sorted(glob.glob(pattern)) or [pattern])
+	settings = {'seed': args.seed, 'jitter': args.jitter, 'radius': args.radius, 'rates': args.rates, 'max_steps': args.max_steps, 'metrics': args.metrics}
+	metric_columns = [column for name in args.metrics for column in metric_classes[name].columns]
+	tasks = [(i, read_parameters(filename), scenario, range(start, min(start + args.chunk_size, args.variants)), settings)
+			for i, filename in enumerate(filenames) for scenario in args.scenarios for start in range(0, args.variants, args.chunk_size)]
+	# the longest simulations are the ones of the slowest parameters: the chunks of the files are interleaved so that they spread over the workers
+	tasks.sort(key=lambda task: (task[3].start, task[2], task[0]))
+
+	start = time()
+	rows = []
+	with Pool(args.workers) as pool:
+		for done, chunk in enumerate(pool.imap_unordered(simulate_chunk, tasks), 1):
+			rows.extend(chunk)
+			if done % max(1, len(tasks) // 20) == 0 or done == len(tasks):
+				print('{0}/{1} simulations, {2:.0f} s'.format(len(rows), len(filenames) * len(args.scenarios) * args.variants, time() - start))
+	results = np.asarray(rows, dtype=float)
+	results = results[np.lexsort((results[:, 2], results[:, 1], results[:, 0]))]
+
+	with open(args.output + '_simulations.csv', mode='w') as simulations_file:
+		writer = csv.writer(simulations_file, delimiter=',')
+		writer.writerow(simulation_columns + metric_columns)
+		for row in results:
+			writer.writerow([filenames[int(row[0])]] + [int(value) for value in row[1:3]] + list(row[3:6]) + [int(value) for value in row[6:9]] + list(row[9:]))
+
+	summaries = []
+	for i, filename in enumerate(filenames):
+		for scenario in args.scenarios:
+			summary = summarize(results[(results[:, 0] == i) & (results[:, 1] == scenario)], metric_columns)
+			summaries.append(dict(file=filename, scenario=scenario, **summary))
+			print('{0} scenario {1}: success {2:.1%}, collisions in {3:.1%} (mean {4:.2f}, max {5:.0f}), arrival time {6:.2f} s (95%: {7:.2f} s), '
+				'simulation {8:.3f} s (95%: {9:.3f} s)'.format(os.path.basename(filename), scenario, summary['success_rate'], summary['collision_rate'],
+				summary['mean_collisions'], summary['max_collisions'], summary['median_arrival_time'], summary['p95_arrival_time'],
+				summary['median_wall_time'], summary['p95_wall_time']))
+	with open(args.output + '_summary.csv', mode='w') as summary_file:
+		writer = csv.DictWriter(summary_file, fieldnames=list(summaries[0].keys()))
+		writer.writeheader()
+		writer.writerows(summaries)
+	print('Validation of {0} files on {1} variants of {2} scenarios: {3:.0f} s with {4} workers, saved to {5}_simulations.csv and {5}_summary.csv'.format(
+		len(filenames), args.variants, len(args.scenarios), time() - start, args.workers, args.output))
+
+
+
+if __name__ == '__main__':
+	main()
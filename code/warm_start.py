@@ -0,0 +1,124 @@
+'''
+warm_start.py
+This module contains the functions to warm-start the optimizer from the output files of earlier runs.
+The best solutions found in "best_individual_parameters_*" and "drones_ec_individuals_*" files are perturbed and injected
+into the initial population, and the rest of the population is filled with a space-filling sample of the constraints.
+'''
+
+import csv
+import glob
+import heapq
+import os
+from sampling import space_filling_design
+
+
+def find_files(patterns):
+	'''
+	Function to expand the warm-start sources into the list of files to read.
+	Returns the sorted list of the best individual parameters and individuals files found.
+	- patterns --> list of directories or glob patterns (e.g. "runs/best_individual_parameters_scenario2_*.csv")
+	'''
+	files = set()
+	for pattern in patterns:
+		if os.path.isdir(pattern):
+			pattern = os.path.join(pattern, '*.csv')
+		for filename in glob.glob(pattern):
+			basename = os.path.basename(filename)
+			if basename.startswith('best_individual_parameters_') or basename.startswith('drones_ec_individuals_'):
+				files.add(filename)
+	return sorted(files)
+
+
+def read_best_parameters(filename, num_genes):
+	'''
+	Function to read the chromosome saved in a best individual parameters file.
+	Returns the chromosome as a list of floats.
+	'''
+	with open(filename, mode='r') as best_individual_file:
+		for row in csv.reader(best_individual_file, delimiter=','):
+			return [float(value) for value in row[:num_genes]]
+	return None
+
+
+def read_best_individuals(filename, num_genes, size):
+	'''
+	Function to read the best distinct individuals of an individuals file, one line at a time so that large files fit in memory.
+	Each line has the format written by inspyred's file_observer: generation, individual number, fitness, [chromosome].
+	Returns the list of the "size" best (fitness, chromosome) tuples, sorted by increasing fitness.
+	'''
+	best = []
+	seen = set()
+	with open(filename, mode='r') as individuals_file:
+		for line in individuals_file:
+			fields = line.split(', ', 3)
+			if len(fields) < 4:
+				continue
+			fitness = float(fields[2])
+			chromosome = tuple(float(value) for value in fields[3].strip().strip('[]').split(',')[:num_genes])
+			if chromosome in seen:
+				continue
+			if len(best) < size:
+				heapq.heappush(best, (-fitness, chromosome))
+				seen.add(chromosome)
+			elif fitness < -best[0][0]:
+				removed = heapq.heappushpop(best, (-fitness, chromosome))
+				seen.discard(removed[1])
+				seen.add(chromosome)
+	return sorted((-f, list(c)) for f, c in best)
+
+
+def normalized_distance(chromosome1, chromosome2, lower_bound, upper_bound):
+	'''
+	Function to calculate the distance between two chromosomes, with each gene scaled to the [0, 1] range of the constraints.
+	'''
+	return sum(((a - b) / (hi - lo)) ** 2 for a, b, lo, hi in zip(chromosome1, chromosome2, lower_bound, upper_bound)) ** 0.5
+
+
+def warm_start_seeds(random, patterns, pop_size, lower_bound, upper_bound, top_k=10, perturbation=0.05, min_distance=0.05, method='lhs'):
+	'''
+	Function to create the initial population of a warm-started run.
+	The chromosomes of the best individual parameters files come first (newest file first), followed by the individuals of the individuals files
+	sorted by fitness. The first "top_k" of them which are at least "min_distance" apart are perturbed with a Gaussian noise and injected;
+	the rest of the population is filled with a space-filling sample of the constraints.
+	Since the fitness of the individuals files depends on their scenario, the files of neighbouring scenarios should be given as best parameters files.
+	Returns the list of "pop_size" chromosomes, to be used as seeds of the evolve function.
+	- random --> random number generator of the run
+	- patterns --> list of directories or glob patterns of the earlier output files
+	- pop_size --> size of the initial population
+	- lower_bound / upper_bound --> boundaries of the genes
+	- top_k --> maximum number of earlier solutions injected
+	- perturbation --> standard deviation of the Gaussian noise, relative to the range of each gene
+	- min_distance --> minimum normalized distance between two injected solutions
+	- method --> sampling method of the rest of the population, see space_filling_design
+	'''
+	num_genes = len(lower_bound)
+	files = find_files(patterns)
+	best_files = []
+	individuals = []
+	for filename in files:
+		if os.path.basename(filename).startswith('best_individual_parameters_'):
+			best_files.append(filename)
+		else:
+			individuals.extend(read_best_individuals(filename, num_genes, top_k * 10))
+	best_files.sort(key=os.path.getmtime, reverse=True)
+	sources = [read_best_parameters(f, num_genes) for f in best_files]
+	sources.extend(chromosome for fitness, chromosome in sorted(individuals))
+
+	selected = []
+	for chromosome in sources:
+		if chromosome is None or len(chromosome) < num_genes:
+			continue
+		if all(normalized_distance(chromosome, other, lower_bound, upper_bound) >= min_distance for other in selected):
+			selected.append(chromosome)
+		if len(selected) == min(top_k, pop_size):
+			break
+
+	seeds = []
+	for chromosome in selected:
+		seed = []
+		for value, lo, hi in zip(chromosome, lower_bound, upper_bound):
+			seed.append(min(max(value + random.gauss(0, perturbation * (hi - lo)), lo), hi))
+		seeds.append(seed)
+	seeds.extend(space_filling_design(random, pop_size - len(seeds), lower_bound, upper_bound, method))
+	print('Warm start: {0} earlier solutions injected from {1} files, {2} {3} samples'.format(len(selected), len(files), pop_size - len(selected), method))
+	return seeds
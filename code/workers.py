@@ -0,0 +1,453 @@
+'''
+workers.py
+This module contains the pool of worker processes which run the simulations of the optimizer in parallel.
+Each worker is a process connected to the main one by a pipe, and receives one candidate at a time, so that the main process can
+enforce a wall-clock budget on every simulation: a worker which exceeds it is terminated and replaced, and its candidate gets "timeout_fitness".
+The dispatcher also checks the resident memory of the busy workers while they simulate (from /proc/<pid>/statm, every "memory_poll_interval"
+seconds): a worker which exceeds the memory ceiling is terminated and replaced, and its candidate gets "timeout_fitness", so a runaway simulation
+cannot exhaust the memory of the machine. A worker whose resident memory is still above the ceiling after a simulation is recycled (i.e. replaced
+by a new process). Where /proc is not available, only the peak memory of the worker is known (it never decreases), so the worker is recycled
+after its simulation and, once it crossed the ceiling, would be after every simulation: there the ceiling is checked only after the simulations.
+The pool is driven by a dispatcher thread and can be shared by several runs of the optimizer (e.g. the threads of run_experiments.py):
+each run submits its batches through its own client, and the idle workers take the candidates of the clients in turn.
+The candidates of a batch are scheduled longest first, by the runtime predicted with an online regression on the runtimes of the earlier simulations,
+so that the slow simulations do not end up alone at the end of the batch.
+An exception raised by the evaluator in a worker is sent back to the main process and raised again by the client, so that an error of the
+evaluator stops the run instead of being mistaken for a crash of the worker.
+'''
+
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import pickle
+import threading
+import traceback
+from time import time
+import numpy as np
+from parameters import timeout_fitness
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+
+def peak_memory():
+	'''
+	Function to read the peak resident memory of the current process.
+	Returns the peak memory in megabytes (0 where the resource module is not available, e.g. on Windows).
+	'''
+	if resource is None:
+		return 0.0
+	# ru_maxrss is in kilobytes on Linux
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def resident_memory(pid='self'):
+	'''
+	Function to read the current resident memory of a process from /proc/<pid>/statm.
+	Returns the resident memory in megabytes, or None where /proc is not available (e.g. on Windows and macOS) or the process is gone.
+	'''
+	try:
+		with open('/proc/{0}/statm'.format(pid), mode='r') as statm_file:
+			return int(statm_file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1048576.0
+	except (OSError, ValueError, IndexError):
+		return None
+
+
+class WorkerError(object):
+	'''
+	Exception raised by the evaluator in a worker, sent back to the main process with the traceback of the worker.
+	- error --> exception raised by the evaluator (a RuntimeError with its description if it cannot be pickled)
+	- trace --> traceback of the exception in the worker
+	'''
+	def __init__(self, error, trace):
+		try:
+			pickle.dumps(error)
+		except Exception:
+			error = RuntimeError(repr(error))
+		self.error = error
+		self.trace = trace
+
+
+def _worker(connection, memory_limit):
+	while True:
+		try:
+			message = connection.recv()
+		except EOFError:
+			break
+		if message is None:
+			break
+		index, candidate, evaluator, worker_args = message
+		start = time()
+		try:
+			result = evaluator([candidate], worker_args)[0]
+		except Exception as error:
+			connection.send((index, WorkerError(error, traceback.format_exc()), False, time() - start))
+			continue
+		memory = None if memory_limit is None else resident_memory()
+		if memory is None and memory_limit is not None:
+			memory = peak_memory()
+		connection.send((index, result, memory is not None and memory > memory_limit, time() - start))
+
+
+class RuntimeModel(object):
+	'''
+	Online regression of the runtime of a simulation on the genes of the candidate.
+	The logarithm of the runtime is fitted by ridge least squares on the genes, on the product neigh_dist * max_neigh (cost of the neighbour search)
+	and on the inverse of max_speed (length of the simulation), over the last "max_samples" simulations.
+	- num_genes --> number of genes of the candidates
+	- max_samples --> number of the most recent simulations used by the regression
+	'''
+	def __init__(self, num_genes, max_samples=2000, ridge=1e-3):
+		self.num_genes = num_genes
+		self.max_samples = max_samples
+		self.ridge = ridge
+		self.x = []
+		self.y = []
+		self.weights = None
+
+	def _features(self, candidates):
+		genes = np.asarray([c[:self.num_genes] for c in candidates], dtype=float)
+		return np.column_stack([np.ones(len(genes)), genes, genes[:, 0] * genes[:, 1], 1.0 / np.maximum(genes[:, -1], 1e-3)])
+
+	def add(self, candidates, seconds):
+		'''
+		Function to add the runtimes of simulated candidates and refit the regression.
+		'''
+		self.x.extend(self._features(candidates))
+		self.y.extend(np.log(np.maximum(seconds, 1e-6)))
+		self.x = self.x[-self.max_samples:]
+		self.y = self.y[-self.max_samples:]
+		x = np.asarray(self.x)
+		if len(x) >= 2 * x.shape[1]:
+			self.weights = np.linalg.solve(x.T.dot(x) + self.ridge * np.eye(x.shape[1]), x.T.dot(np.asarray(self.y)))
+
+	def predict(self, candidates):
+		'''
+		Function to predict the runtimes of the candidates.
+		Returns a numpy array with the predicted seconds, or None while the regression has too few samples.
+		'''
+		if self.weights is None:
+			return None
+		return np.exp(self._features(candidates).dot(self.weights))
+
+
+def static_makespan(seconds, num_workers):
+	'''
+	Function to calculate the makespan of a batch with static chunking, i.e. with the candidates split in "num_workers" contiguous chunks of equal size.
+	- seconds --> runtimes of the candidates, in the order of the batch
+	'''
+	chunk = -(-len(seconds) // num_workers)
+	return max(sum(seconds[i:i + chunk]) for i in range(0, len(seconds), chunk))
+
+
+class WorkerPool(object):
+	'''
+	Pool of worker processes, shared by the clients created with the client function.
+	A dispatcher thread sends the candidates to the idle workers, taking them from the clients with pending candidates in turn (round robin),
+	so that every run sharing the pool progresses at the same pace.
+	- num_workers --> number of worker processes, or 'auto' to choose it on the first batch (see PoolClient.evaluate)
+	- time_budget --> wall-clock budget in seconds of each simulation (None for no budget)
+	- memory_limit --> memory ceiling of a worker in megabytes (None for no ceiling)
+	- memory_poll_interval --> seconds between two checks of the memory of the busy workers
+	'''
+	def __init__(self, num_workers=1, time_budget=None, memory_limit=None, memory_poll_interval=0.5):
+		self.time_budget = time_budget
+		self.memory_limit = memory_limit
+		self.memory_poll_interval = memory_poll_interval
+		self.tune_workers = num_workers == 'auto'
+		if self.tune_workers:
+			num_workers = multiprocessing.cpu_count()
+		self.workers = [self._start() for i in range(num_workers)]
+		self.num_active = num_workers
+		self.clients = []
+		self.turn = 0
+		self.closed = False
+		self.condition = threading.Condition()
+		self.wakeup, self.waker = multiprocessing.Pipe(duplex=False)
+		self.dispatcher = threading.Thread(target=self._dispatch)
+		self.dispatcher.daemon = True
+		self.dispatcher.start()
+
+	def _start(self):
+		connection, worker_connection = multiprocessing.Pipe()
+		process = multiprocessing.Process(target=_worker, args=(worker_connection, self.memory_limit))
+		process.daemon = True
+		process.start()
+		worker_connection.close()
+		return process, connection
+
+	def _restart(self, worker):
+		process, connection = self.workers[worker]
+		process.terminate()
+		process.join()
+		connection.close()
+		self.workers[worker] = self._start()
+
+	def _wake(self):
+		with self.condition:
+			if not self.closed:
+				self.waker.send(None)
+
+	def _next_client(self):
+		for i in range(len(self.clients)):
+			client = self.clients[(self.turn + i) % len(self.clients)]
+			if len(client.pending) > 0:
+				self.turn = (self.turn + i + 1) % len(self.clients)
+				return client
+		return None
+
+	def _dispatch(self):
+		busy = {}
+		while True:
+			with self.condition:
+				if self.closed:
+					break
+				for worker in range(self.num_active):
+					if worker not in busy:
+						client = self._next_client()
+						if client is None:
+							break
+						index = client.pending.pop()
+						self.workers[worker][1].send((index, client.candidates[index], client.evaluator, client.worker_args))
+						busy[worker] = (client, index, time())
+				connections = [self.workers[worker][1] for worker in busy]
+
+			timeout = None
+			if self.time_budget is not None and len(busy) > 0:
+				timeout = max(min(start for client, index, start in busy.values()) + self.time_budget - time(), 0)
+			if self.memory_limit is not None and len(busy) > 0:
+				timeout = self.memory_poll_interval if timeout is None else min(timeout, self.memory_poll_interval)
+			ready = wait(connections + [self.wakeup], timeout)
+			if self.wakeup in ready:
+				self.wakeup.recv()
+
+			with self.condition:
+				for worker in list(busy):
+					client, index, start = busy[worker]
+					connection = self.workers[worker][1]
+					if connection in ready:
+						try:
+							index, result, recycle, elapsed = connection.recv()
+							if (result[0] if isinstance(result, tuple) else result) == timeout_fitness:
+								client.num_step_timeouts += 1
+						except EOFError:
+							# The worker died during the simulation (e.g. killed by the operating system)
+							result, recycle, elapsed = client.penalty, True, time() - start
+						if recycle:
+							self._restart(worker)
+							client.num_recycles += 1
+					elif self.time_budget is not None and time() - start > self.time_budget:
+						result, elapsed = client.penalty, time() - start
+						self._restart(worker)
+						client.num_timeouts += 1
+					elif self.memory_limit is not None and (resident_memory(self.workers[worker][0].pid) or 0.0) > self.memory_limit:
+						result, elapsed = client.penalty, time() - start
+						self._restart(worker)
+						client.num_recycles += 1
+						client.num_memory_kills += 1
+					else:
+						continue
+					client.results[index] = result
+					client.seconds[index] = elapsed
+					client.remaining -= 1
+					del busy[worker]
+				self.condition.notify_all()
+
+	def client(self, evaluator, worker_args, num_genes=5):
+		'''
+		Function to create a client of the pool for one run.
+		Returns the PoolClient.
+		- evaluator --> simulation evaluator of the run, called by the workers on one candidate at a time
+		- worker_args --> arguments passed to the evaluator by the workers (e.g. "max_simulation_steps"), sent with every candidate
+		- num_genes --> number of genes of the candidates, used by the runtime regression
+		'''
+		client = PoolClient(self, evaluator, worker_args, num_genes)
+		with self.condition:
+			self.clients.append(client)
+		return client
+
+	def close(self):
+		'''
+		Function to stop the dispatcher and the workers.
+		'''
+		with self.condition:
+			self.closed = True
+			self.waker.send(None)
+		self.dispatcher.join()
+		for process, connection in self.workers:
+			try:
+				connection.send(None)
+			except (OSError, BrokenPipeError):
+				pass
+			connection.close()
+		for process, connection in self.workers:
+			process.join(1)
+			if process.is_alive():
+				process.terminate()
+
+
+class PoolClient(object):
+	'''
+	Client of a WorkerPool, used by one run of the optimizer. It schedules the candidates of its batches longest first,
+	and keeps the statistics of its simulations: timeouts, recycled workers (also the ones terminated by the memory ceiling), makespan and utilization (also the ones static chunking would have had).
+	- pool --> WorkerPool
+	- evaluator / worker_args / num_genes --> see WorkerPool.client
+	'''
+	def __init__(self, pool, evaluator, worker_args, num_genes=5):
+		self.pool = pool
+		self.evaluator = evaluator
+		self.worker_args = worker_args
+		self.runtime_model = RuntimeModel(num_genes)
+		if worker_args.get('store_objectives', False):
+			self.penalty = (timeout_fitness, None)
+		else:
+			self.penalty = timeout_fitness
+		self.candidates = []
+		self.pending = []
+		self.results = []
+		self.seconds = []
+		self.remaining = 0
+		self.num_timeouts = 0
+		self.num_step_timeouts = 0
+		self.num_recycles = 0
+		self.num_memory_kills = 0
+		self.makespan = 0.0
+		self.static_makespan = 0.0
+		self.busy_time = 0.0
+		self.worker_time = 0.0
+		self.static_worker_time = 0.0
+		self.tuning = None
+
+	@property
+	def num_workers(self):
+		return self.pool.num_active
+
+	def _run(self, candidates, order):
+		pool = self.pool
+		with pool.condition:
+			self.candidates = candidates
+			self.results = [None] * len(candidates)
+			self.seconds = [0.0] * len(candidates)
+			self.pending = list(reversed(order))
+			self.remaining = len(order)
+		pool._wake()
+		with pool.condition:
+			while self.remaining > 0:
+				pool.condition.wait()
+		return self.results, self.seconds
+
+	def _tune(self, candidates):
+		# Run the first candidates with 1, 2, 4, ... workers (two candidates per worker), and keep the number of workers
+		# after which the throughput stops growing by at least 10%; the other workers are left idle.
+		# Returns the results and seconds of the candidates run, with the chosen number of workers and its throughput
+		pool = self.pool
+		results = []
+		seconds = []
+		best_workers = 1
+		best_throughput = 0.0
+		num_workers = 1
+		while num_workers <= len(pool.workers) and len(results) + 2 * num_workers <= len(candidates):
+			pool.num_active = num_workers
+			start = time()
+			batch_results, batch_seconds = self._run(candidates[len(results):len(results) + 2 * num_workers], range(2 * num_workers))
+			throughput = 2 * num_workers / (time() - start)
+			results.extend(batch_results)
+			seconds.extend(batch_seconds)
+			if throughput < 1.1 * best_throughput:
+				break
+			best_workers, best_throughput = num_workers, throughput
+			num_workers *= 2
+		pool.num_active = best_workers
+		return results, seconds, best_workers, best_throughput
+
+	def evaluate(self, candidates):
+		'''
+		Function to evaluate the candidates on the workers of the pool, longest predicted runtime first.
+		With num_workers 'auto', the first candidates of the first batch submitted to the pool are used to choose the number of workers,
+		which is kept with its throughput in "tuning".
+		The makespan and the utilization of the workers are accumulated, together with the ones that static chunking would have had
+		with the same runtimes.
+		Returns the list of results of the evaluator, in the order of the candidates.
+		If the evaluator raised an exception in a worker, it is raised again here, once the whole batch is done.
+		'''
+		results = []
+		seconds = []
+		with self.pool.condition:
+			tune = self.pool.tune_workers
+			self.pool.tune_workers = False
+		if tune:
+			results, seconds, best_workers, best_throughput = self._tune(candidates)
+			self.tuning = (best_workers, best_throughput)
+		first = len(results)
+
+		rest = candidates[first:]
+		order = list(range(len(rest)))
+		predicted = self.runtime_model.predict(rest) if len(rest) > 0 else None
+		if predicted is not None and self.num_workers > 1:
+			order.sort(key=lambda index: -predicted[index])
+		start = time()
+		rest_results, rest_seconds = self._run(rest, order)
+		makespan = time() - start
+		results = results + rest_results
+		seconds = seconds + rest_seconds
+		for result in results:
+			if isinstance(result, WorkerError):
+				raise result.error from RuntimeError('the evaluator failed in a worker process:\n' + result.trace)
+
+		if len(rest) > 0:
+			busy = sum(rest_seconds)
+			static = static_makespan(rest_seconds, self.num_workers)
+			self.makespan += makespan
+			self.static_makespan += static
+			self.busy_time += busy
+			self.worker_time += makespan * self.num_workers
+			self.static_worker_time += static * self.num_workers
+		self.runtime_model.add(candidates, seconds)
+		return results
+
+	def utilization(self):
+		'''
+		Function to calculate the utilization of the workers.
+		Returns the tuple (utilization with the longest-first scheduling, utilization of static chunking).
+		'''
+		return self.busy_time / max(self.worker_time, 1e-12), self.busy_time / max(self.static_worker_time, 1e-12)
+
+	def close(self):
+		'''
+		Function to remove the client from its pool.
+		'''
+		with self.pool.condition:
+			self.pool.clients.remove(self)
+
+
+def pool_evaluation(candidates, args):
+	'''
+	Funtion to evaluate the candidates with the "worker_pool" in args (a PoolClient).
+	The timed-out simulations (wall-clock and step budgets) and the recycled workers are counted in "num_timeouts" and "num_recycles" in args.
+	After each batch, the cumulative makespan and utilization of the pool, and the ones of static chunking, are written to the "schedule_file" in args.
+	- candidates --> candidates chromosomes generated by the EC
+	'''
+	pool = args['worker_pool']
+	results = pool.evaluate(candidates)
+	args['num_timeouts'] = pool.num_timeouts + pool.num_step_timeouts
+	args['num_recycles'] = pool.num_recycles
+	schedule_file = args.get('schedule_file')
+	if schedule_file is not None:
+		utilization, static_utilization = pool.utilization()
+		schedule_file.write('{0}, {1}, {2}, {3}, {4}, {5}, {6}\n'.format(args['_ec'].num_generations, len(candidates), pool.num_workers,
+																pool.makespan, pool.static_makespan, utilization, static_utilization))
+		schedule_file.flush()
+	return results
+
+
+def step_budget_evaluation(candidates, args):
+	'''
+	Funtion to evaluate the candidates in the process of the run with the "step_budget_evaluator" in args, for a run with a step budget and no worker pool.
+	The simulations stopped by their step budget are counted in "num_timeouts" in args, as pool_evaluation does for the runs with a pool.
+	- candidates --> candidates chromosomes generated by the EC
+	'''
+	results = args['step_budget_evaluator'](candidates, args)
+	args['num_timeouts'] = args.get('num_timeouts', 0) + sum(1 for result in results if (result[0] if isinstance(result, tuple) else result) == timeout_fitness)
+	return results
@@ -0,0 +1,182 @@
+'''
+FITNESS ANALYTICS OF MANY RUNS:
+Statistics files (or population stores of runs with individuals_format = 'binary') in input, given as glob patterns, with no window.
+The files are read in parallel and grouped by scenario (from their names) into one NumPy array per scenario, with shape
+(runs, generations, 7) and the columns of the statistics files (generation, population size, worst, best, median, mean and std fitness);
+the generations after the end of the shorter runs are nan, and the empty files (runs which have not written a generation yet) are skipped with a warning. The arrays are cached in "--cache_dir": at the next call only the files added
+or modified since then are read again, and the cache is rebuilt only when a file changed.
+For each scenario it saves the plots of plot_all_best.py (best fitness of every run), plot_fitness_trend.py (mean and standard deviation
+across runs of the best fitness of each generation, with the 25-75% quantile band) and plot_best_fitness.py (best run), and prints the final best fitness across runs.
+
+Usage:
+python fitness_analytics.py "results/drones_ec_statistics_scenario*_*.csv" --output_dir plots
+python fitness_analytics.py "results/drones_ec_statistics_scenario1_*.csv" --plots trend --workers 8 --show
+'''
+
+import matplotlib
+import argparse
+import glob
+import os
+import re
+import warnings
+from multiprocessing import Pool
+import numpy as np
+
+statistics_columns = ['generation', 'size', 'worst', 'best', 'median', 'mean', 'std']
+
+
+def read_statistics(filename):
+	'''
+	Function to read a statistics file, or the statistics of a population store.
+	Returns the numpy array of its rows, with the columns of statistics_columns.
+	'''
+	if os.path.isdir(filename):
+		values = np.fromfile(os.path.join(filename, 'statistics.f8'), dtype='<f8')
+		return values[:len(values) // 7 * 7].reshape(-1, 7)
+	with warnings.catch_warnings():
+		warnings.simplefilter('ignore', UserWarning) # the empty files are reported by load_scenario
+		return np.loadtxt(filename, delimiter=',', ndmin=2)
+
+
+def file_scenario(filename):
+	'''
+	Function to find the scenario of a file from its name (0 if the name does not contain it).
+	'''
+	match = re.search(r'scenario(\d)', os.path.basename(filename.rstrip('/\\')))
+	return 0 if match is None else int(match.group(1))
+
+
+def file_signature(filename):
+	'''
+	Function to compute the signature of a file (or of the statistics of a population store) used to find the changed files.
+	'''
+	path = os.path.join(filename, 'statistics.f8') if os.path.isdir(filename) else filename
+	info = os.stat(path)
+	return info.st_mtime_ns, info.st_size
+
+
+def load_scenario(filenames, cache_file, pool):
+	'''
+	Function to load the statistics of the runs of a scenario through its cache file, skipping the empty files with a warning.
+	Returns the tuple (filenames, data), where data is the numpy array with shape (runs, generations, 7), or None if every file is empty.
+	'''
+	filenames = sorted(filenames)
+	signatures = [file_signature(filename) for filename in filenames]
+	cached = {}
+	if os.path.isfile(cache_file):
+		with np.load(cache_file) as cache:
+			if list(cache['files']) == filenames and [tuple(s) for s in cache['signatures']] == signatures:
+				return filenames, cache['data']
+			for filename, signature, length, rows in zip(cache['files'], cache['signatures'], cache['lengths'], cache['data']):
+				cached[str(filename)] = (tuple(signature), rows[:length])
+	missing = [filename for filename, signature in zip(filenames, signatures) if cached.get(filename, (None,))[0] != signature]
+	for filename, rows in zip(missing, pool.map(read_statistics, missing)):
+		cached[filename] = (None, rows)
+	for filename in [filename for filename in filenames if len(cached[filename][1]) == 0]:
+		warnings.warn('{0} has no generations yet, skipped'.format(filename))
+		signatures.pop(filenames.index(filename))
+		filenames.remove(filename)
+	if len(filenames) == 0:
+		return filenames, None
+
+	runs = [cached[filename][1] for filename in filenames]
+	lengths = [len(rows) for rows in runs]
+	data = np.full((len(runs), max(lengths), len(statistics_columns)), np.nan)
+	for i, rows in enumerate(runs):
+		data[i, :len(rows)] = rows
+	np.savez(cache_file, files=np.asarray(filenames), signatures=np.asarray(signatures, dtype=np.int64), lengths=np.asarray(lengths), data=data)
+	return filenames, data
+
+
+def across_runs(data, column='best'):
+	'''
+	Function to compute the statistics across runs of a column, for each generation (the runs which ended before a generation are left out).
+	Returns a dictionary with the per-generation number of runs, mean, std, median, 25% and 75% quantiles.
+	'''
+	values = data[:, :, statistics_columns.index(column)]
+	return {'runs': np.sum(~np.isnan(values), axis=0),
+			'mean': np.nanmean(values, axis=0),
+			'std': np.nanstd(values, axis=0),
+			'median': np.nanmedian(values, axis=0),
+			'q25': np.nanpercentile(values, 25, axis=0),
+			'q75': np.nanpercentile(values, 75, axis=0)}
+
+
+def plot_all_best(ax, filenames, data):
+	best = data[:, :, statistics_columns.index('best')]
+	for i in range(len(filenames)):
+		ax.plot(best[i], label='Evolution {0}: {1}'.format(i + 1, np.nanmin(best[i])))
+	best_run = int(np.nanargmin(np.nanmin(best, axis=1)))
+	ax.set_title('Fitness over generations\n Minimum Value at Evolution {0}: {1}'.format(best_run + 1, np.nanmin(best)))
+	if len(filenames) <= 20:
+		ax.legend(loc='best')
+
+
+def plot_trend(ax, filenames, data):
+	trend = across_runs(data)
+	x = np.arange(len(trend['mean']))
+	ax.plot(x, trend['mean'], '--', linewidth=2, color='g', label='Average Fitness ({0} runs)'.format(len(filenames)))
+	ax.fill_between(x, trend['mean'] - trend['std'], trend['mean'] + trend['std'], color='g', alpha=0.2, label='Standard deviation')
+	ax.fill_between(x, trend['q25'], trend['q75'], color='b', alpha=0.2, label='25-75% quantiles')
+	ax.plot(x, trend['median'], color='b', linewidth=1, label='Median Fitness')
+	ax.set_title('Fitness trend over generations')
+	ax.legend(loc='best')
+
+
+def plot_best_run(ax, filenames, data):
+	best = data[:, :, statistics_columns.index('best')]
+	best_run = int(np.nanargmin(np.nanmin(best, axis=1)))
+	ax.plot(best[best_run], color='g')
+	ax.set_title(os.path.basename(filenames[best_run].rstrip('/\\')))
+
+
+plots = {'all_best': plot_all_best, 'trend': plot_trend, 'best': plot_best_run}
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Plot the fitness of many runs from cached statistics arrays, without a window.')
+	parser.add_argument('inputs', nargs='+', help='statistics files, population stores or glob patterns of them')
+	parser.add_argument('--plots', nargs='+', choices=list(plots.keys()), default=list(plots.keys()))
+	parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of processes which read the files')
+	parser.add_argument('--cache_dir', default='analytics_cache')
+	parser.add_argument('--output_dir', default='.')
+	parser.add_argument('--show', action='store_true', help='show the plots in windows instead of saving them')
+	args = parser.parse_args()
+
+	if not args.show:
+		matplotlib.use('Agg')
+	from matplotlib import pyplot
+
+	filenames = sorted(set(filename for pattern in args.inputs for filename in (glob.glob(pattern) or [pattern])))
+	scenarios = {}
+	for filename in filenames:
+		scenarios.setdefault(file_scenario(filename), []).append(filename)
+	for directory in (args.cache_dir, args.output_dir):
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+
+	with Pool(args.workers) as pool:
+		for scenario in sorted(scenarios):
+			files, data = load_scenario(scenarios[scenario], os.path.join(args.cache_dir, 'statistics_scenario{0}.npz'.format(scenario)), pool)
+			if data is None:
+				warnings.warn('Scenario {0}: no run with generations, skipped'.format(scenario))
+				continue
+			final = np.array([run[~np.isnan(run[:, 3]), 3].min() for run in data])
+			print('Scenario {0}: {1} runs, up to {2} generations, final best fitness {3:.6g} +- {4:.6g} (min {5:.6g}, median {6:.6g})'.format(
+				scenario, len(files), data.shape[1], final.mean(), final.std(), final.min(), np.median(final)))
+			for name in args.plots:
+				fig, ax = pyplot.subplots()
+				ax.grid()
+				plots[name](ax, files, data)
+				ax.set_xlabel('Generation')
+				ax.set_ylabel('Fitness')
+				if not args.show:
+					fig.savefig(os.path.join(args.output_dir, 'fitness_{0}_scenario{1}.png'.format(name, scenario)))
+					pyplot.close(fig)
+	if args.show:
+		pyplot.show()
+
+
+
+if __name__ == '__main__':
+	main()
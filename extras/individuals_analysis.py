@@ -0,0 +1,207 @@
+'''
+STREAMING ANALYSIS OF INDIVIDUALS FILES:
+Individuals files (or population stores of runs with individuals_format = 'binary') in input, given as glob patterns, with no window.
+Each file is read in chunks of a fixed number of individuals, so that the memory does not depend on the size of the file, and in a single pass
+it computes for every generation: the distribution of each gene (histograms with the bins of plot_hist_params.py), the mean and standard deviation
+of the genes, the diversity of the population (average standard deviation of the genes scaled to the constraints, as in restarts.py),
+the rate of duplicate candidates, the best and mean fitness and the best fitness so far.
+The results are cached in "--cache_dir" ("<cache_dir>/<file name>.analysis.npz", outside the folders of the runs, so that the glob patterns
+of the stores do not match them) and computed again only when the file changes.
+For each file it saves the diversity plot (best fitness so far, diversity and duplicate rate over the generations) and the gene distribution
+plot (histogram of each gene over the generations); the empty files (runs which have not written a generation yet) are skipped with a warning.
+plot_hist_params.py draws the individuals files from the same results.
+
+Usage:
+python individuals_analysis.py "results/drones_ec_individuals_scenario1_*.csv" --output_dir plots
+python individuals_analysis.py drones_ec_population_scenario2_2020_09_01_10_00_00 --chunk_size 50000 --show
+'''
+
+import matplotlib
+import argparse
+import glob
+import json
+import os
+import sys
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+from parameters import gene_names, constraints
+
+gene_bins = [np.arange(0.1, 5.2, 0.1), np.arange(1, 5, 1), np.arange(0.1, 11, 0.5), np.arange(0.1, 11, 0.5), np.arange(0.5, 6, 0.5)]
+
+
+def csv_chunks(filename, chunk_size):
+	'''
+	Function to read an individuals file in chunks of "chunk_size" lines.
+	Yields the tuples (generations, fitness, genes) of numpy arrays of each chunk.
+	'''
+	with open(filename, mode='r') as individuals_file:
+		while True:
+			lines = [line for _, line in zip(range(chunk_size), individuals_file)]
+			if len(lines) == 0:
+				return
+			values = np.loadtxt([line.replace('[', '').replace(']', '') for line in lines], delimiter=',', ndmin=2)
+			yield values[:, 0].astype(int), values[:, 2], values[:, 3:3 + len(gene_names)]
+
+
+def store_chunks(directory, chunk_size):
+	'''
+	Function to read a population store in chunks of "chunk_size" individuals (see population_store.py).
+	Yields the tuples (generations, fitness, genes) of numpy arrays of each chunk.
+	'''
+	with open(os.path.join(directory, 'store.json'), mode='r') as store_file:
+		width = json.load(store_file)['width']
+	generations = np.memmap(os.path.join(directory, 'generation.i4'), dtype='<i4', mode='r')
+	fitness = np.memmap(os.path.join(directory, 'fitness.f8'), dtype='<f8', mode='r')
+	candidates = np.memmap(os.path.join(directory, 'candidates.f8'), dtype='<f8', mode='r')
+	size = min(len(generations), len(fitness), len(candidates) // width)
+	candidates = candidates[:size * width].reshape(size, width)
+	for start in range(0, size, chunk_size):
+		stop = min(start + chunk_size, size)
+		yield np.asarray(generations[start:stop]), np.asarray(fitness[start:stop]), np.asarray(candidates[start:stop, :len(gene_names)])
+
+
+def analyse_individuals(filename, chunk_size=100000):
+	'''
+	Function to compute the per-generation statistics of an individuals file (or population store) in a single pass over its chunks.
+	Returns a dictionary of numpy arrays with one row per generation (see the module description), with only the empty "generation" array if the file is empty.
+	'''
+	lower_bound = np.asarray(constraints[0], dtype=float)
+	scale = np.asarray(constraints[1], dtype=float) - lower_bound
+	results = {}
+	open_candidates = {}
+	chunks = store_chunks(filename, chunk_size) if os.path.isdir(filename) else csv_chunks(filename, chunk_size)
+	for generations, fitness, genes in chunks:
+		normalized = (genes - lower_bound[:genes.shape[1]]) / scale[:genes.shape[1]]
+		for generation in np.unique(generations):
+			rows = generations == generation
+			if generation not in results:
+				results[generation] = {'count': 0, 'best': np.inf, 'fitness_sum': 0.0, 'sum': 0.0, 'squares': 0.0, 'normalized_sum': 0.0, 'normalized_squares': 0.0,
+										'histograms': [np.zeros(len(bins) - 1, dtype=int) for bins in gene_bins]}
+				open_candidates[generation] = set()
+			result = results[generation]
+			result['count'] += int(rows.sum())
+			result['best'] = min(result['best'], fitness[rows].min())
+			result['fitness_sum'] += fitness[rows].sum()
+			result['sum'] = result['sum'] + genes[rows].sum(axis=0)
+			result['squares'] = result['squares'] + (genes[rows] ** 2).sum(axis=0)
+			result['normalized_sum'] = result['normalized_sum'] + normalized[rows].sum(axis=0)
+			result['normalized_squares'] = result['normalized_squares'] + (normalized[rows] ** 2).sum(axis=0)
+			for i, bins in enumerate(gene_bins[:genes.shape[1]]):
+				result['histograms'][i] += np.histogram(genes[rows, i], bins=bins)[0]
+			open_candidates[generation].update(row.tobytes() for row in genes[rows])
+		# the generations are saved in order: the ones before the last generation of the chunk are complete
+		for generation in [g for g in open_candidates if g < generations.max()]:
+			results[generation]['distinct'] = len(open_candidates.pop(generation))
+	for generation in list(open_candidates):
+		results[generation]['distinct'] = len(open_candidates.pop(generation))
+
+	if len(results) == 0:
+		return {'generation': np.zeros(0, dtype=int)}
+	order = sorted(results)
+	count = np.asarray([results[g]['count'] for g in order], dtype=float)
+	mean = np.asarray([results[g]['sum'] for g in order]) / count[:, None]
+	normalized_mean = np.asarray([results[g]['normalized_sum'] for g in order]) / count[:, None]
+	normalized_std = np.sqrt(np.maximum(np.asarray([results[g]['normalized_squares'] for g in order]) / count[:, None] - normalized_mean ** 2, 0.0))
+	best = np.asarray([results[g]['best'] for g in order])
+	analysis = {'generation': np.asarray(order),
+				'count': count,
+				'duplicate_rate': 1.0 - np.asarray([results[g]['distinct'] for g in order]) / count,
+				'best': best,
+				'best_so_far': np.minimum.accumulate(best),
+				'mean_fitness': np.asarray([results[g]['fitness_sum'] for g in order]) / count,
+				'gene_mean': mean,
+				'gene_std': np.sqrt(np.maximum(np.asarray([results[g]['squares'] for g in order]) / count[:, None] - mean ** 2, 0.0)),
+				'diversity': normalized_std.mean(axis=1)}
+	for i, name in enumerate(gene_names[:mean.shape[1]]):
+		analysis['histogram_' + name] = np.asarray([results[g]['histograms'][i] for g in order])
+	return analysis
+
+
+def load_analysis(filename, chunk_size=100000, cache_dir='analytics_cache'):
+	'''
+	Function to load the analysis of an individuals file (or population store) from its cache in "cache_dir", computing it again if the file changed.
+	Returns the dictionary of analyse_individuals.
+	'''
+	path = os.path.join(filename, 'candidates.f8') if os.path.isdir(filename) else filename
+	info = os.stat(path)
+	signature = np.asarray([info.st_mtime_ns, info.st_size], dtype=np.int64)
+	if not os.path.isdir(cache_dir):
+		os.makedirs(cache_dir)
+	cache_file = os.path.join(cache_dir, os.path.basename(filename.rstrip('/\\')) + '.analysis.npz')
+	if os.path.isfile(cache_file):
+		with np.load(cache_file) as cache:
+			if np.array_equal(cache['signature'], signature):
+				return {name: cache[name] for name in cache.files if name != 'signature'}
+	analysis = analyse_individuals(filename, chunk_size)
+	np.savez(cache_file, signature=signature, **analysis)
+	return analysis
+
+
+def plot_diversity(fig, analysis, title):
+	ax = fig.subplots(3, 1, sharex=True)
+	ax[0].plot(analysis['generation'], analysis['best'], color='g', linewidth=1, label='Best fitness')
+	ax[0].plot(analysis['generation'], analysis['best_so_far'], color='b', label='Best fitness so far')
+	ax[0].set_ylabel('Fitness')
+	ax[0].legend(loc='best')
+	ax[0].set_title(title)
+	ax[1].plot(analysis['generation'], analysis['diversity'], color='r')
+	ax[1].set_ylabel('Diversity')
+	ax[2].plot(analysis['generation'], analysis['duplicate_rate'], color='k')
+	ax[2].set_ylabel('Duplicate rate')
+	ax[2].set_xlabel('Generation')
+	for a in ax:
+		a.grid()
+
+
+def plot_gene_distributions(fig, analysis, title):
+	names = [name for name in gene_names if 'histogram_' + name in analysis]
+	ax = fig.subplots(len(names), 1, sharex=True)
+	for i, name in enumerate(names):
+		histograms = analysis['histogram_' + name]
+		bins = gene_bins[i]
+		ax[i].imshow(histograms.T, origin='lower', aspect='auto', cmap='viridis', interpolation='nearest',
+					extent=(analysis['generation'][0] - 0.5, analysis['generation'][-1] + 0.5, bins[0], bins[-1]))
+		ax[i].set_ylabel(name)
+	ax[0].set_title(title)
+	ax[-1].set_xlabel('Generation')
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Analyse large individuals files in chunks, with cached results.')
+	parser.add_argument('inputs', nargs='+', help='individuals files, population stores or glob patterns of them')
+	parser.add_argument('--chunk_size', type=int, default=100000, help='number of individuals read at a time')
+	parser.add_argument('--cache_dir', default='analytics_cache')
+	parser.add_argument('--output_dir', default='.')
+	parser.add_argument('--show', action='store_true', help='show the plots in windows instead of saving them')
+	args = parser.parse_args()
+
+	if not args.show:
+		matplotlib.use('Agg')
+	from matplotlib import pyplot
+
+	filenames = sorted(set(filename for pattern in args.inputs for filename in (glob.glob(pattern) or [pattern])))
+	if not os.path.isdir(args.output_dir):
+		os.makedirs(args.output_dir)
+	for filename in filenames:
+		analysis = load_analysis(filename, args.chunk_size, args.cache_dir)
+		if len(analysis['generation']) == 0:
+			warnings.warn('{0} has no generations yet, skipped'.format(filename))
+			continue
+		name = os.path.splitext(os.path.basename(filename.rstrip('/\\')))[0]
+		print('{0}: {1} generations, {2} individuals, best fitness {3:.6g}, final diversity {4:.4f}, mean duplicate rate {5:.3f}'.format(
+			name, len(analysis['generation']), int(analysis['count'].sum()), analysis['best_so_far'][-1], analysis['diversity'][-1], analysis['duplicate_rate'].mean()))
+		for plot, suffix in ((plot_diversity, 'diversity'), (plot_gene_distributions, 'genes')):
+			fig = pyplot.figure(figsize=(8, 8))
+			plot(fig, analysis, name)
+			if not args.show:
+				fig.savefig(os.path.join(args.output_dir, '{0}_{1}.png'.format(name, suffix)))
+				pyplot.close(fig)
+	if args.show:
+		pyplot.show()
+
+
+
+if __name__ == '__main__':
+	main()
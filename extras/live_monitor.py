@@ -0,0 +1,196 @@
+'''
+LIVE MONITOR OF RUNNING OPTIMIZATIONS:
+Statistics files (or population stores of runs with individuals_format = 'binary') of active runs in input, given as glob patterns,
+which are searched again at each poll so that the runs started later are monitored too.
+At each poll only the bytes appended to the files since the previous poll are read: the new statistics rows extend the fitness trend
+of each run, and the individuals of the last generation (from the individuals file next to the statistics file, or from the population store)
+update the distribution of the parameters. When a run is monitored from the middle, only the end of its individuals file is read.
+The plots are redrawn only when a file changed, and the CPU time spent by the monitor is printed, to check that it is negligible.
+
+Usage:
+python live_monitor.py "drones_ec_statistics_scenario*_*.csv" --interval 10
+python live_monitor.py "drones_ec_population_experiment_*" --output monitor.png
+'''
+
+import matplotlib
+import argparse
+import glob
+import json
+import os
+from time import time, process_time, sleep
+import numpy as np
+from individuals_analysis import gene_names, gene_bins
+
+
+class RunTail(object):
+	'''
+	Incremental reader of the statistics and of the last generation of the individuals of a run.
+	- path --> statistics file or population store of the run
+	- tail_bytes --> number of bytes read from the end of an individuals file at the first poll
+	'''
+	def __init__(self, path, tail_bytes=1 << 20):
+		self.path = path.rstrip('/\\')
+		self.binary = os.path.isdir(self.path)
+		name = os.path.basename(self.path)
+		self.name = name.replace('drones_ec_population_', '') if self.binary else os.path.splitext(name)[0].replace('drones_ec_statistics_', '')
+		self.individuals_path = None if self.binary else os.path.join(os.path.dirname(self.path), os.path.basename(self.path).replace('drones_ec_statistics_', 'drones_ec_individuals_'))
+		self.tail_bytes = tail_bytes
+		self.offsets = {}
+		self.partial = {}
+		self.statistics = np.empty((0, 7))
+		self.generation = None
+		self.genes = np.empty((0, len(gene_names)))
+
+	def _read(self, path, record_size=1, first_offset=0):
+		'''
+		Function to read the bytes appended to a file since the previous call (a multiple of "record_size").
+		'''
+		if not os.path.isfile(path):
+			return b''
+		size = os.path.getsize(path)
+		offset = self.offsets.setdefault(path, first_offset)
+		size -= (size - offset) % record_size
+		if size <= offset:
+			return b''
+		with open(path, mode='rb') as tailed_file:
+			tailed_file.seek(offset)
+			data = tailed_file.read(size - offset)
+		self.offsets[path] = offset + len(data)
+		return data
+
+	def _read_lines(self, path, first_offset=0):
+		'''
+		Function to read the complete lines appended to a text file since the previous call.
+		The first line read from the middle of a file ("first_offset") is incomplete, and it is skipped.
+		'''
+		skip = first_offset > 0 and path not in self.offsets
+		text = self.partial.get(path, '') + self._read(path, first_offset=first_offset).decode()
+		lines = text.split('\n')
+		self.partial[path] = lines.pop()
+		if skip:
+			lines = lines[1:]
+		return lines
+
+	def _update_genes(self, generations, genes):
+		if len(generations) == 0:
+			return
+		last = generations.max()
+		if self.generation is None or last > self.generation:
+			self.generation = last
+			self.genes = genes[generations == last]
+		else:
+			self.genes = np.concatenate([self.genes, genes[generations == last]])
+
+	def poll(self):
+		'''
+		Function to read the new data of the run.
+		Returns True if the run changed since the previous poll.
+		'''
+		if self.binary:
+			data = self._read(os.path.join(self.path, 'statistics.f8'), record_size=56)
+			changed = len(data) > 0
+			if changed:
+				self.statistics = np.concatenate([self.statistics, np.frombuffer(data, dtype='<f8').reshape(-1, 7)])
+				with open(os.path.join(self.path, 'store.json'), mode='r') as store_file:
+					width = json.load(store_file)['width']
+				generations = np.memmap(os.path.join(self.path, 'generation.i4'), dtype='<i4', mode='r')
+				candidates = np.memmap(os.path.join(self.path, 'candidates.f8'), dtype='<f8', mode='r')
+				size = min(len(generations), len(candidates) // width)
+				start = int(np.searchsorted(generations[:size], generations[size - 1]))
+				self.generation = int(generations[size - 1])
+				self.genes = np.asarray(candidates[start * width:size * width]).reshape(-1, width)[:, :len(gene_names)]
+			return changed
+
+		lines = [line for line in self._read_lines(self.path) if line.strip()]
+		if len(lines) > 0:
+			rows = np.loadtxt(lines, delimiter=',', ndmin=2)
+			self.statistics = np.concatenate([self.statistics, rows])
+		first_offset = 0
+		if self.individuals_path not in self.offsets and os.path.isfile(self.individuals_path):
+			first_offset = max(0, os.path.getsize(self.individuals_path) - self.tail_bytes)
+		individuals = [line for line in self._read_lines(self.individuals_path, first_offset) if line.strip()]
+		if len(individuals) > 0:
+			values = np.loadtxt([line.replace('[', '').replace(']', '') for line in individuals], delimiter=',', ndmin=2)
+			self._update_genes(values[:, 0].astype(int), values[:, 3:3 + len(gene_names)])
+		return len(lines) > 0 or len(individuals) > 0
+
+
+class Monitor(object):
+	'''
+	Figure with the fitness trend of every run (best fitness of each generation) and the distribution of the parameters
+	in the last generation of every run, whose artists are updated in place.
+	'''
+	def __init__(self, pyplot):
+		self.fig = pyplot.figure(figsize=(10, 8))
+		grid = self.fig.add_gridspec(2, len(gene_names), hspace=0.35, wspace=0.4)
+		self.trend_ax = self.fig.add_subplot(grid[0, :])
+		self.trend_ax.set_xlabel('Generation')
+		self.trend_ax.set_ylabel('Best fitness')
+		self.trend_ax.grid()
+		self.gene_axes = [self.fig.add_subplot(grid[1, i]) for i in range(len(gene_names))]
+		for ax, name in zip(self.gene_axes, gene_names):
+			ax.set_title(name, fontsize=9)
+		self.trend_lines = {}
+		self.gene_lines = {}
+
+	def update(self, runs):
+		for run in runs:
+			if run.name not in self.trend_lines:
+				self.trend_lines[run.name] = self.trend_ax.plot([], [], linewidth=1, label=run.name)[0]
+				color = self.trend_lines[run.name].get_color()
+				self.gene_lines[run.name] = [ax.plot([], [], drawstyle='steps-mid', color=color, linewidth=1)[0] for ax in self.gene_axes]
+				if len(self.trend_lines) <= 10:
+					self.trend_ax.legend(loc='best', fontsize=8)
+			self.trend_lines[run.name].set_data(run.statistics[:, 0], run.statistics[:, 3])
+			for i, line in enumerate(self.gene_lines[run.name]):
+				bins = gene_bins[i]
+				counts = np.histogram(run.genes[:, i], bins=bins)[0] if len(run.genes) > 0 else np.zeros(len(bins) - 1)
+				line.set_data((bins[:-1] + bins[1:]) / 2, counts)
+		for ax in [self.trend_ax] + self.gene_axes:
+			ax.relim()
+			ax.autoscale_view()
+		generations = ', '.join('{0}: gen {1}'.format(run.name, run.generation) for run in runs if run.generation is not None)
+		self.fig.suptitle('Last generations: ' + generations if len(runs) <= 3 else '{0} runs'.format(len(runs)), fontsize=9)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Monitor the fitness and the parameters of running optimizations.')
+	parser.add_argument('inputs', nargs='+', help='statistics files, population stores or glob patterns of them')
+	parser.add_argument('--interval', type=float, default=5.0, help='seconds between two polls')
+	parser.add_argument('--output', default=None, help='image file saved at each update instead of showing a window')
+	parser.add_argument('--once', action='store_true', help='poll once, save the output and exit')
+	args = parser.parse_args()
+
+	if args.output is not None:
+		matplotlib.use('Agg')
+	from matplotlib import pyplot
+
+	monitor = Monitor(pyplot)
+	runs = {}
+	start = time()
+	while True:
+		for pattern in args.inputs:
+			for path in glob.glob(pattern):
+				# the statistics files exported at the end of the runs with a population store are the same runs
+				exported = os.path.isdir(path.replace('drones_ec_statistics_', 'drones_ec_population_')[:-len('.csv')])
+				if path not in runs and not path.endswith('.npz') and not exported:
+					runs[path] = RunTail(path)
+		changed = [run.poll() for run in runs.values()]
+		if any(changed):
+			monitor.update(list(runs.values()))
+			if args.output is not None:
+				monitor.fig.savefig(args.output)
+			else:
+				monitor.fig.canvas.draw_idle()
+			print('{0} runs, {1} updated; monitor CPU time {2:.2f} s in {3:.0f} s'.format(len(runs), sum(changed), process_time(), time() - start))
+		if args.once:
+			break
+		if args.output is None:
+			pyplot.pause(args.interval)
+		else:
+			sleep(args.interval)
+
+
+
+if __name__ == '__main__':
+	main()
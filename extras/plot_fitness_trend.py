@@ -56,14 +56,13 @@ def main():
 				fitness.append(float(row[3]))
 		all_fitness.append(fitness)
 
-		if index == 0:
-			trend_average = fitness
-			trend_stdev = np.std(np.array(fitness))
-		else:
-			trend_average = (np.array(fitness) + np.array(trend_average)) / 2.0
-			trend_stdev = np.std(abs(np.array(fitness) - np.array(trend_average)))
-
-		x = np.arange(np.size(fitness))
+	# mean and standard deviation across the runs of each generation (the runs which ended before a generation are left out)
+	runs = np.full((len(all_fitness), max(len(fitness) for fitness in all_fitness)), np.nan)
+	for index, fitness in enumerate(all_fitness):
+		runs[index, :len(fitness)] = fitness
+	trend_average = np.nanmean(runs, axis=0)
+	trend_stdev = np.nanstd(runs, axis=0)
+	x = np.arange(runs.shape[1])
 
 	lineStyle={"linestyle":"--", "linewidth":2, "markeredgewidth":2, "elinewidth":2, "capsize":3}
 
@@ -1,10 +1,13 @@
 '''
 PLOT HISTOGRAM DISTRIBUTION OF PARAMETERS:
 Multiple parameters files in input.
+Individuals files can be selected too: the distribution of the last generation of each one is read from its analysis (see individuals_analysis.py),
+which is computed in chunks and cached at the first use.
 '''
 
 
 import csv
+import os
 import sys
 from matplotlib import pyplot
 import statistics
@@ -12,6 +15,7 @@ import numpy as np
 from tkinter import *
 from tkinter import ttk
 from tkinter import filedialog
+from individuals_analysis import load_analysis, gene_names, gene_bins
 
 class Root(Tk):
 	def __init__(self):
@@ -46,8 +50,18 @@ def main():
 	t_horiz_obst = []
 	radius = []
 	max_speed = []
+	parameters = [neigh_dist, maxNeigh, t_horiz, t_horiz_obst, max_speed]
+	weights = [[], [], [], [], []]
 
 	for index, f in enumerate(filenames):
+		if os.path.basename(f).startswith('drones_ec_individuals_'):
+			analysis = load_analysis(f)
+			if len(analysis['generation']) == 0:
+				continue
+			for i, name in enumerate(gene_names):
+				parameters[i].extend(gene_bins[i][:-1])
+				weights[i].extend(analysis['histogram_' + name][-1])
+			continue
 		with open(f, mode='r') as file:
 			reader = csv.reader(file, delimiter=',')
 			for row in reader:
@@ -56,33 +70,35 @@ def main():
 				t_horiz.append(float(row[2]))
 				t_horiz_obst.append(float(row[3]))
 				max_speed.append(float(row[4]))
+				for i in range(len(weights)):
+					weights[i].append(1)
 
 	fig, ax = pyplot.subplots(5, 1)
 	range = np.arange(0, 11, 2)
 
 
-	ax[0].hist(neigh_dist, bins=np.arange(0.1, 5.2, 0.1), density=False, align='left', edgecolor='black', linewidth=1)
+	ax[0].hist(neigh_dist, weights=weights[0], bins=np.arange(0.1, 5.2, 0.1), density=False, align='left', edgecolor='black', linewidth=1)
 	ax[0].set_title('neighborDist')
 	ax[0].grid(axis='y')
 	ax[0].set_yticks(ticks=range)
 
-	ax[1].hist(maxNeigh, bins=np.arange(1, 5, 1), density=False, align='left', edgecolor='black', linewidth=1)
+	ax[1].hist(maxNeigh, weights=weights[1], bins=np.arange(1, 5, 1), density=False, align='left', edgecolor='black', linewidth=1)
 	ax[1].set_title('maxNeighbors')
 	ax[1].grid(axis='y')
 	ax[1].set_yticks(ticks=range)
 	ax[1].set_xticks([1, 2, 3])
 
-	ax[2].hist(t_horiz, bins=np.arange(0.1, 11, 0.5), density=False, align='left', edgecolor='black', linewidth=1)
+	ax[2].hist(t_horiz, weights=weights[2], bins=np.arange(0.1, 11, 0.5), density=False, align='left', edgecolor='black', linewidth=1)
 	ax[2].set_title('timeHorizon')
 	ax[2].grid(axis='y')
 	ax[2].set_yticks(ticks=range)
 
-	ax[3].hist(t_horiz_obst, bins=np.arange(0.1, 11, 0.5), density=False, align='left', edgecolor='black', linewidth=1)
+	ax[3].hist(t_horiz_obst, weights=weights[3], bins=np.arange(0.1, 11, 0.5), density=False, align='left', edgecolor='black', linewidth=1)
 	ax[3].set_title('timeHorizonObst')
 	ax[3].grid(axis='y')
 	ax[3].set_yticks(ticks=range)
 
-	ax[4].hist(max_speed, bins=np.arange(0.5, 6, 0.5), density=False, align='left', edgecolor='black', linewidth=1)
+	ax[4].hist(max_speed, weights=weights[4], bins=np.arange(0.5, 6, 0.5), density=False, align='left', edgecolor='black', linewidth=1)
 	ax[4].set_title('maxSpeed')
 	ax[4].grid(axis='y')
 	ax[4].set_yticks(ticks=range)
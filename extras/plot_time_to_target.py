@@ -0,0 +1,92 @@
+'''
+PLOT TIME-TO-TARGET OF TWO GROUPS OF RUNS:
+Multiple progress files in input, for a baseline and a variant configuration (e.g. plain GA and GA with surrogate).
+For each run it reports the simulations and the seconds needed to reach the target fitness,
+then it plots the median best fitness of each group over the number of simulations.
+
+Usage:
+python plot_time_to_target.py --target 1.2 --baseline drones_ec_progress_scenario1_A*.csv --variant drones_ec_progress_scenario1_B*.csv
+'''
+
+import argparse
+import csv
+from matplotlib import pyplot
+import numpy as np
+
+
+def read_progress(filename):
+	'''
+	Function to read a progress file.
+	Returns a numpy array with columns: generation, evaluations, simulations, elapsed seconds, best fitness.
+	'''
+	rows = []
+	with open(filename, mode='r') as file:
+		reader = csv.reader(file, delimiter=',')
+		for row in reader:
+			rows.append([float(value) for value in row[:5]])
+	return np.array(rows)
+
+
+def time_to_target(progress, target):
+	'''
+	Function to find when a run reached the target fitness.
+	Returns the tuple (simulations, seconds), or (nan, nan) if the target was never reached.
+	'''
+	reached = np.nonzero(progress[:, 4] <= target)[0]
+	if len(reached) == 0:
+		return float('nan'), float('nan')
+	return progress[reached[0], 2], progress[reached[0], 3]
+
+
+def summarize(label, filenames, target):
+	'''
+	Function to print the time-to-target statistics of a group of runs.
+	Returns the list of progress arrays of the group.
+	'''
+	runs = [read_progress(f) for f in filenames]
+	results = np.array([time_to_target(p, target) for p in runs])
+	success = ~np.isnan(results[:, 0])
+	print('{0}: {1}/{2} runs reached fitness {3}'.format(label, success.sum(), len(runs), target))
+	if success.any():
+		print('  simulations to target: median {0:.0f}, mean {1:.0f}'.format(np.median(results[success, 0]), np.mean(results[success, 0])))
+		print('  seconds to target:     median {0:.1f}, mean {1:.1f}'.format(np.median(results[success, 1]), np.mean(results[success, 1])))
+	return runs
+
+
+def plot_group(ax, label, runs, color):
+	'''
+	Function to plot the median best fitness of a group of runs over the number of simulations.
+	'''
+	max_sims = max(p[-1, 2] for p in runs)
+	grid = np.linspace(0, max_sims, 200)
+	curves = np.array([np.interp(grid, p[:, 2], np.minimum.accumulate(p[:, 4])) for p in runs])
+	ax.plot(grid, np.median(curves, axis=0), color=color, label=label)
+	ax.fill_between(grid, np.percentile(curves, 25, axis=0), np.percentile(curves, 75, axis=0), color=color, alpha=0.2)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Compare the time-to-target fitness of two groups of runs.')
+	parser.add_argument('--target', type=float, required=True, help='target fitness value')
+	parser.add_argument('--baseline', nargs='+', required=True, help='progress files of the baseline runs')
+	parser.add_argument('--variant', nargs='+', required=True, help='progress files of the variant runs')
+	parser.add_argument('--labels', nargs=2, default=['Baseline', 'Variant'], help='names of the two groups')
+	args = parser.parse_args()
+
+	baseline = summarize(args.labels[0], args.baseline, args.target)
+	variant = summarize(args.labels[1], args.variant, args.target)
+
+	fig, ax = pyplot.subplots()
+	plot_group(ax, args.labels[0], baseline, 'b')
+	plot_group(ax, args.labels[1], variant, 'g')
+	ax.axhline(args.target, color='r', linestyle='--', label='Target')
+	pyplot.grid()
+	pyplot.title('Best fitness over simulations')
+	pyplot.xlabel('Simulations')
+	pyplot.ylabel('Fitness')
+	ax.legend(loc='best')
+	pyplot.show()
+
+
+
+if __name__ == '__main__':
+	main()
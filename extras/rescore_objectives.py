@@ -0,0 +1,58 @@
+'''
+RE-SCORE A RUN WITH A NEW FITNESS FUNCTION:
+One or more objectives stores in input (the "drones_ec_objectives_*" directories of runs with store_objectives = True).
+The fitness formula is a Python expression of the columns of the store, e.g. "mean_error_norm + mean_duration_norm + 10 * collisions_norm",
+evaluated with numpy on all the simulations at once. The distinct candidates are ranked by the new fitness (lower is better)
+and the best ones are printed with their original fitness and rank. The best candidate can be saved as a best individual parameters file,
+to be shown with the "visualize_simulation_scenario" files.
+
+Usage:
+python rescore_objectives.py drones_ec_objectives_scenario1_2020_09_01_10_00_00 --formula "mean_error + mean_duration_norm + 10 * collisions" --top 10
+'''
+
+import argparse
+import csv
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+from objectives import gene_names, read_objectives
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Re-rank the simulations of finished runs with a new fitness formula.')
+	parser.add_argument('stores', nargs='+', help='objectives store directories')
+	parser.add_argument('--formula', default='mean_error + mean_duration_norm + collisions', help='new fitness as an expression of the columns')
+	parser.add_argument('--top', type=int, default=10, help='number of candidates printed')
+	parser.add_argument('--output', default=None, help='best individual parameters file where the best candidate is saved')
+	args = parser.parse_args()
+
+	stores = [read_objectives(directory) for directory in args.stores]
+	data = {name: np.concatenate([store[name] for store in stores]) for name in stores[0]}
+	print('{0} simulations, columns: {1}'.format(len(data['fitness']), ', '.join(data.keys())))
+
+	genes = np.column_stack([data[name] for name in gene_names])
+	genes, first = np.unique(genes, axis=0, return_index=True)
+	data = {name: values[first] for name, values in data.items()}
+
+	score = np.broadcast_to(eval(args.formula, {'np': np, '__builtins__': {}}, data), first.shape)
+	new_rank = np.argsort(score, kind='stable')
+	old_rank = np.empty(len(first), dtype=int)
+	old_rank[np.argsort(data['fitness'], kind='stable')] = np.arange(len(first))
+
+	print('\n{0} distinct candidates ranked by: {1}\n'.format(len(first), args.formula))
+	print('rank  new fitness   old fitness   old rank  ' + '  '.join(gene_names))
+	for rank, index in enumerate(new_rank[:args.top]):
+		print('{0:<5} {1:<13.6g} {2:<13.6g} {3:<9} '.format(rank + 1, score[index], data['fitness'][index], old_rank[index] + 1) +
+			'  '.join('{0:.4f}'.format(value) for value in genes[index]))
+
+	if args.output is not None:
+		with open(args.output, mode='w') as best_individual_file:
+			best_individual_writer = csv.writer(best_individual_file, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+			best_individual_writer.writerow(list(genes[new_rank[0]]))
+
+
+
+if __name__ == '__main__':
+	main()
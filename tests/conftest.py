@@ -0,0 +1,9 @@
+'''
+conftest.py
+The modules of the optimizer are flat modules of the "code" folder, run from that folder: it is added to the path of the tests.
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
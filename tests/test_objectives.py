@@ -0,0 +1,62 @@
+'''
+test_objectives.py
+Tests of the objectives store of objectives.py: the components of the simulations are read back by column, and the simulations stopped by
+their wall-clock budget are kept with nan components.
+'''
+
+import numpy as np
+from objectives import ObjectivesStore, read_objectives, objectives_evaluation
+
+
+def components(collisions, error):
+	return {'n_iterations': 1666, 'collisions': collisions, 'mean_error': error, 'timed_out': 0.0}
+
+
+def test_objectives_round_trip(tmp_path):
+	directory = str(tmp_path / 'objectives')
+	store = ObjectivesStore(directory, 5)
+	store.add(0, [1.0, 2, 3.0, 4.0, 1.5, 0.1], 12.0, components(2, 0.5))
+	store.add(0, [2.0, 1, 5.0, 2.0, 3.5, 0.1], 3.0, components(0, 0.25))
+	store.flush()
+	store.add(1, [3.0, 3, 1.0, 6.0, 2.5, 0.1], 7.0, components(1, 1.0))
+	store.flush()
+
+	data = read_objectives(directory)
+	assert list(data.keys()) == ['neigh_dist', 'max_neigh', 't_horiz', 't_horiz_obst', 'max_speed', 'generation', 'fitness',
+								'n_iterations', 'collisions', 'mean_error', 'timed_out']
+	assert np.array_equal(data['neigh_dist'], [1.0, 2.0, 3.0])
+	assert np.array_equal(data['generation'], [0, 0, 1])
+	assert np.array_equal(data['fitness'], [12.0, 3.0, 7.0])
+	assert np.array_equal(data['collisions'], [2, 0, 1])
+
+
+def test_wall_clock_timeouts_are_kept(tmp_path):
+	directory = str(tmp_path / 'objectives')
+	store = ObjectivesStore(directory, 2)
+	# the first simulation of the run timed out: its row waits for the names of the components
+	store.add(0, [1.0, 2.0], 1e4, None)
+	store.flush()
+	store.add(0, [3.0, 4.0], 5.0, components(0, 0.1))
+	store.add(0, [5.0, 6.0], 1e4, None)
+	store.flush()
+
+	data = read_objectives(directory)
+	assert list(data.keys())[:4] == ['gene_0', 'gene_1', 'generation', 'fitness']
+	assert np.array_equal(data['gene_0'], [1.0, 3.0, 5.0])
+	assert np.array_equal(data['timed_out'], [1.0, 0.0, 1.0])
+	assert np.isnan(data['mean_error'][[0, 2]]).all() and data['mean_error'][1] == 0.1
+
+
+def test_objectives_evaluation(tmp_path):
+	class FakeEC(object):
+		num_generations = 3
+
+	def evaluator(candidates, args):
+		assert args['store_objectives']
+		return [(sum(c), components(0, c[0])) for c in candidates]
+
+	store = ObjectivesStore(str(tmp_path / 'objectives'), 2)
+	args = {'objectives_evaluator': evaluator, 'objectives_store': store, 'store_objectives': True, '_ec': FakeEC()}
+	assert objectives_evaluation([[1.0, 2.0], [3.0, 4.0]], args) == [3.0, 7.0]
+	data = read_objectives(store.directory)
+	assert np.array_equal(data['generation'], [3, 3]) and np.array_equal(data['mean_error'], [1.0, 3.0])
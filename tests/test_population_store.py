@@ -0,0 +1,45 @@
+'''
+test_population_store.py
+Tests of the binary population store of population_store.py: the store exported with export_csv has the layout of the files of inspyred's file_observer,
+also for the genes clipped by the bounder to an integer bound.
+'''
+
+from random import Random
+import inspyred
+from population_store import PopulationWriter, binary_observer, read_population, export_csv
+
+bounder = inspyred.ec.Bounder((0.1, 1, 0.1), (5, 3, 10))
+
+
+def random_population(random, size):
+	population = []
+	for i in range(size):
+		# the genes clipped by the bounder take the integer bounds of the constraints
+		candidate = bounder([random.uniform(0, 6), random.uniform(0.5, 4), random.uniform(-2, 12)], {})
+		individual = inspyred.ec.Individual(candidate, maximize=False)
+		individual.fitness = random.uniform(10, 30)
+		population.append(individual)
+	return population
+
+
+def test_export_csv_matches_file_observer(tmp_path):
+	random = Random(0)
+	csv_individuals, csv_statistics = tmp_path / 'csv_individuals.csv', tmp_path / 'csv_statistics.csv'
+	writer = PopulationWriter(str(tmp_path / 'population'))
+	with open(csv_individuals, mode='w') as individuals_file, open(csv_statistics, mode='w') as statistics_file:
+		args = {'individuals_file': individuals_file, 'statistics_file': statistics_file, 'population_writer': writer}
+		for generation in range(4):
+			population = random_population(random, 10 + generation)
+			inspyred.ec.observers.file_observer(population, generation, 10 * generation, args)
+			binary_observer(population, generation, 10 * generation, args)
+	writer.close()
+
+	generations, fitness, candidates, statistics = read_population(str(tmp_path / 'population'))
+	assert len(fitness) == 10 + 11 + 12 + 13 and candidates.shape == (46, 3) and statistics.shape == (4, 7)
+	assert list(generations[:11]) == [0] * 10 + [1]
+
+	binary_individuals, binary_statistics = tmp_path / 'binary_individuals.csv', tmp_path / 'binary_statistics.csv'
+	export_csv(str(tmp_path / 'population'), str(binary_individuals), str(binary_statistics))
+	assert ', 3, ' in csv_individuals.read_text() and ', 10]' in csv_individuals.read_text()
+	assert binary_individuals.read_text() == csv_individuals.read_text()
+	assert binary_statistics.read_text() == csv_statistics.read_text()
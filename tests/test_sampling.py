@@ -0,0 +1,48 @@
+'''
+test_sampling.py
+Tests of the space-filling designs of sampling.py: every stratum of the Latin hypercube and every elementary interval of the Sobol sequence
+holds exactly one point.
+'''
+
+from random import Random
+import numpy as np
+import pytest
+from sampling import latin_hypercube, sobol_sequence, space_filling_design
+
+
+def test_latin_hypercube_strata():
+	lower_bound, upper_bound = (0.1, 1, 0.1, 0.1, 0.5), (5, 3, 10, 10, 5)
+	size = 50
+	chromosomes = np.asarray(latin_hypercube(Random(1), size, lower_bound, upper_bound))
+	assert chromosomes.shape == (size, 5)
+	for gene, (lo, hi) in enumerate(zip(lower_bound, upper_bound)):
+		strata = np.floor((chromosomes[:, gene] - lo) / (hi - lo) * size).astype(int)
+		assert sorted(strata) == list(range(size))
+
+
+def test_sobol_sequence_stratification():
+	size, dimensions = 64, 10
+	points = np.asarray(sobol_sequence(Random(2), size, dimensions))
+	assert points.shape == (size, dimensions)
+	assert ((points >= 0) & (points < 1)).all()
+	# the first 2^k points of a (scrambled) Sobol sequence fall once in each of the 2^k intervals of every dimension...
+	for d in range(dimensions):
+		assert sorted(np.floor(points[:, d] * size).astype(int)) == list(range(size))
+	# ...and once in each of the 8 x 8 cells of a pair of dimensions
+	cells = np.floor(points[:, 0] * 8).astype(int) * 8 + np.floor(points[:, 1] * 8).astype(int)
+	assert sorted(cells) == list(range(size))
+
+
+def test_designs_are_reproducible():
+	lower_bound, upper_bound = (0, 0, 0), (1, 2, 3)
+	for method in ('uniform', 'lhs', 'sobol'):
+		first = space_filling_design(Random(3), 16, lower_bound, upper_bound, method)
+		assert first == space_filling_design(Random(3), 16, lower_bound, upper_bound, method)
+		assert (np.asarray(first) >= lower_bound).all() and (np.asarray(first) <= upper_bound).all()
+
+
+def test_unknown_designs():
+	with pytest.raises(ValueError):
+		space_filling_design(Random(0), 4, (0,), (1,), 'halton')
+	with pytest.raises(ValueError):
+		sobol_sequence(Random(0), 4, 11)
@@ -0,0 +1,36 @@
+'''
+test_sensitivity_analysis.py
+Tests of the Sobol indices of sensitivity_analysis.py on the Ishigami function, whose indices are known analytically.
+'''
+
+from random import Random
+import numpy as np
+from sensitivity_analysis import saltelli_design, estimate_indices, sobol_indices
+
+# Ishigami function with a = 7 and b = 0.1 on [-pi, pi]^3
+ishigami_first = [0.3139, 0.4424, 0.0]
+ishigami_total = [0.5576, 0.4424, 0.2437]
+
+
+def ishigami(x):
+	return np.sin(x[:, 0]) + 7 * np.sin(x[:, 1]) ** 2 + 0.1 * x[:, 2] ** 4 * np.sin(x[:, 0])
+
+
+def ishigami_fitness(samples):
+	design = saltelli_design(Random(0), samples, [-np.pi] * 3, [np.pi] * 3)
+	assert design.shape == (5 * samples, 3)
+	return ishigami(design)
+
+
+def test_estimate_indices_on_ishigami():
+	values = ishigami_fitness(4096).reshape(5, -1)
+	first, total = estimate_indices(values[0], values[1], values[2:])
+	assert np.allclose(first, ishigami_first, atol=0.05)
+	assert np.allclose(total, ishigami_total, atol=0.05)
+
+
+def test_sobol_indices_confidence_intervals():
+	indices = sobol_indices(ishigami_fitness(1024), 3, resamples=200)
+	assert (indices['first_low'] <= indices['first']).all() and (indices['first'] <= indices['first_high']).all()
+	assert (indices['total_low'] <= indices['total']).all() and (indices['total'] <= indices['total_high']).all()
+	assert (indices['total_low'] < ishigami_total).all() and (np.asarray(ishigami_total) < indices['total_high']).all()
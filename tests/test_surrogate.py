@@ -0,0 +1,61 @@
+'''
+test_surrogate.py
+Tests of the surrogate model of surrogate.py: the radial basis function interpolation and the exclusion of the predicted individuals.
+'''
+
+from random import Random
+import numpy as np
+import inspyred
+from surrogate import RBFSurrogate, PredictedFitness, rank_correlation, simulated_best
+
+lower_bound, upper_bound = (0.1, 1, 0.1, 0.1, 0.5), (5, 3, 10, 10, 5)
+
+
+def sphere(candidate):
+	return sum(((c - lo) / (hi - lo) - 0.3) ** 2 for c, lo, hi in zip(candidate, lower_bound, upper_bound)) * 100
+
+
+def random_candidates(random, size):
+	return [[random.uniform(lo, hi) for lo, hi in zip(lower_bound, upper_bound)] for i in range(size)]
+
+
+def test_rbf_interpolates_the_archive():
+	random = Random(0)
+	candidates = random_candidates(random, 80)
+	fitness = [sphere(c) for c in candidates]
+	model = RBFSurrogate(lower_bound, upper_bound)
+	model.add(candidates, fitness)
+	assert len(model) == 80
+	assert np.allclose(model.predict(candidates), fitness, rtol=1e-5, atol=1e-5)
+
+
+def test_rbf_ranks_new_candidates():
+	random = Random(1)
+	model = RBFSurrogate(lower_bound, upper_bound)
+	candidates = random_candidates(random, 200)
+	model.add(candidates, [sphere(c) for c in candidates])
+	new = random_candidates(random, 100)
+	assert rank_correlation(model.predict(new), [sphere(c) for c in new]) > 0.9
+
+
+def test_rbf_skips_duplicates_and_caps_the_archive():
+	random = Random(2)
+	candidates = random_candidates(random, 30)
+	model = RBFSurrogate(lower_bound, upper_bound, max_archive=40)
+	model.add(candidates, [sphere(c) for c in candidates])
+	model.add(candidates[:10], [sphere(c) for c in candidates[:10]])
+	assert len(model) == 30
+	more = random_candidates(random, 30)
+	model.add(more, [sphere(c) for c in more])
+	assert len(model) == 40
+	assert np.allclose(model.predict(more), [sphere(c) for c in more], rtol=1e-5, atol=1e-5)
+
+
+def test_simulated_best_ignores_predictions():
+	population = []
+	for fitness in (3.0, PredictedFitness(1.0), 2.0):
+		individual = inspyred.ec.Individual([0.0], maximize=False)
+		individual.fitness = fitness
+		population.append(individual)
+	assert simulated_best(population).fitness == 2.0
+	assert simulated_best(population[1:2]).fitness == 1.0
@@ -0,0 +1,46 @@
+'''
+test_trajectories.py
+Tests of the trajectory store of trajectories.py: the delta-encoded positions are decoded to the simulated ones, and a candidate which is an
+elite in many generations is simulated once.
+'''
+
+import numpy as np
+from trajectories import TrajectoryWriter, TrajectoryStore
+
+
+class FakeSimulation(object):
+	'''
+	Simulation of random walks of 4 agents, with the positions rounded to 3 decimals as in the scenarios.
+	'''
+	def __init__(self):
+		self.trajectories = {}
+
+	def __call__(self, genes):
+		rng = np.random.default_rng(int(sum(genes) * 1000))
+		steps = 50 + int(genes[0] * 10)
+		history = np.round(np.cumsum(rng.uniform(-0.05, 0.05, size=(steps, 4, 2)), axis=0) + [[0, 0], [10, 0], [10, 10], [0, 10]], 3)
+		self.trajectories[tuple(genes)] = history
+		return sum(genes), {'history': history.tolist(), 'radius': 0.1, 'obstacles': [[(4, 4), (6, 4), (6, 6), (4, 6)]]}
+
+
+def test_trajectory_store_round_trip(tmp_path):
+	simulation = FakeSimulation()
+	directory = str(tmp_path / 'trajectories')
+	writer = TrajectoryWriter(directory, 1, 5, simulation)
+	candidates = [[1.0, 2, 3.0, 4.0, 1.5], [2.0, 1, 5.0, 2.0, 3.5, 0.1, 0.1, 0.1, 0.1, 0.1]]
+	writer.record(candidates[0], 10.0, 0, 0)
+	writer.record(candidates[1], 20.0, 0, 1)
+	writer.record(candidates[0], 10.0, 1, 0)
+	writer.record(candidates[0], 10.0, 1, 0, final=True)
+	assert writer.num_simulations == 2
+
+	store = TrajectoryStore(directory)
+	assert len(store) == 4
+	assert store.num_agents == 4 and store.radius == 0.1
+	for i, candidate in enumerate([candidates[0], candidates[1], candidates[0], candidates[0]]):
+		genes = tuple(candidate[:5])
+		record = store.record(i)
+		assert record['genes'] == list(genes)
+		assert np.array_equal(store.trajectory(i), simulation.trajectories[genes])
+	assert store.record(2)['offset'] == store.record(0)['offset']
+	assert store.final() == 3
@@ -0,0 +1,71 @@
+'''
+test_workers.py
+Tests of the scheduling of workers.py: the makespan of static chunking, the runtime regression and the pool of worker processes.
+'''
+
+from time import sleep
+import numpy as np
+import pytest
+from parameters import timeout_fitness
+from workers import static_makespan, RuntimeModel, WorkerPool
+
+
+def sleep_evaluator(candidates, args):
+	# the first gene is the runtime of the "simulation"
+	for candidate in candidates:
+		sleep(candidate[0])
+	return [sum(candidate) for candidate in candidates]
+
+
+def test_static_makespan():
+	assert static_makespan([1, 2, 3, 4], 2) == 7
+	assert static_makespan([1, 2, 3, 4, 5], 2) == 9
+	assert static_makespan([4, 1, 1, 1], 4) == 4
+	assert static_makespan([2.0], 8) == 2.0
+	assert static_makespan([1, 1, 1, 1, 1, 1, 1], 3) == 3
+
+
+def test_runtime_model_ranks_the_candidates():
+	rng = np.random.default_rng(0)
+	genes = rng.uniform([0.1, 1, 0.1, 0.1, 0.5], [5, 3, 10, 10, 5], size=(200, 5))
+	seconds = 0.01 * genes[:, 0] * genes[:, 1] / genes[:, 4]
+	model = RuntimeModel(5)
+	assert model.predict(genes[:5]) is None
+	model.add(list(genes), list(seconds))
+	predicted = model.predict(list(genes))
+	assert np.corrcoef(np.argsort(np.argsort(predicted)), np.argsort(np.argsort(seconds)))[0, 1] > 0.9
+
+
+def test_worker_pool_results_and_timeouts():
+	pool = WorkerPool(2, time_budget=1.0)
+	try:
+		client = pool.client(sleep_evaluator, {}, 2)
+		candidates = [[0.05, 1.0], [0.0, 2.0], [3.0, 0.0], [0.1, 3.0]]
+		results = client.evaluate(candidates)
+		assert results[:2] == [1.05, 2.0] and results[3] == 3.1
+		assert results[2] == timeout_fitness
+		assert client.num_timeouts == 1
+		assert client.evaluate([[0.0, 5.0]]) == [5.0]
+		client.close()
+	finally:
+		pool.close()
+
+
+def failing_evaluator(candidates, args):
+	if candidates[0][1] < 0:
+		raise NameError("name 'path_lenght' is not defined")
+	return [sum(candidate) for candidate in candidates]
+
+
+def test_worker_pool_raises_the_evaluator_errors():
+	pool = WorkerPool(2)
+	try:
+		client = pool.client(failing_evaluator, {}, 2)
+		with pytest.raises(NameError, match='path_lenght'):
+			client.evaluate([[0.0, 1.0], [0.0, -1.0], [0.0, 2.0]])
+		# the error is not a crash of the worker: it is neither penalized nor recycled, and the pool keeps working
+		assert client.num_recycles == 0 and client.num_timeouts == 0
+		assert client.evaluate([[0.0, 5.0], [1.0, 2.0]]) == [5.0, 3.0]
+		client.close()
+	finally:
+		pool.close()